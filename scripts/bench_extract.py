@@ -0,0 +1,66 @@
+"""
+Latency of the "menu" extraction profile against the full extraction.
+
+    python scripts/bench_extract.py URL [URL ...]
+    python scripts/bench_extract.py -n 5 urls.txt      # one URL per line
+
+Needs network access. Each URL is extracted n times per profile, the two
+profiles interleaved so network conditions hit both alike; prints median
+and mean latency and the number of formats each profile returned.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+os.environ.setdefault("BOT_TOKEN", "bench")
+
+from project.downloader.ytdlp_client import extract_info, menu_options  # noqa: E402
+from project.utils.config import settings  # noqa: E402
+
+
+def _read_urls(args: list[str]) -> list[str]:
+    urls: list[str] = []
+    for a in args:
+        if os.path.isfile(a):
+            with open(a, encoding="utf-8") as f:
+                urls += [line.strip() for line in f if line.strip()]
+        else:
+            urls.append(a)
+    return urls
+
+
+def _timed(url: str, options: dict | None) -> tuple[float, int]:
+    t = time.perf_counter()
+    info = extract_info(url, options=options)
+    return time.perf_counter() - t, len(info.get("formats") or [])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=3, help="rounds per URL and profile")
+    parser.add_argument("urls", nargs="+")
+    args = parser.parse_args()
+
+    profiles = {"full": None, "menu": menu_options(settings.MENU_PLAYER_CLIENTS)}
+    times: dict[str, list[float]] = {p: [] for p in profiles}
+    for url in _read_urls(args.urls):
+        counts = {}
+        for _ in range(args.n):
+            for name, options in profiles.items():
+                elapsed, counts[name] = _timed(url, options)
+                times[name].append(elapsed)
+        print(f"{url}: formats full={counts['full']} menu={counts['menu']}")
+
+    for name, values in times.items():
+        print(f"{name:>5}: median {statistics.median(values):.2f}s, mean {statistics.mean(values):.2f}s ({len(values)} runs)")
+    speedup = statistics.median(times["full"]) / statistics.median(times["menu"])
+    print(f"menu profile: {speedup:.2f}x faster (median)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark for the canonical media-key resolver.
+
+    python scripts/bench_mediakey.py                 # synthetic corpus
+    python scripts/bench_mediakey.py urls.txt        # one URL per line
+
+Prints cold (first sight of each URL) and warm (repeated) throughput and
+how many distinct strings collapse into how many media keys.
+"""
+from __future__ import annotations
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+os.environ.setdefault("BOT_TOKEN", "bench")
+
+from project.services.mediakey import resolve_media_key  # noqa: E402
+
+_ID_CHARS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_"
+
+
+def _yt_id(rnd: random.Random) -> str:
+    return "".join(rnd.choice(_ID_CHARS) for _ in range(11))
+
+
+def synthetic_corpus(n: int, media: int, seed: int = 1) -> list[str]:
+    rnd = random.Random(seed)
+    ids = [_yt_id(rnd) for _ in range(media)]
+    shapes = [
+        "https://youtu.be/{id}?si={tok}",
+        "https://www.youtube.com/watch?v={id}&feature=share",
+        "https://youtube.com/shorts/{id}",
+        "https://m.youtube.com/watch?v={id}&pp={tok}",
+        "https://music.youtube.com/watch?v={id}&si={tok}",
+        "https://www.youtube.com/watch?v={id}&list=PL{tok}&index=2",
+        "https://vimeo.com/{num}?utm_source=tg",
+        "https://www.tiktok.com/@user/video/{num}?is_from_webapp=1",
+        "https://vk.com/video-{num}_{num}",
+        "https://example.com/media/{num}.mp4?utm_campaign={tok}",
+    ]
+    out = []
+    for _ in range(n):
+        i = rnd.randrange(media)
+        out.append(rnd.choice(shapes).format(
+            id=ids[i], num=100000 + i, tok=rnd.getrandbits(32),
+        ))
+    return out
+
+
+def main() -> None:
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding="utf-8") as f:
+            urls = [line.strip() for line in f if line.strip()]
+    else:
+        urls = synthetic_corpus(n=20000, media=2000)
+
+    t = time.perf_counter()
+    resolve_media_key("https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+    print(f"extractor index warm-up: {time.perf_counter() - t:.2f}s")
+
+    resolve_media_key.cache_clear()
+    t = time.perf_counter()
+    keys = [resolve_media_key(u) for u in urls]
+    cold = time.perf_counter() - t
+
+    t = time.perf_counter()
+    for u in urls:
+        resolve_media_key(u)
+    warm = time.perf_counter() - t
+
+    distinct_urls = len(set(urls))
+    distinct_keys = len(set(keys))
+    print(f"urls: {len(urls)} ({distinct_urls} distinct strings)")
+    print(f"cold: {len(urls) / cold:,.0f} urls/s ({cold * 1e6 / len(urls):.1f} us/url)")
+    print(f"warm: {len(urls) / warm:,.0f} urls/s ({warm * 1e6 / len(urls):.2f} us/url)")
+    print(f"media keys: {distinct_keys} ({distinct_urls / max(1, distinct_keys):.1f} strings per key)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Update-handling throughput with and without the fast runtime profile.
+
+    python scripts/bench_runtime.py              # 5000 updates per run
+    python scripts/bench_runtime.py 20000
+
+A fake Bot API server (own thread and loop) hands out batches of text
+updates from getUpdates and answers sendMessage. The bot polls it with a
+real Dispatcher and replies to every update, so each run covers update
+decoding, routing, request encoding and the HTTP round trips. Each profile
+runs in a fresh interpreter since settings are read at import time.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+os.environ.setdefault("BOT_TOKEN", "42:bench")
+
+_BATCH = 100
+
+
+def _update(i: int) -> dict:
+    return {
+        "update_id": i,
+        "message": {
+            "message_id": i,
+            "date": 1700000000,
+            "chat": {"id": 1000 + i % 50, "type": "private", "first_name": "Bench"},
+            "from": {"id": 1000 + i % 50, "is_bot": False, "first_name": "Bench", "language_code": "ru"},
+            "text": f"hello {i}",
+        },
+    }
+
+
+def _serve(total: int, ready: threading.Event, port: list[int]) -> None:
+    from aiohttp import web
+
+    sent_until = 0
+
+    async def handle(request: web.Request) -> web.Response:
+        nonlocal sent_until
+        method = request.match_info["method"]
+        if method == "getUpdates":
+            form = await request.post()
+            offset = int(form.get("offset") or 0)
+            start = max(offset, sent_until)
+            end = min(total, start + _BATCH)
+            if start >= total:
+                await asyncio.sleep(0.5)
+            sent_until = end
+            result = [_update(i) for i in range(start, end)]
+        elif method == "sendMessage":
+            form = await request.post()
+            result = {
+                "message_id": 1,
+                "date": 1700000000,
+                "chat": {"id": int(form["chat_id"]), "type": "private"},
+                "text": form["text"],
+            }
+        elif method == "deleteWebhook":
+            result = True
+        else:
+            result = {"id": 42, "is_bot": True, "first_name": "bench", "username": "bench_bot"}
+        return web.json_response({"ok": True, "result": result})
+
+    async def main() -> None:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port.append(site._server.sockets[0].getsockname()[1])
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+def child(total: int) -> None:
+    from aiogram import Bot, Dispatcher, Router
+    from aiogram.client.telegram import TelegramAPIServer
+    from aiogram.types import Message
+
+    from project.utils.config import settings
+    from project.utils.runtime import json_codec, make_session, run
+
+    ready, port = threading.Event(), []
+    threading.Thread(target=_serve, args=(total, ready, port), daemon=True).start()
+    ready.wait()
+
+    async def main() -> float:
+        api = TelegramAPIServer.from_base(f"http://127.0.0.1:{port[0]}")
+        bot = Bot(token=settings.BOT_TOKEN, session=make_session(api))
+        router = Router()
+        done = asyncio.Event()
+        handled = 0
+
+        @router.message()
+        async def echo(message: Message) -> None:
+            nonlocal handled
+            await message.answer(message.text or "")
+            handled += 1
+            if handled == total:
+                done.set()
+
+        dp = Dispatcher()
+        dp.include_router(router)
+        t = time.perf_counter()
+        polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, polling_timeout=0))
+        await done.wait()
+        elapsed = time.perf_counter() - t
+        await dp.stop_polling()
+        await polling
+        await bot.session.close()
+        return elapsed
+
+    elapsed = run(main())
+    loop = "uvloop" if settings.FAST_RUNTIME and "uvloop" in sys.modules else "asyncio"
+    codec = json_codec()[2] if settings.FAST_RUNTIME else "json"
+    print(json.dumps({"elapsed": elapsed, "loop": loop, "json": codec}))
+
+
+def main() -> None:
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rates = {}
+    for profile in ("0", "1"):
+        env = dict(os.environ, FAST_RUNTIME=profile)
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", str(total)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout.strip().splitlines()[-1]
+        r = json.loads(out)
+        rates[profile] = total / r["elapsed"]
+        name = "fast runtime" if profile == "1" else "default"
+        print(f"{name:>12}: {rates[profile]:,.0f} updates/s ({r['elapsed']:.2f}s, loop={r['loop']}, json={r['json']})")
+    print(f"     speedup: {rates['1'] / rates['0']:.2f}x")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--child":
+        child(int(sys.argv[2]))
+    else:
+        main()
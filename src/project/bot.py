@@ -6,17 +6,27 @@ load_dotenv()
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
 
 from project.handlers import router as main_router
+from project.handlers.download import evict_idle_chat_locks, resume_interrupted_jobs
 from project.utils.config import settings
 from project.utils.logging import setup_logging
+from project.utils.loopwatch import start_loop_watchdog, stop_loop_watchdog
+from project.utils.runtime import make_session, run
 from project.services.uploader import close_telethon_client
+from project.services.watchdog import job_watchdog
 
 
 def create_bot() -> Bot:
+    api = None
+    if settings.BOT_API_URL:
+        api = TelegramAPIServer.from_base(settings.BOT_API_URL, is_local=settings.BOT_API_LOCAL)
+    session = make_session(api)
     return Bot(
         token=settings.BOT_TOKEN,
+        session=session,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML),
     )
 
@@ -26,21 +36,32 @@ def ensure_dirs() -> None:
     os.makedirs("data", exist_ok=True)
 
 
-async def on_shutdown(_: Bot) -> None:
+async def on_shutdown() -> None:
+    await job_watchdog.stop()
+    await stop_loop_watchdog()
     await close_telethon_client()
 
 
 async def main() -> None:
     setup_logging()
-    ensure_dirs()
+    await asyncio.to_thread(ensure_dirs)
+
+    if settings.LOOP_WATCHDOG:
+        start_loop_watchdog(settings.LOOP_LAG_THRESHOLD_MS)
 
     bot = create_bot()
     dp = Dispatcher()
     dp.include_router(main_router)
+    # start_polling() passes extra kwargs to handlers as context data,
+    # so lifecycle hooks have to be registered on the dispatcher
+    dp.shutdown.register(on_shutdown)
 
     await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot, on_shutdown=on_shutdown)
+    job_watchdog.on_tick = evict_idle_chat_locks
+    job_watchdog.start()
+    await resume_interrupted_jobs(bot)
+    await dp.start_polling(bot)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main())
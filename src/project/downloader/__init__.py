@@ -1,7 +1,21 @@
-from .ytdlp_client import extract_info, download, ProgressHook
+from .result import DownloadResult
+from .ytdlp_client import (
+    extract_info,
+    extract_playlist_urls,
+    download,
+    menu_options,
+    ProgressHook,
+    EmptyDownloadError,
+    MediaTooLongError,
+)
 
 __all__ = [
     "extract_info",
+    "extract_playlist_urls",
     "download",
+    "menu_options",
     "ProgressHook",
+    "DownloadResult",
+    "EmptyDownloadError",
+    "MediaTooLongError",
 ]
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from typing import Any
+
+
+def _codec(value: Any) -> str | None:
+    return None if value in (None, "none") else str(value)
+
+
+@dataclass(frozen=True)
+class DownloadResult:
+    """
+    The finished file of one download, as reported by yt-dlp's
+    postprocessor hooks (after merging and moving).
+    """
+
+    path: str
+    size: int
+    ext: str | None = None
+    vcodec: str | None = None
+    acodec: str | None = None
+    duration: float | None = None
+    width: int | None = None
+    height: int | None = None
+    title: str | None = None
+
+    @classmethod
+    def from_info(cls, info: dict[str, Any], path: str, size: int) -> "DownloadResult":
+        return cls(
+            path=path,
+            size=size,
+            ext=info.get("ext"),
+            vcodec=_codec(info.get("vcodec")),
+            acodec=_codec(info.get("acodec")),
+            duration=info.get("duration"),
+            width=info.get("width"),
+            height=info.get("height"),
+            title=info.get("title"),
+        )
+
+    @property
+    def has_video(self) -> bool:
+        return self.vcodec is not None
+
+    @property
+    def streamable(self) -> bool:
+        """An mp4 Telegram clients play inline (H.264 video, AAC audio if any)."""
+        return (
+            self.ext == "mp4"
+            and (self.vcodec or "").startswith(("avc1", "h264"))
+            and (self.acodec is None or self.acodec.startswith(("mp4a", "aac")))
+        )
+
+    def with_file(self, path: str, size: int, **changes: Any) -> "DownloadResult":
+        """Result of a postprocessing step that replaced the file."""
+        return replace(self, path=path, size=size, **changes)
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
-from typing import Any, Callable, Dict, Optional
+from http.cookiejar import CookieJar
+from typing import Any, Callable, Dict, Optional, Sequence
 import os
-import glob
 import logging
 import yt_dlp
+from yt_dlp.utils import DownloadCancelled
+
+from .result import DownloadResult
 
 
 log = logging.getLogger(__name__)
@@ -12,39 +15,152 @@ log = logging.getLogger(__name__)
 ProgressHook = Callable[[Dict[str, Any]], None]
 
 
-def extract_info(url: str, cookies_file: str | None = None) -> Dict[str, Any]:
+class EmptyDownloadError(RuntimeError):
+    """yt-dlp finished but left no (or an empty) file."""
+
+
+class MediaTooLongError(DownloadCancelled):
+    """
+    Rejected by the early duration check, before format processing. A
+    DownloadCancelled, so the site's health doesn't suffer for it.
+    """
+
+    def __init__(self, duration: float):
+        super().__init__(f"media is {duration:.0f}s long")
+        self.duration = duration
+
+
+class FileTooLargeError(DownloadCancelled):
+    """The download outgrew max_filesize (e.g. the job's RAM reservation)."""
+
+    def __init__(self, limit: int):
+        super().__init__(f"download is larger than {limit} bytes")
+        self.limit = limit
+
+
+def menu_options(player_clients: Sequence[str] = ()) -> dict[str, Any]:
+    """
+    yt-dlp options for the "menu" profile: only what the format menus
+    need (formats, sizes, duration). HLS manifests, translated subtitles
+    and the watch-page "next" data are skipped; player_clients limits the
+    YouTube clients queried (empty = yt-dlp's defaults).
+    """
+    youtube: dict[str, list[str]] = {
+        "skip": ["hls", "translated_subs"],
+        "player_skip": ["initial_data"],
+    }
+    if player_clients:
+        youtube["player_client"] = list(player_clients)
+    return {
+        "getcomments": False,
+        "writesubtitles": False,
+        "writeautomaticsub": False,
+        "extractor_args": {"youtube": youtube},
+    }
+
+
+def _set_egress(ydl_opts: dict[str, Any], source_address: str | None, proxy: str | None) -> None:
+    if source_address:
+        ydl_opts["source_address"] = source_address
+    if proxy:
+        ydl_opts["proxy"] = proxy
+
+
+def _use_cookies(ydl: yt_dlp.YoutubeDL, cookies: CookieJar | None) -> None:
+    # in-memory jar instead of re-parsing a cookies.txt for every YoutubeDL
+    if cookies is None:
+        return
+    for c in cookies:
+        ydl.cookiejar.set_cookie(c)
+
+
+def _keep_cookies(ydl: yt_dlp.YoutubeDL, cookies: CookieJar | None) -> None:
+    # carry refreshed session cookies back into the job's jar
+    if cookies is None:
+        return
+    for c in ydl.cookiejar:
+        cookies.set_cookie(c)
+
+
+def extract_info(
+    url: str,
+    cookies_file: str | None = None,
+    extractor_retries: int = 3,
+    cookies: CookieJar | None = None,
+    source_address: str | None = None,
+    proxy: str | None = None,
+    options: dict[str, Any] | None = None,
+    max_duration: float | None = None,
+) -> Dict[str, Any]:
+    """
+    Metadata extraction. options: extra yt-dlp options (see menu_options).
+
+    With max_duration the raw extractor result is checked before yt-dlp
+    processes it (format sorting and checks, nested url resolution), and
+    MediaTooLongError is raised for longer media.
+    """
     ydl_opts: dict[str, Any] = {
         "quiet": True,
         "no_warnings": True,
         "noplaylist": True,
+        "extractor_retries": extractor_retries,
+        "socket_timeout": 20,
+        **(options or {}),
     }
     if cookies_file:
         ydl_opts["cookiefile"] = cookies_file
+    _set_egress(ydl_opts, source_address, proxy)
 
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        return ydl.extract_info(url, download=False)
+        _use_cookies(ydl, cookies)
+        info = ydl.extract_info(url, download=False, process=False)
+        duration = (info or {}).get("duration")
+        if max_duration and isinstance(duration, (int, float)) and duration > max_duration:
+            raise MediaTooLongError(duration)
+        info = ydl.process_ie_result(info, download=False)
+        _keep_cookies(ydl, cookies)
+        return info
 
 
-def _pick_best_existing_file(out_dir: str, video_id: str) -> Optional[str]:
-    if not video_id:
-        return None
+def extract_playlist_urls(
+    url: str,
+    cookies_file: str | None = None,
+    limit: int = 50,
+    cookies: CookieJar | None = None,
+    source_address: str | None = None,
+    proxy: str | None = None,
+) -> list[str] | None:
+    """
+    Flat (no per-entry extraction) playlist listing.
 
-    patterns = [
-        os.path.join(out_dir, f"*[{video_id}].*"),
-        os.path.join(out_dir, f"*{video_id}*"),
-    ]
-    candidates: list[str] = []
-    for p in patterns:
-        candidates.extend(glob.glob(p))
-
-    candidates = [
-        c for c in candidates
-        if os.path.isfile(c) and not c.endswith(".part") and os.path.getsize(c) > 0
-    ]
-    if not candidates:
+    Returns entry URLs, or None if the URL is not a playlist.
+    """
+    ydl_opts: dict[str, Any] = {
+        "quiet": True,
+        "no_warnings": True,
+        "noplaylist": False,
+        "extract_flat": "in_playlist",
+        "playlistend": limit,
+    }
+    if cookies_file:
+        ydl_opts["cookiefile"] = cookies_file
+    _set_egress(ydl_opts, source_address, proxy)
+
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        _use_cookies(ydl, cookies)
+        info = ydl.extract_info(url, download=False)
+
+    if not info or info.get("_type") != "playlist":
         return None
 
-    return max(candidates, key=lambda x: os.path.getsize(x))
+    urls: list[str] = []
+    for entry in info.get("entries") or []:
+        if not entry:
+            continue
+        u = entry.get("webpage_url") or entry.get("url")
+        if u and u not in urls:
+            urls.append(u)
+    return urls[:limit]
 
 
 def download(
@@ -52,23 +168,59 @@ def download(
     format_id: str,
     out_dir: str,
     progress_hook: Optional[ProgressHook] = None,
-    to_mp3: bool = False,
     cookies_file: str | None = None,
-) -> str:
+    merge_output_format: str = "mp4",
+    concurrent_fragments: int = 1,
+    external_downloader: str | None = None,
+    external_downloader_args: list[str] | None = None,
+    retries: int = 10,
+    fragment_retries: int = 10,
+    extractor_retries: int = 5,
+    cookies: CookieJar | None = None,
+    source_address: str | None = None,
+    proxy: str | None = None,
+    section: tuple[float, float] | None = None,
+    max_filesize: int | None = None,
+) -> DownloadResult:
     """
-    Downloads media using yt-dlp and returns a path to the final file.
-
-    If to_mp3=True, yt-dlp will extract audio and convert it to mp3 using ffmpeg.
-    (ffmpeg must be installed on the machine).
+    Downloads media using yt-dlp and returns the final file with its
+    metadata, taken from the postprocessor hooks (no directory scans).
+    Conversion to mp3 is not done here (see services.audio).
 
     cookies_file: path to cookies.txt (optional).
+    cookies: already loaded cookie jar, used instead of cookies_file.
+    source_address / proxy: egress IP or proxy URL for this job.
+
+    merge_output_format: container for "video+audio" selections. It should
+    accept both codecs as is, so ffmpeg only stream-copies when merging.
+
+    concurrent_fragments: how many HLS/DASH fragments are fetched at once.
+    external_downloader: executable (e.g. "aria2c") used instead of the
+    native downloader, with optional extra arguments.
+
+    section: (start, end) in seconds; only that time range is fetched.
+
+    max_filesize: bytes all downloaded files together may take; past it
+    FileTooLargeError is raised.
     """
     os.makedirs(out_dir, exist_ok=True)
 
     hooks = []
+    guard = _SizeGuard(max_filesize) if max_filesize else None
+    if guard:
+        hooks.append(guard)
     if progress_hook:
         hooks.append(progress_hook)
 
+    # info_dict after the last postprocessor (merger, MoveFiles) holds
+    # the final path and the streams that ended up in it
+    final: dict[str, Any] = {}
+
+    def pp_hook(d: dict[str, Any]) -> None:
+        if d.get("status") == "finished":
+            final.clear()
+            final.update(d.get("info_dict") or {})
+
     ydl_opts: dict[str, Any] = {
         "quiet": True,
         "no_warnings": True,
@@ -76,51 +228,67 @@ def download(
         "format": format_id,
         "outtmpl": os.path.join(out_dir, "%(title).200s [%(id)s].%(ext)s"),
         "progress_hooks": hooks,
-        "merge_output_format": "mp4",
-        "retries": 10,
-        "fragment_retries": 10,
+        "postprocessor_hooks": [pp_hook],
+        "merge_output_format": merge_output_format,
+        "retries": retries,
+        "fragment_retries": fragment_retries,
         "file_access_retries": 5,
-        "extractor_retries": 5,
+        "extractor_retries": extractor_retries,
         "socket_timeout": 20,
     }
 
     if cookies_file:
         ydl_opts["cookiefile"] = cookies_file
+    _set_egress(ydl_opts, source_address, proxy)
+
+    if concurrent_fragments > 1:
+        ydl_opts["concurrent_fragment_downloads"] = concurrent_fragments
+
+    if external_downloader:
+        ydl_opts["external_downloader"] = {"default": external_downloader}
+        if external_downloader_args:
+            ydl_opts["external_downloader_args"] = {"default": list(external_downloader_args)}
 
-    if to_mp3:
-        # Convert extracted audio to mp3 via ffmpeg
-        ydl_opts["postprocessors"] = [{
-            "key": "FFmpegExtractAudio",
-            "preferredcodec": "mp3",
-            "preferredquality": "192",
-        }]
+    if section is not None:
+        # ffmpeg reads just this range; cuts snap to the nearest keyframes
+        # (stream copy, no re-encode), so the clip may start a bit early
+        ydl_opts["download_ranges"] = yt_dlp.utils.download_range_func(None, [section])
+        ydl_opts["force_keyframes_at_cuts"] = False
 
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(url, download=True)
-
-        # Sometimes yt-dlp provides direct filepath
-        fp = info.get("filepath")
-        if fp and os.path.exists(fp) and os.path.getsize(fp) > 0 and not fp.endswith(".part"):
-            return fp
-
-        # Sometimes filepaths are inside requested_downloads
-        req = info.get("requested_downloads")
-        if isinstance(req, list) and req:
-            for item in reversed(req):
-                fp2 = item.get("filepath")
-                if fp2 and os.path.exists(fp2) and os.path.getsize(fp2) > 0 and not fp2.endswith(".part"):
-                    return fp2
-
-        # Try prepared filename
-        try:
-            p = ydl.prepare_filename(info)
-            if p and os.path.exists(p) and os.path.getsize(p) > 0 and not p.endswith(".part"):
-                return p
-        except Exception:
-            pass
-
-        best = _pick_best_existing_file(out_dir, info.get("id", ""))
-        if best:
-            return best
-
-        raise RuntimeError("The downloaded file is empty or missing")
+        _use_cookies(ydl, cookies)
+        ydl.extract_info(url, download=True)
+        _keep_cookies(ydl, cookies)
+
+    path = final.get("filepath")
+    try:
+        size = os.stat(path).st_size if path else 0
+    except OSError:
+        size = 0
+    if not size:
+        if guard and guard.tripped:
+            raise FileTooLargeError(max_filesize)
+        raise EmptyDownloadError("The downloaded file is empty or missing")
+    return DownloadResult.from_info(final, path, size)
+
+
+class _SizeGuard:
+    """
+    Progress hook that stops the download once the files outgrow limit.
+    Used instead of yt-dlp's own max_filesize, which skips a too big
+    response without an error, so the result looks merely empty.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.tripped = False
+        self._done: dict[str, int] = {}
+
+    def __call__(self, d: dict[str, Any]) -> None:
+        if d.get("status") not in ("downloading", "finished"):
+            return
+        self._done[d.get("filename") or ""] = d.get("downloaded_bytes") or 0
+        total = d.get("total_bytes") or 0
+        if sum(self._done.values()) > self.limit or total > self.limit:
+            self.tripped = True
+            raise FileTooLargeError(self.limit)
@@ -3,15 +3,21 @@ from aiogram import Router
 from .start import router as start_router
 from .download import router as download_router
 from .help import router as help_router
+from .repeat import router as repeat_router
+from .ops import router as ops_router
 
 router = Router()
 router.include_router(start_router)
 router.include_router(download_router)
 router.include_router(help_router)
+router.include_router(repeat_router)
+router.include_router(ops_router)
 
 __all__ = [
     "router",
     "start_router",
     "download_router",
     "help_router",
+    "repeat_router",
+    "ops_router",
 ]
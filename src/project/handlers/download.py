@@ -1,12 +1,16 @@
 from __future__ import annotations
 
 import asyncio
+import logging
 import re
 import time
-from typing import Any
-from collections import defaultdict
+import uuid
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, AsyncIterator
+from collections import Counter, defaultdict
 
-from aiogram import F
+from aiogram import Bot, F
 from aiogram import Router
 from aiogram.types import (
     Message,
@@ -16,24 +20,55 @@ from aiogram.types import (
 )
 from aiogram.fsm.context import FSMContext
 
-from project.downloader.ytdlp_client import extract_info
+from project.downloader.result import DownloadResult
+from project.downloader.ytdlp_client import EmptyDownloadError, FileTooLargeError, MediaTooLongError
+from project.services.batch import BatchProgress, run_batch
+from project.services.clip import Clip, find_clip, fit_clip, fmt_clip, parse_clip
 from project.services.formats import build_audio_menu, build_video_menu
 from project.services.download import (
     DownloadRequest,
-    make_job_dir,
     cleanup_dir,
     download_and_prepare_sync,
+    extract_info_sync,
+    playlist_urls_sync,
 )
-from project.services.uploader import send_file_smart
+from project.middlewares.ratelimit import RateLimitMiddleware, quota_text
+from project.services.health import SiteThrottledError
+from project.services.jobs import JobCancelled, job_registry
+from project.services.journal import JobRecord, job_journal
+from project.services.mediacache import upload_cache
+from project.services.mediakey import dedupe_urls, media_key
+from project.services.policy import QualityPolicy, pick_format
+from project.services.prefs import prefs_store
+from project.services.quota import QuotaExceededError, quota_store
+from project.services.scheduler import job_scheduler
+from project.services.scratch import JobPlacement, place_job, read_if_small
+from project.services.splitter import split_media
+from project.services.uploader import max_file_size, send_file_smart, send_parts, upload_limit
 from project.states.download import DownloadStates
 from project.utils.config import settings
 
+log = logging.getLogger(__name__)
+
 router = Router()
+router.message.middleware(RateLimitMiddleware())
+router.callback_query.middleware(RateLimitMiddleware())
 
 URL_RE = re.compile(r"https?://\S+")
 
 # Prevent parallel downloads per chat
 _chat_locks: dict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
+# coroutines holding or waiting for a chat's lock, so idle ones can be evicted
+_chat_lock_users: Counter[int] = Counter()
+
+# journal entries older than this are dropped instead of resumed
+_RESUME_MAX_AGE = 24 * 3600
+_resume_tasks: set[asyncio.Task] = set()
+
+_PAUSED_TEXT = "⏸ Бот временно не принимает новые загрузки. Попробуй чуть позже."
+_CANCELLED_TEXT = "🛑 Загрузка отменена администратором."
+_STUCK_TEXT = "⌛️ Загрузка зависла и была остановлена.\nПопробуй ещё раз позже или выбери другое качество."
+_SLOW_SITE_TEXT = "⌛️ Сайт слишком долго отвечает. Попробуй позже."
 
 
 def kb_type() -> InlineKeyboardMarkup:
@@ -44,6 +79,7 @@ def kb_type() -> InlineKeyboardMarkup:
                 InlineKeyboardButton(text="🎧 Аудио (mp3)", callback_data="dl:type:audio_mp3"),
                 InlineKeyboardButton(text="🎧 Аудио (ориг.)", callback_data="dl:type:audio_orig"),
             ],
+            [InlineKeyboardButton(text="✂️ Фрагмент", callback_data="dl:clip")],
             [InlineKeyboardButton(text="❌ Отмена", callback_data="dl:cancel")],
         ]
     )
@@ -58,6 +94,145 @@ def kb_formats(menu: list[dict[str, Any]]) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
+BATCH_POLICIES = [
+    QualityPolicy(media="video"),
+    QualityPolicy(media="video", max_height=720),
+    QualityPolicy(media="video", max_height=480),
+    QualityPolicy(media="audio", audio_mode="mp3"),
+    QualityPolicy(media="audio", audio_mode="orig"),
+]
+
+
+def kb_batch() -> InlineKeyboardMarkup:
+    rows = [
+        [InlineKeyboardButton(text=p.label, callback_data=f"dl:batch:{p.encode()}")]
+        for p in BATCH_POLICIES
+    ]
+    rows.append([InlineKeyboardButton(text="❌ Отмена", callback_data="dl:cancel")])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def kb_change() -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[[InlineKeyboardButton(text="⚙️ Изменить качество", callback_data="dl:change")]]
+    )
+
+
+def extract_urls(text: str) -> list[str]:
+    urls: list[str] = []
+    for u in URL_RE.findall(text):
+        if u not in urls:
+            urls.append(u)
+    return urls
+
+
+def _make_request(
+    url: str,
+    format_id: str,
+    item: dict[str, Any],
+    media: str | None,
+    audio_mode: str | None,
+    extractor: str | None = None,
+    chat_id: int | None = None,
+    user_id: int | None = None,
+    clip: Clip | None = None,
+    duration: Any = None,
+) -> DownloadRequest:
+    filesize = int(item.get("filesize") or 0)
+    if clip and isinstance(duration, (int, float)) and duration > 0:
+        filesize = int(filesize * min(1.0, (clip[1] - clip[0]) / duration))
+    return DownloadRequest(
+        url=url,
+        format_id=format_id,
+        to_mp3=(media == "audio" and audio_mode == "mp3"),
+        acodec=item.get("acodec"),
+        abr=item.get("abr"),
+        container=item.get("container"),
+        extractor=extractor,
+        chat_id=chat_id,
+        filesize=filesize,
+        user_id=user_id,
+        clip_start=clip[0] if clip else None,
+        clip_end=clip[1] if clip else None,
+    )
+
+
+def _policy_for(media: str | None, audio_mode: str | None, item: dict[str, Any]) -> QualityPolicy:
+    if media == "audio":
+        return QualityPolicy(media="audio", audio_mode=audio_mode or "orig")
+    return QualityPolicy(media="video", max_height=item.get("height"))
+
+
+def _throttled_text(e: SiteThrottledError) -> str:
+    return (
+        f"⏳ {e.site} сейчас ограничивает запросы.\n"
+        f"Попробуй через {e.retry_minutes} мин."
+    )
+
+
+def _charge_download(req: DownloadRequest, size: int) -> None:
+    if req.user_id is not None:
+        quota_store.charge_bytes(req.user_id, size)
+
+
+def _upload_key(req: DownloadRequest) -> str:
+    key = f"{req.media_key}|{req.format_id}|{'mp3' if req.to_mp3 else 'orig'}"
+    if req.clip:
+        key += f"|{req.clip[0]:g}-{req.clip[1]:g}"
+    return key
+
+
+async def _send_cached(bot: Bot, chat_id: int, req: DownloadRequest, caption: str | None = None) -> bool:
+    """Re-sends a file already uploaded for the same media and format."""
+    key = _upload_key(req)
+    cached = await asyncio.to_thread(upload_cache.get, key)
+    if not cached:
+        return False
+    file_id, kind = cached
+    try:
+        if kind == "video":
+            await bot.send_video(chat_id=chat_id, video=file_id, caption=caption, supports_streaming=True)
+        else:
+            await bot.send_document(chat_id=chat_id, document=file_id, caption=caption)
+    except Exception as e:
+        log.warning("Cached upload %s failed: %s", key, e)
+        await asyncio.to_thread(upload_cache.forget, key)
+        return False
+    log.info("Sent from upload cache: %s", key)
+    return True
+
+
+async def _send_result(
+    bot: Bot,
+    chat_id: int,
+    result: DownloadResult,
+    data: bytes | None = None,
+    caption: str | None = None,
+) -> str | None:
+    """
+    Sends a finished download; files no transport takes are split into
+    parts rather than thrown away. Returns the file_id of a single upload.
+    """
+    limit = max_file_size()
+    if result.size <= limit:
+        try:
+            return await send_file_smart(
+                bot, chat_id, result.path, caption=caption, data=data, size=result.size, result=result
+            )
+        except RuntimeError as e:
+            if str(e) != "FILE_TOO_BIG":
+                raise
+            limit = upload_limit()
+
+    parts = await asyncio.to_thread(
+        split_media, result.path, limit, result.duration, result.size,
+        timeout=_deadline(settings.POSTPROCESS_TIMEOUT),
+    )
+    log.info("Sending %s in %d parts", result.path, len(parts))
+    await send_parts(bot, chat_id, parts, caption)
+    return None
+
+
 def _fmt_duration(seconds: int) -> str:
     h = seconds // 3600
     m = (seconds % 3600) // 60
@@ -69,23 +244,289 @@ def _fmt_duration(seconds: int) -> str:
     return f"{s}с"
 
 
+def _too_long_text(info: dict[str, Any], clip: Clip | None = None) -> str | None:
+    """Duration guard; for a clip only the clip's length counts."""
+    dur = info.get("duration")
+    if clip is not None:
+        fitted = fit_clip(clip, dur)
+        if fitted is None:
+            return f"⛔️ Фрагмент начинается после конца видео ({_fmt_duration(int(dur))})."
+        dur = fitted[1] - fitted[0]
+    if isinstance(dur, (int, float)) and dur > settings.MAX_DURATION_SECONDS:
+        return (
+            ("⛔️ Слишком длинный фрагмент.\n" if clip else "⛔️ Слишком длинное видео.\n")
+            + f"Длительность: {_fmt_duration(int(dur))}\n"
+            f"Лимит: {_fmt_duration(int(settings.MAX_DURATION_SECONDS))}\n\n"
+            + ("Выбери фрагмент короче." if clip else "Пришли другую ссылку.")
+        )
+    return None
+
+
+def _max_duration(clip: Clip | None) -> float | None:
+    # a clip may come from media of any length; its own length is checked later
+    return None if clip else settings.MAX_DURATION_SECONDS
+
+
+def _deadline(seconds: int) -> float | None:
+    return float(seconds) if seconds > 0 else None
+
+
+def _cancel_text(reason: str | None) -> str:
+    return _CANCELLED_TEXT if reason == "admin" else _STUCK_TEXT
+
+
+async def _extract(url: str, clip: Clip | None = None) -> dict[str, Any]:
+    return await asyncio.wait_for(
+        asyncio.to_thread(extract_info_sync, url, _max_duration(clip)),
+        _deadline(settings.EXTRACT_TIMEOUT),
+    )
+
+
+async def _download(
+    req: DownloadRequest, job_dir: str, hook: Any, job_id: str, max_filesize: int | None = None
+) -> DownloadResult:
+    """
+    Runs the download in a worker thread. The job watchdog normally stops
+    a stuck job; if the thread still hasn't returned well past both phase
+    deadlines, the job is given up on so the chat lock is released.
+    """
+    limit = None
+    if settings.DOWNLOAD_TIMEOUT > 0 and settings.POSTPROCESS_TIMEOUT > 0:
+        limit = settings.DOWNLOAD_TIMEOUT + settings.POSTPROCESS_TIMEOUT + 2 * settings.WATCHDOG_INTERVAL
+    try:
+        return await asyncio.wait_for(
+            asyncio.to_thread(download_and_prepare_sync, req, job_dir, hook, max_filesize), limit
+        )
+    except TimeoutError:
+        log.error("Job %s still running after %ss, abandoning its worker thread", job_id, limit)
+        job_registry.cancel(job_id, "deadline")
+        raise JobCancelled("deadline")
+
+
+def _cancelled_by_ops(job_id: str) -> str | None:
+    """
+    For a CancelledError caught in a job: the cancel reason if it came from
+    JobRegistry.cancel (and nothing else, e.g. shutdown, cancelled the task
+    too). The task is then uncancelled so the job can clean up and report.
+    """
+    if not job_registry.interrupted(job_id):
+        return None
+    task = asyncio.current_task()
+    if task is None or task.uncancel() > 0:
+        return None
+    return job_registry.cancel_reason(job_id) or "admin"
+
+
+async def _download_placed(req: DownloadRequest, placement: JobPlacement, hook: Any, job_id: str) -> DownloadResult:
+    """
+    Downloads into the job's placement. An in-memory job is capped at its
+    RAM reservation; if the file turns out bigger, it starts over on disk.
+    """
+    if placement.in_memory:
+        try:
+            return await _download(req, placement.job_dir, hook, job_id, placement.max_filesize)
+        except FileTooLargeError:
+            log.info("Job %s outgrew its RAM reservation, moving it to disk", job_id)
+            await asyncio.to_thread(placement.spill)
+            job_registry.set_phase(job_id, "downloading", job_dir=placement.job_dir)
+            await asyncio.to_thread(job_journal.update, job_id, job_dir=placement.job_dir)
+    return await _download(req, placement.job_dir, hook, job_id)
+
+
+@asynccontextmanager
+async def _chat_lock(chat_id: int) -> AsyncIterator[None]:
+    """
+    Holds the chat's lock. The lock is looked up and counted as used
+    before the first await, so evict_idle_chat_locks can't drop it in
+    between and let a second download into the same chat.
+    """
+    lock = _chat_locks[chat_id]
+    _chat_lock_users[chat_id] += 1
+    try:
+        async with lock:
+            yield
+    finally:
+        _chat_lock_users[chat_id] -= 1
+        if not _chat_lock_users[chat_id]:
+            del _chat_lock_users[chat_id]
+
+
+def evict_idle_chat_locks() -> int:
+    """Drops the locks of chats with nothing running or waiting; they're recreated on demand."""
+    idle = [
+        chat_id for chat_id, lock in _chat_locks.items()
+        if not lock.locked() and not _chat_lock_users[chat_id]
+    ]
+    for chat_id in idle:
+        del _chat_locks[chat_id]
+    return len(idle)
+
+
+def _state_clip(data: dict[str, Any]) -> Clip | None:
+    clip = data.get("clip")
+    return (float(clip[0]), float(clip[1])) if clip else None
+
+
+def _type_prompt(url: str, clip: Clip | None = None) -> str:
+    text = f"✅ Ссылка:\n<code>{url}</code>\n"
+    if clip:
+        text += f"✂️ Фрагмент: {fmt_clip(clip)}\n"
+    return text + "\nЧто скачать?"
+
+
+_CLIP_HINT = "Формат: <code>начало-конец</code>, например <code>1:02:00-1:04:30</code> или <code>90-150</code>."
+
+
+@router.message(DownloadStates.waiting_clip, F.text & ~F.text.startswith("/"))
+async def on_clip_range(message: Message, state: FSMContext) -> None:
+    text = (message.text or "").strip()
+    if extract_urls(text):
+        # a new link instead of a range
+        await on_any_message(message, state)
+        return
+    try:
+        clip = parse_clip(text)
+    except ValueError:
+        clip = None
+    if clip is None:
+        await message.answer("Не понял фрагмент. " + _CLIP_HINT)
+        return
+
+    data = await state.get_data()
+    url = data.get("url")
+    if not url:
+        await state.clear()
+        await message.answer("Не вижу ссылку. Пришли ссылку заново.")
+        return
+
+    await state.update_data(clip=list(clip))
+    await state.set_state(DownloadStates.waiting_type)
+    await message.answer(_type_prompt(url, clip), reply_markup=kb_type())
+
+
 @router.message(F.text & ~F.text.startswith("/"))
 async def on_any_message(message: Message, state: FSMContext) -> None:
     text = (message.text or "").strip()
-    m = URL_RE.search(text)
-    if not m:
+    urls = extract_urls(text)
+    if not urls:
         return
 
-    url = m.group(0)
+    if len(urls) == 1 and not settings.NOPLAYLIST:
+        try:
+            entries = await asyncio.wait_for(
+                asyncio.to_thread(playlist_urls_sync, urls[0], settings.BATCH_MAX_ITEMS),
+                _deadline(settings.EXTRACT_TIMEOUT),
+            )
+        except Exception:
+            # throttled, timed out or not a playlist: handle it as one link
+            entries = None
+        if entries:
+            urls = entries
+
+    if len(urls) > 1:
+        urls = await asyncio.to_thread(dedupe_urls, urls)
+
+    if len(urls) > 1:
+        urls = urls[: settings.BATCH_MAX_ITEMS]
+        await state.clear()
+        await state.update_data(urls=urls)
+        await state.set_state(DownloadStates.waiting_batch)
+        await message.answer(
+            f"📦 Ссылок: {len(urls)}\n\nКак скачать? Выбор применится ко всем.",
+            reply_markup=kb_batch(),
+        )
+        return
+
+    url = urls[0]
+
+    # "<link> clip 1:02:00-1:04:30" asks for just that part
+    clip = find_clip(URL_RE.sub(" ", text))
+
+    user_id = message.from_user.id if message.from_user else message.chat.id
+    prefs = await asyncio.to_thread(prefs_store.get, user_id)
+    if prefs is not None and prefs.repeat:
+        await _fast_download(message, state, url, prefs.policy, clip)
+        return
 
     await state.clear()
-    await state.update_data(url=url)
+    await state.update_data(url=url, clip=list(clip) if clip else None)
     await state.set_state(DownloadStates.waiting_type)
 
-    await message.answer(
-        f"✅ Ссылка получена:\n<code>{url}</code>\n\nЧто скачать?",
-        reply_markup=kb_type(),
-    )
+    await message.answer(_type_prompt(url, clip), reply_markup=kb_type())
+
+
+async def _fast_download(
+    message: Message,
+    state: FSMContext,
+    url: str,
+    policy: QualityPolicy,
+    clip: Clip | None = None,
+) -> None:
+    """
+    One-tap mode: skip the menus and download right away with the user's
+    remembered policy. The url stays in the state for the "change" button.
+    """
+    chat_id = message.chat.id
+    if _chat_locks[chat_id].locked():
+        await message.answer("⏳ Уже качаю. Подожди завершения 🙂")
+        return
+
+    markup = kb_change()
+    async with _chat_lock(chat_id):
+        await state.clear()
+        await state.update_data(url=url, clip=list(clip) if clip else None)
+
+        progress_msg = await message.answer(
+            f"⚡️ {policy.label}\n<code>{url}</code>\n\nПолучаю список форматов…",
+            reply_markup=markup,
+        )
+
+        try:
+            info = await _extract(url, clip)
+        except MediaTooLongError as e:
+            await progress_msg.edit_text(_too_long_text({"duration": e.duration}))
+            return
+        except TimeoutError:
+            await progress_msg.edit_text(_SLOW_SITE_TEXT, reply_markup=markup)
+            return
+        except SiteThrottledError as e:
+            await progress_msg.edit_text(_throttled_text(e))
+            return
+        except Exception:
+            log.exception("Extraction failed: url=%s", url)
+            await progress_msg.edit_text("❌ Не смог получить информацию по ссылке.", reply_markup=markup)
+            return
+
+        too_long = _too_long_text(info, clip)
+        if too_long:
+            await progress_msg.edit_text(too_long)
+            return
+
+        item = pick_format(info, policy)
+        if item is None:
+            await progress_msg.edit_text("Не нашёл подходящих форматов.", reply_markup=markup)
+            return
+
+        req = _make_request(
+            url, item["id"], item, policy.media, policy.audio_mode, info.get("extractor_key"), chat_id,
+            user_id=message.from_user.id if message.from_user else chat_id,
+            clip=fit_clip(clip, info.get("duration")) if clip else None,
+            duration=info.get("duration"),
+        )
+        await _run_download(message.bot, chat_id, progress_msg, req, markup)
+
+
+@router.callback_query(lambda c: c.data == "dl:change")
+async def on_change_quality(call: CallbackQuery, state: FSMContext) -> None:
+    data = await state.get_data()
+    url = data.get("url")
+    if not url:
+        await call.answer("Пришли ссылку заново.", show_alert=True)
+        return
+
+    await state.set_state(DownloadStates.waiting_type)
+    await call.message.answer(_type_prompt(url, _state_clip(data)), reply_markup=kb_type())
+    await call.answer()
 
 
 @router.callback_query(lambda c: c.data == "dl:cancel")
@@ -100,9 +541,18 @@ async def on_back_to_type(call: CallbackQuery, state: FSMContext) -> None:
     data = await state.get_data()
     url = data.get("url")
     await state.set_state(DownloadStates.waiting_type)
+    await call.message.edit_text(_type_prompt(url, _state_clip(data)), reply_markup=kb_type())
+    await call.answer()
+
+
+@router.callback_query(lambda c: c.data == "dl:clip")
+async def on_clip_requested(call: CallbackQuery, state: FSMContext) -> None:
+    await state.set_state(DownloadStates.waiting_clip)
     await call.message.edit_text(
-        f"✅ Ссылка:\n<code>{url}</code>\n\nЧто скачать?",
-        reply_markup=kb_type(),
+        "✂️ Пришли начало и конец фрагмента.\n" + _CLIP_HINT,
+        reply_markup=InlineKeyboardMarkup(
+            inline_keyboard=[[InlineKeyboardButton(text="⬅️ Назад", callback_data="dl:back:type")]]
+        ),
     )
     await call.answer()
 
@@ -120,18 +570,27 @@ async def on_type_selected(call: CallbackQuery, state: FSMContext) -> None:
 
     await call.answer("Получаю список форматов…")
 
-    info = await asyncio.to_thread(extract_info, url, settings.COOKIES_FILE)
+    clip = _state_clip(data)
+    try:
+        info = await _extract(url, clip)
+    except MediaTooLongError as e:
+        await state.clear()
+        await call.message.edit_text(_too_long_text({"duration": e.duration}))
+        return
+    except TimeoutError:
+        await state.clear()
+        await call.message.edit_text(_SLOW_SITE_TEXT)
+        return
+    except SiteThrottledError as e:
+        await state.clear()
+        await call.message.edit_text(_throttled_text(e))
+        return
 
     # Duration guard
-    dur = info.get("duration")
-    if isinstance(dur, (int, float)) and dur > settings.MAX_DURATION_SECONDS:
+    too_long = _too_long_text(info, clip)
+    if too_long:
         await state.clear()
-        await call.message.edit_text(
-            "⛔️ Слишком длинное видео.\n"
-            f"Длительность: {_fmt_duration(int(dur))}\n"
-            f"Лимит: {_fmt_duration(int(settings.MAX_DURATION_SECONDS))}\n\n"
-            "Пришли другую ссылку."
-        )
+        await call.message.edit_text(too_long)
         return
 
     if choice == "video":
@@ -152,24 +611,271 @@ async def on_type_selected(call: CallbackQuery, state: FSMContext) -> None:
         await call.message.edit_text("Не нашёл подходящих форматов. Попробуй другую ссылку.")
         return
 
+    await state.update_data(menu=menu, extractor=info.get("extractor_key"), duration=info.get("duration"))
     await state.set_state(DownloadStates.waiting_format)
     await call.message.edit_text(title, reply_markup=kb_formats(menu))
 
 
+async def _run_download(
+    bot: Bot,
+    chat_id: int,
+    progress_msg: Message,
+    req: DownloadRequest,
+    markup: InlineKeyboardMarkup | None = None,
+    resumed: JobRecord | None = None,
+) -> bool:
+    """
+    Downloads, sends and cleans up one job, reporting into progress_msg.
+    The caller holds the chat lock. Returns True if the file was sent.
+
+    The job is journaled while it runs; if the task is cancelled (bot
+    shutdown) the journal entry and the job dir are kept for resuming.
+    """
+    loop = asyncio.get_running_loop()
+    last_edit = {"t": 0.0}
+    last_text = {"v": ""}
+
+    def hook(d: dict[str, Any]) -> None:
+        # This hook is called from a worker thread (yt-dlp)
+        job_registry.progress(job_id, d)
+        status = d.get("status")
+
+        now = time.monotonic()
+        if now - last_edit["t"] < 1.2:
+            return
+        last_edit["t"] = now
+
+        if status == "downloading":
+            total = d.get("total_bytes") or d.get("total_bytes_estimate") or 0
+            downloaded = d.get("downloaded_bytes") or 0
+            if total:
+                pct = int(downloaded * 100 / total)
+                text = f"⬇️ Скачиваю… {pct}%"
+            else:
+                text = "⬇️ Скачиваю…"
+        elif status == "finished":
+            text = "✅ Скачано. Обрабатываю…"
+        else:
+            return
+
+        if text == last_text["v"]:
+            return
+        last_text["v"] = text
+
+        # Thread-safe scheduling into the main event loop
+        try:
+            asyncio.run_coroutine_threadsafe(progress_msg.edit_text(text, reply_markup=markup), loop)
+        except Exception:
+            pass
+
+    if req.media_key is None:
+        req.media_key = await asyncio.to_thread(media_key, req.url)
+    if await _send_cached(bot, chat_id, req):
+        await progress_msg.edit_text("✅ Готово! Пришли ещё ссылку 🙂", reply_markup=markup)
+        return True
+
+    if resumed is None and job_registry.paused:
+        await progress_msg.edit_text(_PAUSED_TEXT, reply_markup=markup)
+        return False
+
+    if resumed is None and req.user_id is not None:
+        try:
+            await asyncio.to_thread(quota_store.take_job, req.user_id)
+        except QuotaExceededError as e:
+            await progress_msg.edit_text(quota_text(e))
+            return False
+
+    if resumed is None:
+        job_id = f"{chat_id}-{progress_msg.message_id}"
+        record = JobRecord(
+            job_id=job_id,
+            chat_id=chat_id,
+            message_id=progress_msg.message_id,
+            job_dir="",
+            request=req,
+        )
+        await asyncio.to_thread(job_journal.add, record)
+    else:
+        job_id = resumed.job_id
+    job_registry.add(job_id, chat_id, req.url, task=asyncio.current_task())
+
+    placement: JobPlacement | None = None
+    interrupted = False
+    try:
+        if job_scheduler.would_queue(req.filesize):
+            await progress_msg.edit_text("⏳ В очереди…", reply_markup=markup)
+
+        async with job_scheduler.slot(req.filesize):
+            job_registry.check(job_id)
+            if resumed is not None and resumed.job_dir:
+                placement = JobPlacement(job_dir=resumed.job_dir)
+            else:
+                placement = place_job(chat_id, req.filesize, job_id=job_id)
+            job_registry.set_phase(job_id, "downloading", job_dir=placement.job_dir)
+            await asyncio.to_thread(job_journal.update, job_id, phase="downloading", job_dir=placement.job_dir)
+            return await _download_and_send(bot, chat_id, progress_msg, req, placement, hook, markup, job_id)
+    except JobCancelled as e:
+        await progress_msg.edit_text(_cancel_text(e.reason))
+        return False
+    except asyncio.CancelledError:
+        reason = _cancelled_by_ops(job_id)
+        if reason is None:
+            # shutdown: keep the journal entry and the files for resuming
+            interrupted = True
+            raise
+        await progress_msg.edit_text(_cancel_text(reason))
+        return False
+    finally:
+        job_registry.remove(job_id)
+        if placement is not None:
+            placement.release()
+        if not interrupted:
+            if placement is not None:
+                await asyncio.to_thread(cleanup_dir, placement.job_dir)
+            await asyncio.to_thread(job_journal.remove, job_id)
+
+
+async def resume_interrupted_jobs(bot: Bot) -> None:
+    """
+    Restarts the downloads left in the journal by the previous run. yt-dlp
+    continues from the .part files in their job dirs.
+    """
+    for record in await asyncio.to_thread(job_journal.pending):
+        task = asyncio.create_task(_resume_job(bot, record))
+        _resume_tasks.add(task)
+        task.add_done_callback(_resume_tasks.discard)
+
+
+async def _resume_job(bot: Bot, record: JobRecord) -> None:
+    if time.time() - record.created > _RESUME_MAX_AGE:
+        log.info("Dropping stale job %s", record.job_id)
+        if record.job_dir:
+            await asyncio.to_thread(cleanup_dir, record.job_dir)
+        await asyncio.to_thread(job_journal.remove, record.job_id)
+        return
+
+    log.info("Resuming job %s (%s): %s", record.job_id, record.phase, record.request.url)
+    text = "🔄 Бот перезапускался. Продолжаю загрузку…"
+    try:
+        progress_msg = await bot.edit_message_text(text, chat_id=record.chat_id, message_id=record.message_id)
+    except Exception:
+        progress_msg = None
+    try:
+        if not isinstance(progress_msg, Message):
+            progress_msg = await bot.send_message(record.chat_id, text)
+    except Exception:
+        log.warning("Can't reach chat %s, dropping job %s", record.chat_id, record.job_id)
+        if record.job_dir:
+            await asyncio.to_thread(cleanup_dir, record.job_dir)
+        await asyncio.to_thread(job_journal.remove, record.job_id)
+        return
+
+    async with _chat_lock(record.chat_id):
+        await _run_download(bot, record.chat_id, progress_msg, record.request, resumed=record)
+
+
+async def _report(progress_msg: Message | None, text: str, **kwargs: Any) -> None:
+    if progress_msg is not None:
+        await progress_msg.edit_text(text, **kwargs)
+
+
+async def _download_and_send(
+    bot: Bot,
+    chat_id: int,
+    progress_msg: Message | None,
+    req: DownloadRequest,
+    placement: JobPlacement,
+    hook: Any,
+    markup: InlineKeyboardMarkup | None,
+    job_id: str,
+    caption: str | None = None,
+) -> bool:
+    """
+    Downloads and sends a placed job. Returns True if the file was sent;
+    failures are logged and reported into progress_msg (batch items pass
+    None and are reported in the batch summary instead).
+    """
+    try:
+        result = await _download_placed(req, placement, hook, job_id)
+        await asyncio.to_thread(_charge_download, req, result.size)
+
+    except JobCancelled as e:
+        await _report(progress_msg, _cancel_text(e.reason))
+        return False
+
+    except EmptyDownloadError:
+        await _report(
+            progress_msg,
+            "❌ Скачался пустой файл.\n"
+            "Часто это ограничения сайта (403/429/гео/нужны cookies) или проблемы с фрагментами.\n"
+            "Попробуй другую ссылку или позже."
+        )
+        return False
+
+    except SiteThrottledError as e:
+        log.warning("Download rejected: %s", e)
+        await _report(progress_msg, _throttled_text(e))
+        return False
+
+    except Exception:
+        reason = job_registry.cancel_reason(job_id)
+        if reason is not None:
+            # the watchdog killed its ffmpeg: that's the error we got
+            log.warning("Download stopped (%s): url=%s", reason, req.url)
+            await _report(progress_msg, _cancel_text(reason))
+            return False
+        log.exception("Download failed: url=%s format=%s", req.url, req.format_id)
+        await _report(
+            progress_msg,
+            "❌ Ошибка скачивания.\n"
+            "Если выбирал mp3 — проверь, что установлен ffmpeg.\n"
+            "Если сайт капризный — попробуй cookies (COOKIES_FILE)."
+        )
+        return False
+
+    # sending file (smart)
+    try:
+        job_registry.set_phase(job_id, "sending")
+        await asyncio.to_thread(job_journal.update, job_id, phase="sending")
+        if result.size > max_file_size():
+            text = "✂️ Файл больше лимита Telegram. Режу на части и отправляю…"
+        else:
+            text = "📤 Отправляю файл…"
+        await _report(progress_msg, text, reply_markup=markup)
+        data = await asyncio.to_thread(read_if_small, result.path, result.size) if placement.in_memory else None
+        file_id = await asyncio.wait_for(
+            _send_result(bot, chat_id, result, data=data, caption=caption), _deadline(settings.UPLOAD_TIMEOUT)
+        )
+        if file_id:
+            kind = "video" if result.streamable else "document"
+            await asyncio.to_thread(upload_cache.put, _upload_key(req), file_id, kind)
+        await _report(progress_msg, "✅ Готово! Пришли ещё ссылку 🙂", reply_markup=markup)
+        return True
+
+    except Exception as e:
+        log.exception("Send failed: file=%s err=%s", result.path, e)
+        await _report(
+            progress_msg,
+            "❌ Не смог отправить файл.\n"
+            "Если файл большой — настрой Telethon (TELETHON_API_ID/TELETHON_API_HASH)\n"
+            "или локальный Bot API сервер (BOT_API_URL, BOT_API_LOCAL).\n"
+            "Или выбери меньшее качество."
+        )
+        return False
+
+
 @router.callback_query(lambda c: c.data.startswith("dl:fmt:"))
 async def on_format_selected(call: CallbackQuery, state: FSMContext) -> None:
-    import os
-    import logging
-
-    log = logging.getLogger(__name__)
     chat_id = call.message.chat.id
 
     format_id = call.data.split("dl:fmt:", 1)[1]
 
     data = await state.get_data()
     url = data.get("url")
+    clip = _state_clip(data)
     media = data.get("media")            # "video" | "audio"
     audio_mode = data.get("audio_mode")  # "mp3" | "orig" | None
+    item = next((m for m in data.get("menu") or [] if m.get("id") == format_id), {})
 
     if not url:
         await state.clear()
@@ -177,105 +883,146 @@ async def on_format_selected(call: CallbackQuery, state: FSMContext) -> None:
         await call.answer()
         return
 
-    lock = _chat_locks[chat_id]
-    if lock.locked():
+    if _chat_locks[chat_id].locked():
         await call.answer("⏳ Уже качаю. Подожди завершения 🙂", show_alert=True)
         return
 
-    async with lock:
+    async with _chat_lock(chat_id):
         await state.set_state(DownloadStates.downloading)
 
         progress_msg = await call.message.edit_text("⬇️ Начинаю загрузку…")
         await call.answer()
 
-        loop = asyncio.get_running_loop()
-        last_edit = {"t": 0.0}
-        last_text = {"v": ""}
+        try:
+            req = _make_request(
+                url, format_id, item, media, audio_mode, data.get("extractor"), chat_id,
+                user_id=call.from_user.id,
+                clip=fit_clip(clip, data.get("duration")) if clip else None,
+                duration=data.get("duration"),
+            )
+            ok = await _run_download(call.bot, chat_id, progress_msg, req)
+        finally:
+            await state.clear()
 
-        def hook(d: dict[str, Any]) -> None:
-            # This hook is called from a worker thread (yt-dlp)
-            status = d.get("status")
+        if ok:
+            policy = _policy_for(media, audio_mode, item)
+            await asyncio.to_thread(prefs_store.remember, call.from_user.id, policy)
 
-            now = time.monotonic()
-            if now - last_edit["t"] < 1.2:
-                return
-            last_edit["t"] = now
 
-            if status == "downloading":
-                total = d.get("total_bytes") or d.get("total_bytes_estimate") or 0
-                downloaded = d.get("downloaded_bytes") or 0
-                if total:
-                    pct = int(downloaded * 100 / total)
-                    text = f"⬇️ Скачиваю… {pct}%"
-                else:
-                    text = "⬇️ Скачиваю…"
-            elif status == "finished":
-                text = "✅ Скачано. Обрабатываю…"
-            else:
-                return
+def _batch_text(p: BatchProgress) -> str:
+    if not p.finished:
+        return (
+            f"📦 Пакет: {p.done}/{p.total} готово\n"
+            f"⬇️ В работе: {p.running}\n"
+            f"❌ Ошибок: {p.failed}"
+        )
+    text = f"✅ Пакет готов: {p.done}/{p.total}"
+    if p.failed:
+        failed = "\n".join(f"<code>{u}</code>" for u in list(p.errors)[:10])
+        text += f"\n❌ Не удалось ({p.failed}):\n{failed}"
+    return text
 
-            if text == last_text["v"]:
-                return
-            last_text["v"] = text
 
-            # Thread-safe scheduling into the main event loop
-            try:
-                asyncio.run_coroutine_threadsafe(progress_msg.edit_text(text), loop)
-            except Exception:
-                pass
+@router.callback_query(lambda c: c.data.startswith("dl:batch:"))
+async def on_batch_policy_selected(call: CallbackQuery, state: FSMContext) -> None:
+    chat_id = call.message.chat.id
 
-        job_dir = make_job_dir(settings.DOWNLOADS_DIR, chat_id=chat_id)
+    try:
+        policy = QualityPolicy.decode(call.data.split("dl:batch:", 1)[1])
+    except ValueError:
+        await call.answer()
+        return
 
-        file_path: str | None = None
+    data = await state.get_data()
+    urls = data.get("urls") or []
+    if not urls:
+        await state.clear()
+        await call.message.edit_text("Не вижу ссылок. Пришли их заново.")
+        await call.answer()
+        return
+
+    if _chat_locks[chat_id].locked():
+        await call.answer("⏳ Уже качаю. Подожди завершения 🙂", show_alert=True)
+        return
+
+    async with _chat_lock(chat_id):
+        # the whole batch is one job for the quota: with a per-item charge
+        # everything after USER_JOB_BURST items would fail
         try:
-            to_mp3 = (media == "audio" and audio_mode == "mp3")
+            await asyncio.to_thread(quota_store.take_job, call.from_user.id)
+        except QuotaExceededError as e:
+            await state.clear()
+            await call.message.edit_text(quota_text(e))
+            await call.answer()
+            return
 
-            req = DownloadRequest(
-                url=url,
-                format_id=format_id,
-                to_mp3=to_mp3,
-            )
+        await state.set_state(DownloadStates.downloading)
+        progress_msg = await call.message.edit_text(f"📦 Пакет: 0/{len(urls)} готово\n{policy.label}")
+        await call.answer()
 
-            file_path = await asyncio.to_thread(
-                download_and_prepare_sync,
-                req,
-                job_dir,
-                hook,
-            )
+        last_edit = {"t": 0.0}
+        last_text = {"v": ""}
 
-            if (not file_path) or (not os.path.exists(file_path)) or os.path.getsize(file_path) == 0 or file_path.endswith(".part"):
-                await state.clear()
-                await progress_msg.edit_text(
-                    "❌ Скачался пустой файл.\n"
-                    "Часто это ограничения сайта (403/429/гео/нужны cookies) или проблемы с фрагментами.\n"
-                    "Попробуй другую ссылку или позже."
-                )
+        async def on_update(p: BatchProgress) -> None:
+            now = time.monotonic()
+            if not p.finished and now - last_edit["t"] < 1.2:
                 return
+            text = _batch_text(p)
+            if text == last_text["v"]:
+                return
+            last_edit["t"] = now
+            last_text["v"] = text
+            await progress_msg.edit_text(text)
 
-        except Exception:
-            log.exception("Download failed: url=%s format=%s", url, format_id)
-            await state.clear()
-            await progress_msg.edit_text(
-                "❌ Ошибка скачивания.\n"
-                "Если выбирал mp3 — проверь, что установлен ffmpeg.\n"
-                "Если сайт капризный — попробуй cookies (COOKIES_FILE)."
-            )
-            return
+        async def worker(url: str) -> None:
+            info = await _extract(url)
 
-        # sending file (smart)
-        try:
-            await progress_msg.edit_text("📤 Отправляю файл…")
-            await send_file_smart(call.bot, chat_id, file_path)
-            await progress_msg.edit_text("✅ Готово! Пришли ещё ссылку 🙂")
-
-        except Exception as e:
-            log.exception("Send failed: file=%s err=%s", file_path, e)
-            await progress_msg.edit_text(
-                "❌ Не смог отправить файл.\n"
-                "Если файл большой — настрой Telethon (TELETHON_API_ID/TELETHON_API_HASH).\n"
-                "Или выбери меньшее качество."
+            dur = info.get("duration")
+            if isinstance(dur, (int, float)) and dur > settings.MAX_DURATION_SECONDS:
+                raise RuntimeError(f"too long: {int(dur)}s")
+
+            item = pick_format(info, policy)
+            if item is None:
+                raise RuntimeError("no suitable formats")
+
+            req = _make_request(
+                url, item["id"], item, policy.media, policy.audio_mode, info.get("extractor_key"), chat_id,
+                user_id=call.from_user.id,
             )
+            req.media_key = await asyncio.to_thread(media_key, url)
+            if await _send_cached(call.bot, chat_id, req, caption=info.get("title")):
+                return
+            if job_registry.paused:
+                raise RuntimeError("admissions paused")
+            job_id = f"{chat_id}-{uuid.uuid4().hex[:8]}"
+            job_registry.add(job_id, chat_id, url, task=asyncio.current_task())
+            placement: JobPlacement | None = None
+            try:
+                async with job_scheduler.slot(req.filesize):
+                    job_registry.check(job_id)
+                    placement = place_job(chat_id, req.filesize, job_id=job_id)
+                    job_registry.set_phase(job_id, "downloading", job_dir=placement.job_dir)
+                    sent = await _download_and_send(
+                        call.bot, chat_id, None, req, placement, partial(job_registry.progress, job_id), None,
+                        job_id, caption=info.get("title"),
+                    )
+            except asyncio.CancelledError:
+                reason = _cancelled_by_ops(job_id)
+                if reason is None:
+                    raise
+                raise JobCancelled(reason) from None
+            finally:
+                job_registry.remove(job_id)
+                if placement is not None:
+                    placement.release()
+                    await asyncio.to_thread(cleanup_dir, placement.job_dir)
+            if not sent:
+                raise RuntimeError("download or upload failed")
 
+        try:
+            result = await run_batch(urls, worker, settings.BATCH_CONCURRENCY, on_update)
+            log.info("Batch finished: chat=%s ok=%s failed=%s", chat_id, result.done, result.failed)
         finally:
-            cleanup_dir(job_dir)
             await state.clear()
+
+        await asyncio.to_thread(prefs_store.remember, call.from_user.id, policy)
@@ -10,7 +10,10 @@ async def help_cmd(message: Message):
         "📥 Пришли ссылку на видео или аудио\n\n"
         "🎬 Видео — выбор качества\n"
         "🎧 Аудио (mp3) — универсальный формат\n"
-        "🎧 Аудио (ориг.) — без перекодирования\n\n"
+        "🎧 Аудио (ориг.) — без перекодирования\n"
+        "✂️ Фрагмент — ссылка и время, например <code>ссылка clip 1:02:00-1:04:30</code>\n"
+        "📦 Несколько ссылок в одном сообщении — скачаю пакетом\n"
+        "⚡️ /repeat — быстрый режим: качать сразу с последним выбранным качеством\n\n"
         "⚠️ Если видео недоступно — могут понадобиться cookies\n"
         "📦 Большие файлы отправляются через Telethon"
     )
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import asyncio
+import html
+import logging
+import os
+import shutil
+
+from aiogram import F, Router
+from aiogram.filters import Command
+from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, Message, User
+
+from project.services.jobs import ActiveJob, job_registry
+from project.services.scheduler import job_scheduler
+from project.services.uploader import fallback_rate, telethon_status
+from project.utils.config import settings
+from project.utils.metrics import metrics
+
+log = logging.getLogger(__name__)
+
+router = Router()
+
+_PHASES = {
+    "queued": "⏳ в очереди",
+    "downloading": "⬇️ скачивание",
+    "processing": "⚙️ обработка",
+    "sending": "📤 отправка",
+}
+_LANES = {"small": "малые", "large": "большие"}
+_TELETHON = {
+    "off": "не настроен",
+    "idle": "не запущен",
+    "connected": "подключён",
+    "disconnected": "отключён",
+}
+
+
+def _is_admin(user: User | None) -> bool:
+    return user is not None and user.id in settings.ADMIN_IDS
+
+
+def _size(n: float) -> str:
+    for unit in ("Б", "КБ", "МБ", "ГБ"):
+        if n < 1024 or unit == "ГБ":
+            return f"{n:.0f} {unit}" if unit == "Б" else f"{n:.1f} {unit}"
+        n /= 1024
+    return ""
+
+
+def _elapsed(seconds: float) -> str:
+    s = int(seconds)
+    return f"{s // 60}:{s % 60:02d}"
+
+
+def dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _disk_line() -> str:
+    used = dir_size(settings.DOWNLOADS_DIR)
+    try:
+        disk = shutil.disk_usage(settings.DOWNLOADS_DIR)
+    except OSError:
+        return f"💾 {settings.DOWNLOADS_DIR}: {_size(used)}"
+    return f"💾 {settings.DOWNLOADS_DIR}: {_size(used)}, свободно {_size(disk.free)} из {_size(disk.total)}"
+
+
+def _seconds(s: float) -> str:
+    return f"{s * 1000:.0f} мс" if s < 1 else f"{s:.1f} с"
+
+
+def _wait_line(lanes: dict[str, dict[str, float]]) -> str:
+    parts = [
+        f"{_LANES.get(lane, lane)} p50 {_seconds(s['p50'])} / p95 {_seconds(s['p95'])}"
+        for lane, s in lanes.items()
+    ]
+    return "⏱ Ожидание слота: " + ", ".join(parts)
+
+
+def _lag_line() -> str | None:
+    values = metrics.snapshot()
+    if "event_loop_lag_seconds" not in values:
+        return None  # loop watchdog is off
+    return (
+        f"🌀 Задержка цикла событий: {_seconds(values['event_loop_lag_seconds'])}"
+        f" (макс. {_seconds(values.get('event_loop_lag_max_seconds', 0.0))})"
+    )
+
+
+def _job_line(n: int, job: ActiveJob) -> str:
+    line = f"{n}. {_PHASES.get(job.phase, job.phase)} · чат {job.chat_id} · {_elapsed(job_registry.elapsed(job))}"
+    if job.phase == "downloading":
+        line += f" · {_size(job.speed)}/с"
+        if job.total:
+            line += f" · {job.downloaded * 100 // job.total}%"
+    if job.cancelled:
+        line += " · 🛑 отменяется"
+    return line + f"\n<code>{html.escape(job.url[:80])}</code>"
+
+
+def ops_text(jobs: list[ActiveJob], disk_line: str) -> str:
+    lanes = job_scheduler.stats()
+    running = sum(int(s["running"]) for s in lanes.values())
+    waiting = sum(int(s["waiting"]) for s in lanes.values())
+    fallbacks, uploads = fallback_rate()
+
+    lines = [
+        "🛠 <b>Операции</b>",
+        "⏸ Приём новых задач на паузе" if job_registry.paused else "▶️ Приём задач открыт",
+        f"Слоты: {running} в работе, {waiting} в очереди (лимит {settings.MAX_ACTIVE_JOBS or '∞'})",
+        _wait_line(lanes),
+        *filter(None, [_lag_line()]),
+        disk_line,
+        f"📡 Telethon: {_TELETHON.get(telethon_status(), '?')}"
+        + (f", через него {fallbacks} из {uploads} отправок за час" if uploads else ""),
+        "",
+    ]
+    if jobs:
+        lines += [_job_line(i, j) for i, j in enumerate(jobs, 1)]
+    else:
+        lines.append("Задач нет.")
+    return "\n".join(lines)
+
+
+def kb_ops(jobs: list[ActiveJob]) -> InlineKeyboardMarkup:
+    rows = []
+    buttons = [
+        InlineKeyboardButton(text=f"🛑 {i}", callback_data=f"ops:cancel:{j.job_id}")
+        for i, j in enumerate(jobs, 1)
+        if not j.cancelled
+    ]
+    for i in range(0, len(buttons), 4):
+        rows.append(buttons[i:i + 4])
+    if job_registry.paused:
+        toggle = InlineKeyboardButton(text="▶️ Открыть приём", callback_data="ops:resume")
+    else:
+        toggle = InlineKeyboardButton(text="⏸ Пауза приёма", callback_data="ops:pause")
+    rows.append([toggle, InlineKeyboardButton(text="🔄 Обновить", callback_data="ops:refresh")])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+async def _render() -> tuple[str, InlineKeyboardMarkup]:
+    jobs = job_registry.jobs()
+    disk_line = await asyncio.to_thread(_disk_line)
+    return ops_text(jobs, disk_line), kb_ops(jobs)
+
+
+@router.message(Command("ops"))
+async def ops_cmd(message: Message) -> None:
+    if not _is_admin(message.from_user):
+        return
+    text, markup = await _render()
+    await message.answer(text, reply_markup=markup)
+
+
+@router.callback_query(F.data.startswith("ops:"))
+async def on_ops_action(call: CallbackQuery) -> None:
+    if not _is_admin(call.from_user):
+        await call.answer("Нет доступа.", show_alert=True)
+        return
+
+    action, _, job_id = call.data.removeprefix("ops:").partition(":")
+    note = None
+    if action == "cancel":
+        ok = job_registry.cancel(job_id)
+        note = "Отменяю…" if ok else "Задача уже завершилась."
+        if ok:
+            log.warning("Job %s cancelled by admin %s", job_id, call.from_user.id)
+    elif action == "pause":
+        job_registry.paused = True
+        note = "Новые задачи не принимаются."
+        log.warning("Admissions paused by admin %s", call.from_user.id)
+    elif action == "resume":
+        job_registry.paused = False
+        note = "Приём задач открыт."
+        log.warning("Admissions resumed by admin %s", call.from_user.id)
+
+    text, markup = await _render()
+    try:
+        await call.message.edit_text(text, reply_markup=markup)
+    except Exception:
+        # "message is not modified" on a refresh with nothing new
+        pass
+    await call.answer(note)
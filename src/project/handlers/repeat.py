@@ -0,0 +1,31 @@
+import asyncio
+
+from aiogram import Router
+from aiogram.filters import Command
+from aiogram.types import Message
+
+from project.services.prefs import prefs_store
+
+router = Router()
+
+
+@router.message(Command("repeat"))
+async def repeat_cmd(message: Message) -> None:
+    user_id = message.from_user.id if message.from_user else message.chat.id
+    prefs = await asyncio.to_thread(prefs_store.get, user_id)
+    if prefs is None:
+        await message.answer(
+            "Пока нечего повторять 🙂\n"
+            "Скачай что-нибудь, выбрав качество вручную, и я его запомню."
+        )
+        return
+
+    repeat = not prefs.repeat
+    await asyncio.to_thread(prefs_store.set_repeat, user_id, repeat)
+    if repeat:
+        await message.answer(
+            f"⚡️ Быстрый режим включён: {prefs.policy.label}\n"
+            "Ссылки будут скачиваться сразу, без меню."
+        )
+    else:
+        await message.answer("Быстрый режим выключен: снова спрошу качество для каждой ссылки.")
@@ -0,0 +1,6 @@
+from .ratelimit import RateLimitMiddleware, quota_text
+
+__all__ = [
+    "RateLimitMiddleware",
+    "quota_text",
+]
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+from project.services.quota import QuotaExceededError, QuotaStore, quota_store
+
+log = logging.getLogger(__name__)
+
+# callbacks that start extraction or a download
+_WORK_CALLBACKS = ("dl:type:", "dl:fmt:", "dl:batch:")
+
+
+def quota_text(e: QuotaExceededError) -> str:
+    minutes = e.retry_minutes
+    wait = f"{minutes // 60} ч {minutes % 60} мин." if minutes >= 60 else f"{minutes} мин."
+    if e.kind == "bytes":
+        return f"⏳ Дневной лимит трафика исчерпан.\nПопробуй через {wait}"
+    return f"⏳ Слишком много загрузок подряд.\nПопробуй через {wait}"
+
+
+def _starts_work(event: TelegramObject) -> bool:
+    if isinstance(event, CallbackQuery):
+        return (event.data or "").startswith(_WORK_CALLBACKS)
+    if isinstance(event, Message):
+        return "http" in (event.text or "")
+    return False
+
+
+class RateLimitMiddleware(BaseMiddleware):
+    """
+    Turns away links and download callbacks from users who are out of
+    quota, telling them when to come back. Tokens themselves are spent
+    when a job actually starts (see handlers.download).
+    """
+
+    def __init__(self, store: QuotaStore | None = None):
+        self.store = store or quota_store
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None or not self.store.enabled or not _starts_work(event):
+            return await handler(event, data)
+
+        try:
+            await asyncio.to_thread(self.store.check, user.id)
+        except QuotaExceededError as e:
+            log.info("Rate limited: user=%s %s", user.id, e)
+            if isinstance(event, CallbackQuery):
+                await event.answer(quota_text(e), show_alert=True)
+            elif isinstance(event, Message):
+                await event.answer(quota_text(e))
+            return None
+
+        return await handler(event, data)
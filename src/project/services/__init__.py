@@ -1,6 +1,28 @@
 from .formats import build_audio_menu, build_video_menu
-from .download import DownloadRequest, make_job_dir, cleanup_dir, download_and_prepare_sync
+from .download import (
+    DownloadRequest,
+    make_job_dir,
+    cleanup_dir,
+    download_and_prepare_sync,
+    extract_info_sync,
+    playlist_urls_sync,
+)
 from .uploader import send_file_smart, close_telethon_client
+from .audio import AudioPlan, plan_mp3, convert_to_mp3
+from .policy import QualityPolicy, pick_format
+from .batch import BatchProgress, run_batch
+from .health import SiteHealth, SiteThrottledError, site_health
+from .jsonstore import JsonStore
+from .prefs import PrefsStore, UserPrefs, prefs_store
+from .bandwidth import BandwidthManager, BandwidthLease, bandwidth_manager
+from .scratch import RamBudget, JobPlacement, place_job, read_if_small, ram_budget
+from .cookies import CookiePool, CookieAccount, cookie_pool
+from .egress import EgressPool, Endpoint, egress_pool
+from .quota import QuotaStore, QuotaExceededError, quota_store
+from .scheduler import JobScheduler, job_scheduler
+from .journal import JobJournal, JobRecord, job_journal
+from .mediakey import MediaKey, resolve_media_key, media_key, dedupe_urls
+from .mediacache import InfoCache, UploadCache, info_cache, upload_cache
 
 __all__ = [
     # formats
@@ -11,7 +33,67 @@ __all__ = [
     "make_job_dir",
     "cleanup_dir",
     "download_and_prepare_sync",
+    "extract_info_sync",
+    "playlist_urls_sync",
     # uploader
     "send_file_smart",
     "close_telethon_client",
+    # audio postprocessing
+    "AudioPlan",
+    "plan_mp3",
+    "convert_to_mp3",
+    # quality policies
+    "QualityPolicy",
+    "pick_format",
+    # batch mode
+    "BatchProgress",
+    "run_batch",
+    # site health / circuit breaker
+    "SiteHealth",
+    "SiteThrottledError",
+    "site_health",
+    # JSON-file stores
+    "JsonStore",
+    # user preferences
+    "PrefsStore",
+    "UserPrefs",
+    "prefs_store",
+    # bandwidth budget
+    "BandwidthManager",
+    "BandwidthLease",
+    "bandwidth_manager",
+    # small-file mode
+    "RamBudget",
+    "JobPlacement",
+    "place_job",
+    "read_if_small",
+    "ram_budget",
+    # cookie accounts
+    "CookiePool",
+    "CookieAccount",
+    "cookie_pool",
+    # egress addresses / proxies
+    "EgressPool",
+    "Endpoint",
+    "egress_pool",
+    # per-user quotas
+    "QuotaStore",
+    "QuotaExceededError",
+    "quota_store",
+    # job scheduler
+    "JobScheduler",
+    "job_scheduler",
+    # job journal
+    "JobJournal",
+    "JobRecord",
+    "job_journal",
+    # canonical media keys and caches
+    "MediaKey",
+    "resolve_media_key",
+    "media_key",
+    "dedupe_urls",
+    "InfoCache",
+    "UploadCache",
+    "info_cache",
+    "upload_cache",
 ]
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+from project.services.ffmpeg import run_ffmpeg
+from project.utils.config import settings
+
+log = logging.getLogger(__name__)
+
+# Standard MPEG-1 Layer III bitrates (kbps)
+MP3_BITRATES = (32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+
+_MIN_MP3_BITRATE = 64
+
+
+@dataclass(frozen=True)
+class AudioPlan:
+    action: str  # "keep" | "copy" | "encode"
+    bitrate: int | None = None  # kbps, only for "encode"
+
+
+def _is_mp3(codec: str | None) -> bool:
+    return (codec or "").lower().split(".")[0] in ("mp3", "mp3float")
+
+
+def target_bitrate(source_abr: float | None, max_bitrate: int | None = None) -> int:
+    """
+    Smallest standard mp3 bitrate that is not below the source bitrate,
+    capped by max_bitrate. Re-encoding above the source doesn't add quality,
+    only bytes and CPU time.
+    """
+    cap = max_bitrate or settings.MP3_MAX_BITRATE
+    if not source_abr or source_abr <= 0:
+        return cap
+
+    for b in MP3_BITRATES:
+        if b >= _MIN_MP3_BITRATE and b >= source_abr:
+            return min(b, cap)
+    return cap
+
+
+def plan_mp3(
+    ext: str | None,
+    acodec: str | None,
+    abr: float | None,
+    max_bitrate: int | None = None,
+) -> AudioPlan:
+    if (ext or "").lower() == "mp3":
+        return AudioPlan("keep")
+    if _is_mp3(acodec):
+        # mp3 stream in another container: remux only
+        return AudioPlan("copy")
+    return AudioPlan("encode", target_bitrate(abr, max_bitrate))
+
+
+def convert_to_mp3(
+    src: str,
+    acodec: str | None = None,
+    abr: float | None = None,
+    timeout: float | None = None,
+) -> str:
+    """
+    Converts a downloaded audio file to mp3 and returns the new path.
+
+    Files that already are mp3 are returned as is, mp3 streams in other
+    containers are stream-copied, everything else is encoded in the
+    ffmpeg pool at a bitrate derived from the source abr.
+    """
+    path = Path(src)
+    plan = plan_mp3(path.suffix.lstrip("."), acodec, abr)
+    if plan.action == "keep":
+        return str(path)
+
+    dst = path.with_suffix(".mp3")
+    if plan.action == "copy":
+        codec_args = ["-c:a", "copy"]
+    else:
+        codec_args = ["-c:a", "libmp3lame", "-b:a", f"{plan.bitrate}k"]
+
+    log.info("Audio %s -> mp3 (%s%s)", path.name, plan.action, f" {plan.bitrate}k" if plan.bitrate else "")
+    run_ffmpeg(["-i", str(path), "-vn", "-map_metadata", "0", *codec_args, str(dst)], timeout=timeout)
+
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    return str(dst)
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Callable
+
+from project.utils.config import settings
+
+log = logging.getLogger(__name__)
+
+# How far ahead of its rate a job may get (absorbs bursty chunk sizes)
+_BURST_SECONDS = 0.5
+
+
+class BandwidthLease:
+    """
+    A running job's slot in the bandwidth budget.
+
+    `throttle` is meant to be called from yt-dlp's progress hook: it sleeps
+    in the downloading thread whenever the job runs ahead of its current
+    fair share, which holds back the TCP reads. The rate is updated live
+    by the manager as other jobs start and finish.
+    """
+
+    def __init__(
+        self,
+        manager: "BandwidthManager",
+        chat_id: int | None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.manager = manager
+        self.chat_id = chat_id
+        self.rate: float | None = None  # bytes/s, None = unlimited
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._next = 0.0
+        self._seen: dict[str, int] = {}
+
+    def consume(self, nbytes: int) -> float:
+        """Accounts nbytes and sleeps if needed. Returns the delay."""
+        rate = self.rate
+        if not rate or nbytes <= 0:
+            return 0.0
+        with self._lock:
+            now = self._clock()
+            self._next = max(self._next, now - _BURST_SECONDS) + nbytes / rate
+            delay = self._next - now
+        if delay > 0:
+            self._sleep(delay)
+            return delay
+        return 0.0
+
+    def throttle(self, d: dict[str, Any]) -> None:
+        if d.get("status") != "downloading":
+            return
+        key = str(d.get("tmpfilename") or d.get("filename") or "")
+        downloaded = int(d.get("downloaded_bytes") or 0)
+        with self._lock:
+            # the first value seen is the baseline: a resumed .part file
+            # starts at what's already on disk, which took no bandwidth now
+            prev = self._seen.get(key, downloaded)
+            self._seen[key] = downloaded
+        # counters restart for every file (video, then audio)
+        delta = downloaded - prev if downloaded >= prev else downloaded
+        self.consume(delta)
+
+    def release(self) -> None:
+        self.manager.release(self)
+
+    def __enter__(self) -> "BandwidthLease":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.release()
+
+
+class BandwidthManager:
+    """
+    Splits a global download rate across active jobs, max-min fair, with an
+    optional cap per chat (shared by that chat's jobs). 0 means unlimited.
+    """
+
+    def __init__(self, global_rate: int = 0, chat_rate: int = 0):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self._lock = threading.Lock()
+        self._leases: list[BandwidthLease] = []
+
+    def acquire(self, chat_id: int | None = None) -> BandwidthLease:
+        lease = BandwidthLease(self, chat_id)
+        with self._lock:
+            self._leases.append(lease)
+            self._rebalance()
+        return lease
+
+    def release(self, lease: BandwidthLease) -> None:
+        with self._lock:
+            if lease in self._leases:
+                self._leases.remove(lease)
+                self._rebalance()
+
+    @property
+    def active(self) -> int:
+        with self._lock:
+            return len(self._leases)
+
+    def _rebalance(self) -> None:
+        per_chat: dict[int | None, int] = {}
+        for lease in self._leases:
+            per_chat[lease.chat_id] = per_chat.get(lease.chat_id, 0) + 1
+
+        def cap(lease: BandwidthLease) -> float | None:
+            if self.chat_rate and lease.chat_id is not None:
+                return self.chat_rate / per_chat[lease.chat_id]
+            return None
+
+        if not self.global_rate:
+            for lease in self._leases:
+                lease.rate = cap(lease)
+            return
+
+        # water-filling: capped jobs take less, the rest is split evenly
+        leases = sorted(self._leases, key=lambda x: cap(x) or float("inf"))
+        remaining = float(self.global_rate)
+        left = len(leases)
+        for lease in leases:
+            share = remaining / left
+            c = cap(lease)
+            lease.rate = min(share, c) if c is not None else share
+            remaining -= lease.rate
+            left -= 1
+
+        log.debug("Bandwidth rebalanced: %s", [int(x.rate or 0) for x in self._leases])
+
+
+bandwidth_manager = BandwidthManager(
+    global_rate=settings.GLOBAL_DOWNLOAD_RATE,
+    chat_rate=settings.CHAT_DOWNLOAD_RATE,
+)
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchProgress:
+    total: int
+    done: int = 0
+    failed: int = 0
+    running: int = 0
+    errors: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def finished(self) -> bool:
+        return self.done + self.failed >= self.total
+
+
+BatchWorker = Callable[[str], Awaitable[None]]
+BatchUpdate = Callable[[BatchProgress], Awaitable[None]]
+
+
+async def run_batch(
+    urls: list[str],
+    worker: BatchWorker,
+    concurrency: int = 3,
+    on_update: Optional[BatchUpdate] = None,
+) -> BatchProgress:
+    """
+    Runs `worker(url)` for every url with at most `concurrency` in flight.
+
+    Items finish in any order; a failing item is recorded in the progress
+    and doesn't stop the others.
+    """
+    progress = BatchProgress(total=len(urls))
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def notify() -> None:
+        if on_update is None:
+            return
+        try:
+            await on_update(progress)
+        except Exception:
+            log.exception("Batch progress update failed")
+
+    async def run_one(url: str) -> None:
+        async with sem:
+            progress.running += 1
+            try:
+                await worker(url)
+            except Exception as e:
+                log.warning("Batch item failed: url=%s err=%s", url, e)
+                progress.failed += 1
+                progress.errors[url] = str(e) or e.__class__.__name__
+            else:
+                progress.done += 1
+            finally:
+                progress.running -= 1
+        await notify()
+
+    await asyncio.gather(*(run_one(u) for u in urls))
+    return progress
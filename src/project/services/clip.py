@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import re
+from typing import Any
+
+_TIME = r"\d+(?::\d{1,2}){0,2}(?:\.\d+)?"
+_RANGE = rf"({_TIME})\s*(?:-|–|—|\.\.)\s*({_TIME})(?![\w:])"
+_RANGE_RE = re.compile(rf"(?<![\w:.]){_RANGE}")
+# next to a link a range only counts after an explicit marker: "Топ 10-20"
+# or "Матч 3-1" in a forwarded caption is not a request for a fragment
+_MARKED_RE = re.compile(rf"(?:✂️?|\b(?:clip|cut|фрагмент|отрезок)\b)\s*:?\s*{_RANGE}", re.IGNORECASE)
+
+Clip = tuple[float, float]
+
+
+def parse_time(value: str) -> float:
+    """'1:02:03', '62:03' or '3723' -> seconds."""
+    parts = value.split(":")
+    seconds = 0.0
+    for p in parts:
+        seconds = seconds * 60 + float(p)
+    if len(parts) > 1 and any(float(p) >= 60 for p in parts[1:]):
+        raise ValueError(f"bad time: {value}")
+    return seconds
+
+
+def parse_clip(text: str) -> Clip | None:
+    """
+    Finds a "start-end" range in free text (urls already removed).
+    Returns None if there is none; raises ValueError for a bad one.
+    """
+    m = _RANGE_RE.search(text)
+    if m is None:
+        return None
+    return _to_clip(m)
+
+
+def find_clip(text: str) -> Clip | None:
+    """
+    Finds a marked range ("clip 1:00-2:00", "✂️ 90-150") in a message
+    that also carries a link. Anything else, including a marked range
+    that doesn't parse, is ignored.
+    """
+    m = _MARKED_RE.search(text)
+    if m is None:
+        return None
+    try:
+        return _to_clip(m)
+    except ValueError:
+        return None
+
+
+def _to_clip(m: re.Match[str]) -> Clip:
+    start, end = parse_time(m.group(1)), parse_time(m.group(2))
+    if end <= start:
+        raise ValueError("clip end must be after its start")
+    return start, end
+
+
+def fit_clip(clip: Clip, duration: Any) -> Clip | None:
+    """Clamps the clip to the media duration; None if it starts past the end."""
+    start, end = clip
+    if isinstance(duration, (int, float)) and duration > 0:
+        if start >= duration:
+            return None
+        end = min(end, float(duration))
+    return start, end
+
+
+def fmt_time(seconds: float) -> str:
+    s = int(seconds)
+    h, m, s = s // 3600, (s % 3600) // 60, s % 60
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
+
+
+def fmt_clip(clip: Clip) -> str:
+    return f"{fmt_time(clip[0])}–{fmt_time(clip[1])}"
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import copy
+import glob
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.cookiejar import CookieJar, MozillaCookieJar
+from typing import Callable, Iterator
+
+from project.services.health import is_throttle_error
+from project.utils.config import settings
+
+log = logging.getLogger(__name__)
+
+_AUTH_MARKERS = (
+    "sign in",
+    "login required",
+    "log in",
+    "cookies are no longer valid",
+)
+
+
+def resolve_cookie_files(value: str | None) -> list[str]:
+    """
+    COOKIES_FILE may be a single file, a comma-separated list of files,
+    or a directory (every *.txt inside is one account).
+    """
+    if not value:
+        return []
+    paths: list[str] = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if os.path.isdir(part):
+            paths.extend(sorted(glob.glob(os.path.join(part, "*.txt"))))
+        else:
+            paths.append(part)
+    return paths
+
+
+def is_cookie_failure(e: BaseException) -> bool:
+    s = str(e).lower()
+    return is_throttle_error(e) or any(m in s for m in _AUTH_MARKERS)
+
+
+@dataclass
+class CookieAccount:
+    path: str
+    jar: CookieJar
+    uses: int = 0
+    last_used: float = 0.0
+    last_throttled: float = 0.0
+    unhealthy_until: float = 0.0
+    failures: int = field(default=0)
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.path)
+
+
+def _state(jar: CookieJar) -> set[tuple]:
+    return {(c.domain, c.path, c.name, c.value, c.expires) for c in jar}
+
+
+def _copy_jar(jar: CookieJar) -> CookieJar:
+    out = CookieJar()
+    for c in jar:
+        # own Cookie objects: yt-dlp updates values in place
+        out.set_cookie(copy.copy(c))
+    return out
+
+
+def _save_jar(jar: MozillaCookieJar, path: str) -> None:
+    tmp = path + ".tmp"
+    jar.save(tmp, ignore_discard=True, ignore_expires=True)
+    os.replace(tmp, path)
+
+
+class CookiePool:
+    """
+    Cookie files loaded once into in-memory jars, one per account.
+
+    Each job gets the healthy account that was throttled longest ago (ties:
+    least recently used, i.e. round-robin). Accounts whose requests start
+    failing with 403/429/auth errors are benched for `cooldown` seconds.
+    Jobs work on their own copy of the account's jar (jars aren't safe to
+    iterate while another thread adds to them); cookies the site refreshed
+    are merged back after a successful job and written to the file.
+    """
+
+    def __init__(
+        self,
+        paths: list[str],
+        cooldown: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.paths = paths
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._accounts: list[CookieAccount] | None = None
+
+    def _load(self) -> list[CookieAccount]:
+        if self._accounts is None:
+            accounts = []
+            for p in self.paths:
+                jar = MozillaCookieJar()
+                try:
+                    jar.load(p, ignore_discard=True, ignore_expires=True)
+                except (OSError, ValueError) as e:
+                    log.warning("Skipping cookie file %s: %s", p, e)
+                    continue
+                accounts.append(CookieAccount(path=p, jar=jar))
+            log.info("Loaded %s cookie account(s)", len(accounts))
+            self._accounts = accounts
+        return self._accounts
+
+    @property
+    def accounts(self) -> list[CookieAccount]:
+        with self._lock:
+            return list(self._load())
+
+    def acquire(self) -> CookieAccount | None:
+        with self._lock:
+            accounts = self._load()
+            if not accounts:
+                return None
+            now = self._clock()
+            healthy = [a for a in accounts if a.unhealthy_until <= now]
+            if healthy:
+                account = min(healthy, key=lambda a: (a.last_throttled, a.last_used))
+            else:
+                # everyone is benched: take the one that recovers first
+                account = min(accounts, key=lambda a: a.unhealthy_until)
+            account.uses += 1
+            account.last_used = now
+            return account
+
+    def checkout(self, account: CookieAccount) -> CookieJar:
+        """A private copy of the account's jar for one job."""
+        with self._lock:
+            return _copy_jar(account.jar)
+
+    def merge(self, account: CookieAccount, jar: CookieJar) -> None:
+        """Takes the job's cookies back and saves the file if they changed."""
+        with self._lock:
+            before = _state(account.jar)
+            for c in jar:
+                account.jar.set_cookie(copy.copy(c))
+            if _state(account.jar) == before or not isinstance(account.jar, MozillaCookieJar):
+                return
+            try:
+                _save_jar(account.jar, account.path)
+            except OSError as e:
+                log.warning("Can't save cookies to %s: %s", account.path, e)
+
+    def report_success(self, account: CookieAccount) -> None:
+        with self._lock:
+            account.failures = 0
+
+    def report_failure(self, account: CookieAccount) -> None:
+        with self._lock:
+            now = self._clock()
+            account.failures += 1
+            account.last_throttled = now
+            account.unhealthy_until = now + self.cooldown * min(8, 2 ** (account.failures - 1))
+            log.warning("Cookie account %s marked unhealthy (%s failures)", account.name, account.failures)
+
+    @contextmanager
+    def use(self) -> Iterator[CookieJar | None]:
+        """
+        Yields a jar for one yt-dlp call (None if no cookies are configured)
+        and records the outcome for its account.
+        """
+        account = self.acquire()
+        if account is None:
+            yield None
+            return
+        jar = self.checkout(account)
+        try:
+            yield jar
+        except Exception as e:
+            if is_cookie_failure(e):
+                self.report_failure(account)
+            raise
+        else:
+            self.merge(account, jar)
+            self.report_success(account)
+
+
+cookie_pool = CookiePool(resolve_cookie_files(settings.COOKIES_FILE), cooldown=settings.COOKIE_COOLDOWN)
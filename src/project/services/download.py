@@ -1,27 +1,76 @@
 from __future__ import annotations
 
+import logging
+import os
+import shlex
 import shutil
 import uuid
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
-from project.downloader.ytdlp_client import download as ytdlp_download, ProgressHook
+from project.downloader.ytdlp_client import (
+    download as ytdlp_download,
+    extract_info as ytdlp_extract_info,
+    extract_playlist_urls as ytdlp_playlist_urls,
+    menu_options,
+    ProgressHook,
+)
+from project.downloader.result import DownloadResult
+from project.services.audio import convert_to_mp3
+from project.services.bandwidth import bandwidth_manager
+from project.services.cookies import cookie_pool
+from project.services.egress import egress_pool
+from project.services.health import guarded_call, site_health, site_key
+from project.services.mediacache import info_cache
+from project.services.mediakey import media_key
 from project.utils.config import settings
 
+log = logging.getLogger(__name__)
+
 
 @dataclass
 class DownloadRequest:
     url: str
     format_id: str
     to_mp3: bool = False
+    # source audio stream info from the menu, drives mp3 conversion
+    acodec: str | None = None
+    abr: float | None = None
+    # merge container picked by the video menu
+    container: str | None = None
+    # yt-dlp extractor key (e.g. "Youtube"), for per-site tuning
+    extractor: str | None = None
+    # owner chat, for the per-chat bandwidth cap
+    chat_id: int | None = None
+    # estimated result size in bytes (0 = unknown)
+    filesize: int = 0
+    # requesting user, for quotas
+    user_id: int | None = None
+    # canonical "Extractor:id", for the upload cache
+    media_key: str | None = None
+    # time range in seconds: only this part is downloaded
+    clip_start: float | None = None
+    clip_end: float | None = None
+
+    @property
+    def clip(self) -> tuple[float, float] | None:
+        if self.clip_start is None or self.clip_end is None:
+            return None
+        return self.clip_start, self.clip_end
 
 
-def make_job_dir(base_dir: str, chat_id: int | None = None) -> str:
-    job = uuid.uuid4().hex[:12]
+def make_job_dir(base_dir: str, chat_id: int | None = None, job_id: str | None = None) -> str:
+    """
+    Absolute path of a job's working dir (the watchdog finds the job's
+    subprocesses by it). Pass a stable job_id to get the same dir again
+    (and continue its .part files) after a restart.
+    """
+    job = job_id or uuid.uuid4().hex[:12]
+    base = Path(base_dir).absolute()
     if chat_id is None:
-        return str(Path(base_dir) / job)
-    return str(Path(base_dir) / str(chat_id) / job)
+        return str(base / job)
+    return str(base / str(chat_id) / job)
 
 
 def cleanup_dir(path: str) -> None:
@@ -31,16 +80,105 @@ def cleanup_dir(path: str) -> None:
         pass
 
 
+def fragment_options(extractor: str | None) -> dict[str, Any]:
+    """
+    Parallel fragment download settings for a given extractor.
+    """
+    concurrency = settings.FRAGMENT_CONCURRENCY
+    if extractor:
+        concurrency = settings.FRAGMENT_CONCURRENCY_BY_SITE.get(extractor.lower(), concurrency)
+
+    opts: dict[str, Any] = {"concurrent_fragments": max(1, concurrency)}
+    if settings.EXTERNAL_DOWNLOADER:
+        opts["external_downloader"] = settings.EXTERNAL_DOWNLOADER
+        if settings.EXTERNAL_DOWNLOADER_ARGS:
+            opts["external_downloader_args"] = shlex.split(settings.EXTERNAL_DOWNLOADER_ARGS)
+    return opts
+
+
+def extract_info_sync(
+    url: str,
+    max_duration: float | None = None,
+    profile: str | None = None,
+) -> dict[str, Any]:
+    """
+    Metadata extraction under the site's circuit breaker, cached by
+    canonical media key (youtu.be/X and youtube.com/watch?v=X share it).
+
+    The "menu" profile (EXTRACT_PROFILE) skips what the menus don't use;
+    if it comes back without formats the full extraction is used instead.
+    With max_duration longer media fail early with MediaTooLongError.
+
+    Raises SiteThrottledError without touching the network while the
+    site is backing off.
+    """
+    site = site_key(url)
+    profile = profile or settings.EXTRACT_PROFILE
+
+    def extract(options: dict[str, Any] | None) -> dict[str, Any]:
+        retries = site_health.retry_options(site)["extractor_retries"]
+        with cookie_pool.use() as cookies, egress_pool.use(site) as net:
+            return guarded_call(
+                site, ytdlp_extract_info, url, None, retries,
+                cookies=cookies, **net, options=options, max_duration=max_duration,
+            )
+
+    def load() -> dict[str, Any]:
+        if profile != "menu":
+            return extract(None)
+        info = extract(menu_options(settings.MENU_PLAYER_CLIENTS))
+        if info.get("formats"):
+            return info
+        log.info("Menu extraction found no formats, retrying in full: %s", url)
+        return extract(None)
+
+    return info_cache.get_or_load(f"{media_key(url)}|{profile}", load)
+
+
+def playlist_urls_sync(url: str, limit: int) -> list[str] | None:
+    """Playlist probe under the site's circuit breaker, like extract_info_sync."""
+    site = site_key(url)
+    with cookie_pool.use() as cookies, egress_pool.use(site) as net:
+        return guarded_call(site, ytdlp_playlist_urls, url, None, limit, cookies=cookies, **net)
+
+
 def download_and_prepare_sync(
     req: DownloadRequest,
     out_dir: str,
     progress_hook: Optional[ProgressHook] = None,
-) -> str:
-    return ytdlp_download(
-        req.url,
-        req.format_id,
-        out_dir,
-        progress_hook=progress_hook,
-        to_mp3=req.to_mp3,
-        cookies_file=settings.COOKIES_FILE,
-    )
+    max_filesize: int | None = None,
+) -> DownloadResult:
+    site = site_key(req.url)
+    with (
+        bandwidth_manager.acquire(req.chat_id) as lease,
+        cookie_pool.use() as cookies,
+        egress_pool.use(site) as net,
+    ):
+
+        def hook(d: dict[str, Any]) -> None:
+            lease.throttle(d)
+            if progress_hook:
+                progress_hook(d)
+
+        result = guarded_call(
+            site,
+            ytdlp_download,
+            req.url,
+            req.format_id,
+            out_dir,
+            progress_hook=hook,
+            cookies=cookies,
+            **net,
+            merge_output_format=req.container or "mp4",
+            section=req.clip,
+            max_filesize=max_filesize,
+            **fragment_options(req.extractor),
+            **site_health.retry_options(site),
+        )
+    if req.to_mp3:
+        path = convert_to_mp3(
+            result.path, acodec=req.acodec, abr=req.abr, timeout=settings.POSTPROCESS_TIMEOUT or None
+        )
+        if path != result.path:
+            result = result.with_file(path, os.stat(path).st_size, ext="mp3", acodec="mp3", vcodec=None)
+    return result
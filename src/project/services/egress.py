@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator
+
+from project.services.health import is_throttle_error
+from project.utils.config import settings
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class Endpoint:
+    """One way out: a local source address or a proxy URL."""
+
+    source_address: str | None = None
+    proxy: str | None = None
+    active: int = 0
+    last_used: float = 0.0
+    failures: int = 0
+    quarantined_until: float = 0.0
+
+    @property
+    def name(self) -> str:
+        return self.proxy or self.source_address or "default"
+
+    def ydl_opts(self) -> dict[str, Any]:
+        opts: dict[str, Any] = {}
+        if self.source_address:
+            opts["source_address"] = self.source_address
+        if self.proxy:
+            opts["proxy"] = self.proxy
+        return opts
+
+
+class EgressPool:
+    """
+    Spreads jobs over the configured egress IPs.
+
+    "least_loaded" picks the endpoint with the fewest running jobs;
+    "sticky" keeps each site on the same endpoint (so per-IP sessions and
+    cookies stay consistent) until it gets quarantined. Endpoints that
+    get throttled are quarantined for `quarantine` seconds.
+    """
+
+    def __init__(
+        self,
+        endpoints: list[Endpoint],
+        strategy: str = "least_loaded",
+        quarantine: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if strategy not in ("least_loaded", "sticky"):
+            raise ValueError(f"Unknown egress strategy: {strategy!r}")
+        self.endpoints = endpoints
+        self.strategy = strategy
+        self.quarantine = quarantine
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def acquire(self, site: str = "") -> Endpoint | None:
+        with self._lock:
+            if not self.endpoints:
+                return None
+            now = self._clock()
+            healthy = [e for e in self.endpoints if e.quarantined_until <= now]
+            if not healthy:
+                # everything is quarantined: use the one released first
+                healthy = [min(self.endpoints, key=lambda e: e.quarantined_until)]
+
+            if self.strategy == "sticky":
+                # rendezvous hashing: losing one endpoint only moves its sites
+                ep = max(healthy, key=lambda e: zlib.crc32(f"{site}|{e.name}".encode()))
+            else:
+                ep = min(healthy, key=lambda e: (e.active, e.last_used))
+
+            ep.active += 1
+            ep.last_used = now
+            return ep
+
+    def release(self, ep: Endpoint, throttled: bool = False) -> None:
+        with self._lock:
+            ep.active = max(0, ep.active - 1)
+            if not throttled:
+                ep.failures = 0
+                return
+            ep.failures += 1
+            ep.quarantined_until = self._clock() + self.quarantine
+            log.warning("Egress %s quarantined for %.0fs", ep.name, self.quarantine)
+
+    @contextmanager
+    def use(self, site: str = "") -> Iterator[dict[str, Any]]:
+        """Yields yt-dlp options (source_address/proxy) for one call."""
+        ep = self.acquire(site)
+        if ep is None:
+            yield {}
+            return
+        try:
+            yield ep.ydl_opts()
+        except Exception as e:
+            self.release(ep, throttled=is_throttle_error(e))
+            raise
+        else:
+            self.release(ep)
+
+
+def _endpoints_from_settings() -> list[Endpoint]:
+    eps = [Endpoint(source_address=a) for a in settings.SOURCE_ADDRESSES]
+    eps += [Endpoint(proxy=p) for p in settings.PROXIES]
+    return eps
+
+
+egress_pool = EgressPool(
+    _endpoints_from_settings(),
+    strategy=settings.EGRESS_STRATEGY,
+    quarantine=settings.EGRESS_QUARANTINE,
+)
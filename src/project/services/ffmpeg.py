@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import logging
+import shutil
+import subprocess
+import threading
+from typing import Sequence
+
+from project.utils.config import settings
+
+log = logging.getLogger(__name__)
+
+# ffmpeg runs inside worker threads (asyncio.to_thread), so the pool is a
+# plain threading semaphore shared by every job in the process.
+_pool = threading.BoundedSemaphore(max(1, settings.FFMPEG_MAX_PROCS))
+
+# priority is lowered by nice(1) rather than a preexec_fn, which isn't
+# safe to use from threads
+_NICE = shutil.which("nice")
+
+
+class FFmpegError(RuntimeError):
+    pass
+
+
+def run_ffmpeg(args: Sequence[str], timeout: float | None = None) -> None:
+    """
+    Runs `ffmpeg <args>` in the bounded process pool.
+
+    Blocks until a pool slot is free. Encodes run niced so they don't
+    compete with downloads and the event loop for CPU.
+    """
+    cmd = [settings.FFMPEG_BIN, "-hide_banner", "-loglevel", "error", "-nostdin", "-y", *args]
+    if _NICE and settings.FFMPEG_NICE:
+        cmd = [_NICE, "-n", str(settings.FFMPEG_NICE), *cmd]
+
+    with _pool:
+        log.debug("ffmpeg: %s", " ".join(cmd))
+        try:
+            proc = subprocess.run(
+                cmd,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                timeout=timeout,
+            )
+        except FileNotFoundError:
+            raise FFmpegError("ffmpeg is not installed")
+
+    if proc.returncode == 127 and cmd[0] == _NICE:
+        # nice couldn't find ffmpeg
+        raise FFmpegError("ffmpeg is not installed")
+    if proc.returncode != 0:
+        err = proc.stderr.decode("utf-8", "replace").strip()
+        raise FFmpegError(f"ffmpeg exited with {proc.returncode}: {err[-500:]}")
@@ -3,8 +3,15 @@ from __future__ import annotations
 from typing import Any
 
 
-def _filesize(fmt: dict[str, Any]) -> int:
-    return int(fmt.get("filesize") or fmt.get("filesize_approx") or 0)
+def _filesize(fmt: dict[str, Any], duration: Any = None) -> int:
+    size = fmt.get("filesize") or fmt.get("filesize_approx")
+    if size:
+        return int(size)
+    # estimate from the bitrate (kbit/s) when the site doesn't report sizes
+    tbr = fmt.get("tbr") or fmt.get("abr") or fmt.get("vbr")
+    if tbr and isinstance(duration, (int, float)) and duration > 0:
+        return int(tbr * duration * 125)
+    return 0
 
 
 def _mb(n: int) -> str:
@@ -15,6 +22,7 @@ def _mb(n: int) -> str:
 
 def build_audio_menu(info: dict[str, Any], limit: int = 6) -> list[dict[str, Any]]:
     formats = info.get("formats") or []
+    duration = info.get("duration")
     audio = []
     for f in formats:
         if f.get("vcodec") != "none":
@@ -22,13 +30,14 @@ def build_audio_menu(info: dict[str, Any], limit: int = 6) -> list[dict[str, Any
         if f.get("acodec") in (None, "none"):
             continue
         abr = f.get("abr") or 0
-        size = _filesize(f)
+        size = _filesize(f, duration)
         audio.append(
             {
                 "id": f.get("format_id"),
                 "label": f"🎧 {f.get('ext','audio')} {int(abr) if abr else '?'} kbps (~{_mb(size)})",
                 "abr": abr,
                 "ext": f.get("ext"),
+                "acodec": f.get("acodec"),
                 "filesize": size,
                 "type": "audio",
             }
@@ -38,15 +47,57 @@ def build_audio_menu(info: dict[str, Any], limit: int = 6) -> list[dict[str, Any
     return [a for a in audio if a.get("id")][:limit]
 
 
+# Codecs that can be stream-copied into a container without re-encoding.
+# Order matters: mp4 plays inline in Telegram, so it's preferred.
+_CONTAINERS: list[tuple[str, tuple[str, ...], tuple[str, ...]]] = [
+    ("mp4", ("avc1", "avc3", "h264", "hev1", "hvc1", "h265", "av01"), ("mp4a", "aac", "mp3")),
+    ("webm", ("vp8", "vp9", "vp09", "av01"), ("opus", "vorbis")),
+]
+
+
+def _codec(value: Any) -> str:
+    return str(value or "none").lower().split(".")[0]
+
+
+def _container_for(vcodec: Any, acodec: Any) -> str | None:
+    v, a = _codec(vcodec), _codec(acodec)
+    for container, vcodecs, acodecs in _CONTAINERS:
+        if v in vcodecs and a in acodecs:
+            return container
+    return None
+
+
+def _pair_audio(
+    video: dict[str, Any],
+    audios: list[dict[str, Any]],
+) -> tuple[dict[str, Any] | None, str | None]:
+    """
+    Picks the best audio track that can be muxed with `video` by stream copy
+    and the container to merge into. mkv takes any codec pair, so it is the
+    fallback when neither mp4 nor webm fits.
+    """
+    def best_of(candidates: list[dict[str, Any]]) -> dict[str, Any] | None:
+        return max(candidates, key=lambda a: a.get("abr") or 0, default=None)
+
+    for container, _, _ in _CONTAINERS:
+        best = best_of([a for a in audios if _container_for(video.get("vcodec"), a.get("acodec")) == container])
+        if best is not None:
+            return best, container
+
+    best = best_of(audios)
+    if best is not None:
+        return best, "mkv"
+    return None, None
+
+
 def build_video_menu(info: dict[str, Any], limit: int = 6) -> list[dict[str, Any]]:
     formats = info.get("formats") or []
+    duration = info.get("duration")
 
-    # choosing best audio
-    best_audio = None
-    for f in formats:
-        if f.get("vcodec") == "none" and f.get("acodec") not in (None, "none"):
-            if best_audio is None or (f.get("abr") or 0) > (best_audio.get("abr") or 0):
-                best_audio = f
+    audios = [
+        f for f in formats
+        if f.get("vcodec") == "none" and f.get("acodec") not in (None, "none") and f.get("format_id")
+    ]
 
     # video
     videos = []
@@ -57,8 +108,12 @@ def build_video_menu(info: dict[str, Any], limit: int = 6) -> list[dict[str, Any
         if not h:
             continue
         ext = f.get("ext")
-        size = _filesize(f)
+        size = _filesize(f, duration)
         has_audio = f.get("acodec") not in (None, "none")
+        if has_audio:
+            audio, container = None, ext
+        else:
+            audio, container = _pair_audio(f, audios)
         videos.append(
             {
                 "format_id": f.get("format_id"),
@@ -66,21 +121,27 @@ def build_video_menu(info: dict[str, Any], limit: int = 6) -> list[dict[str, Any
                 "ext": ext,
                 "filesize": size,
                 "has_audio": has_audio,
+                "audio": audio,
+                "container": container,
             }
         )
 
+    container_rank = {"mp4": 3, "webm": 2, "mkv": 1}
+
+    def score(v: dict[str, Any]) -> tuple[int, int]:
+        # muxed > stream-copy pair (mp4, webm, mkv) > video only, then size
+        if v["has_audio"]:
+            rank = 4
+        else:
+            rank = container_rank.get(v["container"] or "", 0)
+        return rank, v["filesize"]
+
     # choosing best video for each height
     by_height: dict[int, dict[str, Any]] = {}
     for v in videos:
         h = v["height"]
         cur = by_height.get(h)
-        if cur is None:
-            by_height[h] = v
-            continue
-
-        score_cur = (1 if cur["has_audio"] else 0, cur["filesize"])
-        score_new = (1 if v["has_audio"] else 0, v["filesize"])
-        if score_new > score_cur:
+        if cur is None or score(v) > score(cur):
             by_height[h] = v
 
     heights = sorted(by_height.keys(), reverse=True)
@@ -92,26 +153,28 @@ def build_video_menu(info: dict[str, Any], limit: int = 6) -> list[dict[str, Any
         if not vid:
             continue
 
-        if v["has_audio"]:
+        audio = v["audio"]
+        container = v["container"] or v.get("ext")
+        size = v.get("filesize", 0)
+        if audio is not None:
+            # merging (stream copy only)
+            fmt_id = f"{vid}+{audio['format_id']}"
+            suffix = " +audio"
+            if size:
+                size += _filesize(audio, duration)
+        else:
+            # muxed or only video
             fmt_id = str(vid)
             suffix = ""
-        else:
-            if best_audio and best_audio.get("format_id"):
-                # merging
-                fmt_id = f"{vid}+{best_audio['format_id']}"
-                suffix = " +audio"
-            else:
-                # only video
-                fmt_id = str(vid)
-                suffix = ""
 
         menu.append(
             {
                 "id": fmt_id,
-                "label": f"🎬 {h}p {v.get('ext','video')}{suffix} (~{_mb(v.get('filesize', 0))})",
+                "label": f"🎬 {h}p {container or 'video'}{suffix} (~{_mb(size)})",
                 "height": h,
-                "ext": v.get("ext"),
-                "filesize": v.get("filesize", 0),
+                "ext": container,
+                "container": container,
+                "filesize": size,
                 "type": "video",
             }
         )
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import logging
+import math
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable
+from urllib.parse import urlsplit
+
+from yt_dlp.utils import DownloadCancelled
+
+from project.utils.config import settings
+
+log = logging.getLogger(__name__)
+
+# yt-dlp defaults we used to hardcode; scaled down as a site gets less healthy
+MAX_RETRIES = 10
+MAX_FRAGMENT_RETRIES = 10
+MAX_EXTRACTOR_RETRIES = 5
+# even an unhealthy site gets a few retries for a blip
+MIN_RETRIES = 3
+
+_THROTTLE_MARKERS = (
+    "http error 429",
+    "too many requests",
+    "http error 403",
+    "forbidden",
+    "rate limit",
+    "rate-limit",
+    "confirm you're not a bot",
+    "confirm you’re not a bot",
+)
+
+# network trouble and server errors: say something about the site's
+# health, unlike private/removed videos, geo-blocks or unsupported URLs
+_TRANSIENT_MARKERS = (
+    "timed out",
+    "timeout",
+    "connection reset",
+    "connection refused",
+    "connection aborted",
+    "remote end closed",
+    "temporary failure in name resolution",
+    "name or service not known",
+    "incompleteread",
+    "bad gateway",
+    "service unavailable",
+)
+_HTTP_5XX = re.compile(r"http error 5\d\d")
+
+_HOST_ALIASES = {
+    "youtu.be": "youtube.com",
+    "youtube-nocookie.com": "youtube.com",
+    "vk.ru": "vk.com",
+    "vm.tiktok.com": "tiktok.com",
+}
+
+
+class SiteThrottledError(RuntimeError):
+    def __init__(self, site: str, retry_after: float):
+        super().__init__(f"{site} is throttled, retry in {int(retry_after)}s")
+        self.site = site
+        self.retry_after = retry_after
+
+    @property
+    def retry_minutes(self) -> int:
+        return max(1, math.ceil(self.retry_after / 60))
+
+
+def site_key(url: str) -> str:
+    host = (urlsplit(url).hostname or "").lower()
+    for prefix in ("www.", "m.", "mobile.", "music."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    return _HOST_ALIASES.get(host, host)
+
+
+def is_throttle_error(e: BaseException) -> bool:
+    s = str(e).lower()
+    return any(m in s for m in _THROTTLE_MARKERS)
+
+
+def is_transient_error(e: BaseException) -> bool:
+    if is_throttle_error(e) or isinstance(e, (TimeoutError, ConnectionError)):
+        return True
+    s = str(e).lower()
+    return bool(_HTTP_5XX.search(s)) or any(m in s for m in _TRANSIENT_MARKERS)
+
+
+@dataclass
+class _SiteState:
+    results: deque[bool]
+    throttles: int = 0  # consecutive throttled failures
+    open_until: float = 0.0
+    last_error: str | None = field(default=None)
+
+
+class SiteHealth:
+    """
+    Per-site success tracker with a circuit breaker.
+
+    After `threshold` consecutive throttled failures (429/403) the site is
+    "open": calls fail fast with SiteThrottledError until the backoff
+    expires. The next call is a trial; another throttle doubles the backoff.
+    """
+
+    def __init__(
+        self,
+        window: int = 20,
+        threshold: int = 3,
+        base_backoff: float = 60.0,
+        max_backoff: float = 30 * 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.window = window
+        self.threshold = threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sites: dict[str, _SiteState] = {}
+
+    def _state(self, site: str) -> _SiteState:
+        st = self._sites.get(site)
+        if st is None:
+            st = _SiteState(results=deque(maxlen=self.window))
+            self._sites[site] = st
+        return st
+
+    def check(self, site: str) -> None:
+        with self._lock:
+            st = self._sites.get(site)
+            if st is None:
+                return
+            left = st.open_until - self._clock()
+        if left > 0:
+            raise SiteThrottledError(site, left)
+
+    def record_success(self, site: str) -> None:
+        with self._lock:
+            st = self._state(site)
+            st.results.append(True)
+            st.throttles = 0
+            st.open_until = 0.0
+
+    def record_failure(self, site: str, throttled: bool, error: str | None = None) -> None:
+        with self._lock:
+            st = self._state(site)
+            st.results.append(False)
+            st.last_error = error
+            if not throttled:
+                return
+            st.throttles += 1
+            if st.throttles >= self.threshold:
+                backoff = min(self.max_backoff, self.base_backoff * 2 ** (st.throttles - self.threshold))
+                st.open_until = self._clock() + backoff
+                log.warning("Circuit open for %s: %s throttled failures, backoff %.0fs", site, st.throttles, backoff)
+
+    def success_rate(self, site: str) -> float:
+        with self._lock:
+            st = self._sites.get(site)
+            if st is None or not st.results:
+                return 1.0
+            return sum(st.results) / len(st.results)
+
+    def retry_options(self, site: str) -> dict[str, int]:
+        rate = self.success_rate(site)
+        return {
+            "retries": max(MIN_RETRIES, round(MAX_RETRIES * rate)),
+            "fragment_retries": max(MIN_RETRIES, round(MAX_FRAGMENT_RETRIES * rate)),
+            "extractor_retries": max(MIN_RETRIES, round(MAX_EXTRACTOR_RETRIES * rate)),
+        }
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        now = self._clock()
+        with self._lock:
+            return {
+                site: {
+                    "success_rate": (sum(st.results) / len(st.results)) if st.results else 1.0,
+                    "throttles": st.throttles,
+                    "open_for": max(0.0, st.open_until - now),
+                    "last_error": st.last_error,
+                }
+                for site, st in self._sites.items()
+            }
+
+
+site_health = SiteHealth(
+    window=settings.HEALTH_WINDOW,
+    threshold=settings.BREAKER_THRESHOLD,
+    base_backoff=settings.BREAKER_BASE_BACKOFF,
+    max_backoff=settings.BREAKER_MAX_BACKOFF,
+)
+
+
+def guarded_call(site: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Runs fn under the site's circuit breaker and records the outcome.
+    Only transient failures count against the site; errors about the
+    video itself (private, removed, geo-blocked, unsupported) don't.
+    """
+    site_health.check(site)
+    try:
+        result = fn(*args, **kwargs)
+    except DownloadCancelled:
+        # stopped on our side, says nothing about the site
+        raise
+    except Exception as e:
+        if is_transient_error(e):
+            site_health.record_failure(site, throttled=is_throttle_error(e), error=str(e)[:200])
+        raise
+    site_health.record_success(site)
+    return result
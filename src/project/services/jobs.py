@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable
+
+from yt_dlp.utils import DownloadCancelled
+
+
+class JobCancelled(DownloadCancelled):
+    """Raised from the progress hook (or between phases) of a cancelled job."""
+
+    def __init__(self, reason: str = "admin"):
+        super().__init__(f"Job cancelled ({reason})")
+        self.reason = reason  # "admin" | "stalled" | "deadline"
+
+
+# phases with no progress hook to raise from: the job's task is cancelled
+_INTERRUPTIBLE = ("queued", "sending")
+
+
+@dataclass
+class ActiveJob:
+    job_id: str
+    chat_id: int
+    url: str
+    phase: str = "queued"  # queued | downloading | processing | sending
+    started: float = 0.0
+    downloaded: int = 0
+    total: int = 0
+    speed: float = 0.0  # bytes/s, as reported by yt-dlp
+    job_dir: str = ""
+    phase_started: float = 0.0
+    last_progress: float = 0.0
+    cancel_reason: str | None = field(default=None, repr=False)
+    # the task running the job, and whether cancel() interrupted it
+    task: asyncio.Task | None = field(default=None, repr=False, compare=False)
+    interrupted: bool = field(default=False, repr=False)
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_reason is not None
+
+
+class JobRegistry:
+    """
+    In-memory table of running and queued jobs for the /ops view, plus
+    the operator controls: cancelling a job and pausing admissions.
+
+    Cancellation is cooperative while downloading: the job's progress hook
+    raises JobCancelled, which yt-dlp treats as a clean abort, and the
+    handler checks it between phases. A job waiting for a slot or sending
+    has its task cancelled instead; the handler tells that apart from a
+    shutdown with interrupted().
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._jobs: dict[str, ActiveJob] = {}
+        self.paused = False
+
+    def add(self, job_id: str, chat_id: int, url: str, task: asyncio.Task | None = None) -> ActiveJob:
+        now = self._clock()
+        job = ActiveJob(
+            job_id=job_id, chat_id=chat_id, url=url, started=now, phase_started=now, last_progress=now,
+            task=task,
+        )
+        with self._lock:
+            self._jobs[job_id] = job
+        return job
+
+    def remove(self, job_id: str) -> None:
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def set_phase(self, job_id: str, phase: str, job_dir: str | None = None) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                self._enter(job, phase)
+                if job_dir is not None:
+                    job.job_dir = job_dir
+
+    def _enter(self, job: ActiveJob, phase: str) -> None:
+        if job.phase != phase:
+            job.phase = phase
+            job.phase_started = job.last_progress = self._clock()
+        if phase != "downloading":
+            job.speed = 0.0
+
+    def progress(self, job_id: str, d: dict[str, Any]) -> None:
+        """yt-dlp progress hook body; raises JobCancelled to stop the download."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            if job.cancel_reason is not None:
+                raise JobCancelled(job.cancel_reason)
+            if d.get("status") == "downloading":
+                self._enter(job, "downloading")
+                downloaded = int(d.get("downloaded_bytes") or 0)
+                if downloaded != job.downloaded:
+                    job.downloaded = downloaded
+                    job.last_progress = self._clock()
+                job.total = int(d.get("total_bytes") or d.get("total_bytes_estimate") or 0)
+                job.speed = float(d.get("speed") or 0.0)
+            elif d.get("status") == "finished":
+                self._enter(job, "processing")
+
+    def check(self, job_id: str) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.cancel_reason is not None:
+                raise JobCancelled(job.cancel_reason)
+
+    def cancel_reason(self, job_id: str) -> str | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.cancel_reason if job is not None else None
+
+    def cancel(self, job_id: str, reason: str = "admin") -> bool:
+        """Thread-safe (the watchdog calls it from a worker thread)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return False
+            if job.cancel_reason is None:
+                job.cancel_reason = reason
+            task = job.task
+        if task is not None and not task.done():
+            # the phase is checked on the loop, where it changes
+            task.get_loop().call_soon_threadsafe(self._interrupt, job_id)
+        return True
+
+    def _interrupt(self, job_id: str) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.task is None or job.interrupted or job.phase not in _INTERRUPTIBLE:
+                return
+            job.interrupted = True
+            job.task.cancel()
+
+    def interrupted(self, job_id: str) -> bool:
+        """True if cancel() cancelled the job's task."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job is not None and job.interrupted
+
+    def elapsed(self, job: ActiveJob) -> float:
+        return self._clock() - job.started
+
+    def jobs(self) -> list[ActiveJob]:
+        """Snapshot, oldest first."""
+        with self._lock:
+            return sorted((replace(j) for j in self._jobs.values()), key=lambda j: j.started)
+
+
+job_registry = JobRegistry()
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import asdict, dataclass, field, fields
+
+from project.services.download import DownloadRequest
+from project.services.jsonstore import JsonStore
+from project.utils.config import settings
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class JobRecord:
+    """What is needed to pick a single download up again after a restart."""
+
+    job_id: str
+    chat_id: int
+    message_id: int
+    job_dir: str
+    request: DownloadRequest
+    phase: str = "queued"  # queued | downloading | sending
+    created: float = field(default_factory=time.time)
+
+    def to_json(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_json(cls, raw: dict) -> "JobRecord":
+        req_fields = {f.name for f in fields(DownloadRequest)}
+        req = DownloadRequest(**{k: v for k, v in raw["request"].items() if k in req_fields})
+        return cls(
+            job_id=raw["job_id"],
+            chat_id=int(raw["chat_id"]),
+            message_id=int(raw["message_id"]),
+            job_dir=raw["job_dir"],
+            request=req,
+            phase=raw.get("phase", "queued"),
+            created=float(raw.get("created") or time.time()),
+        )
+
+
+class JobJournal(JsonStore):
+    """
+    Running jobs persisted to a JSON file, rewritten on every change.
+    Whatever is left in it at startup was interrupted.
+    """
+
+    kind = "job journal"
+
+    def add(self, record: JobRecord) -> None:
+        with self._lock:
+            self._load()[record.job_id] = record.to_json()
+            self._save()
+
+    def update(self, job_id: str, **changes: object) -> None:
+        """Changes top-level fields (phase, job_dir, ...) of a record."""
+        with self._lock:
+            raw = self._load().get(job_id)
+            if raw is None or all(raw.get(k) == v for k, v in changes.items()):
+                return
+            raw.update(changes)
+            self._save()
+
+    def remove(self, job_id: str) -> None:
+        with self._lock:
+            if self._load().pop(job_id, None) is not None:
+                self._save()
+
+    def pending(self) -> list[JobRecord]:
+        with self._lock:
+            raw = list(self._load().values())
+        records = []
+        for r in raw:
+            try:
+                records.append(JobRecord.from_json(r))
+            except (KeyError, TypeError, ValueError):
+                log.warning("Dropping broken journal entry: %r", r)
+        return sorted(records, key=lambda r: r.created)
+
+
+job_journal = JobJournal(settings.JOURNAL_FILE)
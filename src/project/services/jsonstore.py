@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+log = logging.getLogger(__name__)
+
+
+class JsonStore:
+    """
+    A small dict kept in memory and persisted to one JSON file: read once
+    on first use, rewritten atomically (tmp file + os.replace) by _save().
+
+    Subclasses hold self._lock around _load()/_save(). Their methods are
+    blocking, call them via asyncio.to_thread.
+    """
+
+    # what the file holds, for the log
+    kind = "data"
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._data: dict[str, Any] | None = None
+
+    def _load(self) -> dict[str, Any]:
+        if self._data is None:
+            try:
+                self._data = json.loads(self.path.read_text("utf-8"))
+            except FileNotFoundError:
+                self._data = {}
+            except (OSError, ValueError):
+                log.exception("Can't read %s from %s, starting empty", self.kind, self.path)
+                self._data = {}
+        return self._data
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(self._load(), ensure_ascii=False), "utf-8")
+        os.replace(tmp, self.path)
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+from project.services.jsonstore import JsonStore
+from project.utils.config import settings
+
+log = logging.getLogger(__name__)
+
+
+class InfoCache:
+    """
+    Extracted metadata by media key, kept for `ttl` seconds (stream URLs
+    expire). Concurrent loads of the same key wait for the first one.
+    """
+
+    def __init__(self, ttl: float, size: int = 256, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.size = size
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._items: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._loading: dict[str, threading.Lock] = {}
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if self._clock() - item[0] > self.ttl:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return item[1]
+
+    def put(self, key: str, info: dict[str, Any]) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._items[key] = (self._clock(), info)
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def get_or_load(self, key: str, loader: Callable[[], dict[str, Any]]) -> dict[str, Any]:
+        info = self.get(key)
+        if info is not None:
+            return info
+        with self._lock:
+            loading = self._loading.setdefault(key, threading.Lock())
+        with loading:
+            info = self.get(key)
+            if info is not None:
+                return info
+            try:
+                info = loader()
+                # stored before the key's lock goes away, so a caller
+                # arriving in between finds the value, not a free lock
+                self.put(key, info)
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+            return info
+
+
+class UploadCache(JsonStore):
+    """
+    Telegram file_ids of files the bot already sent, by media key and
+    format, so a repeated request is answered without downloading.
+    Persisted to a JSON file (oldest entries dropped past `limit`).
+
+    Each file_id is kept with the kind it was sent as ("document" or
+    "video"): Telegram only accepts it back through the same method.
+    """
+
+    kind = "upload cache"
+
+    def __init__(self, path: str, limit: int = 5000):
+        super().__init__(path)
+        self.limit = limit
+
+    def get(self, key: str) -> tuple[str, str] | None:
+        """(file_id, kind) of a cached upload."""
+        with self._lock:
+            entry = self._load().get(key)
+        if entry is None:
+            return None
+        if isinstance(entry, str):
+            # written before kinds were stored: always a document
+            return entry, "document"
+        return entry["file_id"], entry["kind"]
+
+    def put(self, key: str, file_id: str, kind: str = "document") -> None:
+        entry = {"file_id": file_id, "kind": kind}
+        with self._lock:
+            data = self._load()
+            if data.get(key) == entry:
+                return
+            data.pop(key, None)
+            data[key] = entry
+            for old in list(data)[: max(0, len(data) - self.limit)]:
+                del data[old]
+            self._save()
+
+    def forget(self, key: str) -> None:
+        with self._lock:
+            if self._load().pop(key, None) is not None:
+                self._save()
+
+
+info_cache = InfoCache(settings.INFO_CACHE_TTL)
+upload_cache = UploadCache(settings.UPLOADS_FILE)
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import re
+import threading
+from functools import lru_cache
+from typing import Any, NamedTuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# query parameters that only track where a link was shared from
+_TRACKING_PARAMS = frozenset({
+    "si", "feature", "pp", "t", "start_radio", "ab_channel",
+    "fbclid", "gclid", "yclid", "igshid", "igsh", "mibextid",
+    "ref", "ref_src", "ref_url", "share", "share_id", "share_source",
+    "is_from_webapp", "sender_device", "sender_web_id", "_r", "_t",
+    "from", "spm", "vk_share",
+})
+_TRACKING_PREFIXES = ("utm_",)
+
+# second-level labels that are not the site name (bbc.co.uk -> "bbc")
+_SLD = frozenset({"co", "com", "net", "org", "ac", "gov", "edu", "ne", "or"})
+
+# an escaped domain literal in a _VALID_URL pattern, e.g. "vimeo\.com"
+_LITERAL_HOST = re.compile(r"[a-z0-9]\\\.[a-z]{2,}")
+
+
+class MediaKey(NamedTuple):
+    extractor: str
+    media_id: str
+
+    def __str__(self) -> str:
+        return f"{self.extractor}:{self.media_id}"
+
+
+def canonical_url(url: str) -> str:
+    """
+    Lowercases the host, drops the fragment and tracking parameters and
+    sorts what's left, so equivalent links compare equal.
+    """
+    parts = urlsplit(url.strip())
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k not in _TRACKING_PARAMS and not k.startswith(_TRACKING_PREFIXES)
+    ]
+    # the bot downloads with noplaylist: watch?v=X&list=Y is just video X
+    if any(k == "v" for k, _ in query):
+        query = [(k, v) for k, v in query if k not in ("list", "index")]
+    return urlunsplit((
+        parts.scheme.lower() or "https",
+        parts.netloc.lower(),
+        parts.path or "/",
+        urlencode(sorted(query)),
+        "",
+    ))
+
+
+def _site_label(host: str) -> str:
+    labels = host.split(".")[:-1]
+    for label in reversed(labels):
+        if label not in _SLD:
+            return label
+    return host
+
+
+def _pattern(ie: Any) -> str | None:
+    valid = getattr(ie, "_VALID_URL", None)
+    if not valid:
+        return None
+    if isinstance(valid, (list, tuple)):
+        return " ".join(valid).lower()
+    return str(valid).lower()
+
+
+class _ExtractorIndex:
+    """
+    yt-dlp's extractors in their priority order, with per-site candidate
+    lists: an extractor is tried for a host only if its URL pattern names
+    that site or doesn't name any host at all. The rest are scanned only
+    as a fallback; a hit there is added to the site's candidates, a miss
+    marks the site as fully covered by them. Built on first use.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._all: list[tuple[Any, str]] | None = None
+        self._by_label: dict[str, list[Any]] = {}
+        self._covered: set[str] = set()
+
+    def _load(self) -> list[tuple[Any, str]]:
+        if self._all is None:
+            from yt_dlp.extractor import gen_extractor_classes
+
+            self._all = [
+                (ie, pattern)
+                for ie in gen_extractor_classes()
+                if ie.ie_key() != "Generic" and (pattern := _pattern(ie)) is not None
+            ]
+        return self._all
+
+    def candidates(self, label: str) -> list[Any]:
+        with self._lock:
+            found = self._by_label.get(label)
+            if found is None:
+                found = [
+                    ie for ie, pattern in self._load()
+                    if label in pattern or not _LITERAL_HOST.search(pattern)
+                ]
+                self._by_label[label] = found
+            return found
+
+    def fallback(self, label: str) -> list[Any]:
+        with self._lock:
+            if label in self._covered:
+                return []
+            tried = set(self._by_label.get(label, ()))
+            return [ie for ie, _ in self._load() if ie not in tried]
+
+    def learn(self, label: str, ie: Any | None) -> None:
+        with self._lock:
+            if ie is None:
+                self._covered.add(label)
+                return
+            order = {x: i for i, (x, _) in enumerate(self._load())}
+            found = self._by_label.setdefault(label, [])
+            if ie not in found:
+                self._by_label[label] = sorted([*found, ie], key=order.__getitem__)
+
+
+_index = _ExtractorIndex()
+
+
+def _media_id(ie: Any, url: str) -> str | None:
+    media_id = ie.get_temp_id(url)
+    if media_id:
+        return str(media_id)
+    # some extractors name the group differently (videoid, video_id, ...)
+    m = ie._match_valid_url(url)
+    if m is None:
+        return None
+    groups = m.groupdict()
+    for name, value in groups.items():
+        if value and name.lower().replace("_", "").endswith("id"):
+            return value
+    return None
+
+
+@lru_cache(maxsize=65536)
+def resolve_media_key(url: str) -> MediaKey:
+    """
+    Maps a link to (extractor key, media id) without network access, the
+    way yt-dlp would pick the extractor. Links no extractor claims fall
+    back to ("generic", canonical url).
+    """
+    clean = canonical_url(url)
+    label = _site_label(urlsplit(clean).hostname or "")
+    ie = _first_suitable(_index.candidates(label), clean)
+    if ie is None:
+        fallback = _index.fallback(label)
+        if fallback:
+            ie = _first_suitable(fallback, clean)
+            _index.learn(label, ie)
+    if ie is None:
+        return MediaKey("generic", clean)
+    return MediaKey(ie.ie_key(), _media_id(ie, clean) or clean)
+
+
+def _first_suitable(extractors: list[Any], url: str) -> Any | None:
+    for ie in extractors:
+        if ie.suitable(url):
+            return ie
+    return None
+
+
+def media_key(url: str) -> str:
+    return str(resolve_media_key(url))
+
+
+def dedupe_urls(urls: list[str]) -> list[str]:
+    """Keeps the first link for every distinct media, in order."""
+    seen: set[MediaKey] = set()
+    out: list[str] = []
+    for u in urls:
+        key = resolve_media_key(u)
+        if key not in seen:
+            seen.add(key)
+            out.append(u)
+    return out
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+from project.services.formats import build_audio_menu, build_video_menu
+
+
+@dataclass(frozen=True)
+class QualityPolicy:
+    """
+    A quality choice that can be applied to any link without showing menus,
+    e.g. "video up to 720p" or "audio, mp3, best".
+    """
+
+    media: str  # "video" | "audio"
+    audio_mode: str | None = None  # "mp3" | "orig" (audio only)
+    max_height: int | None = None  # None = best (video only)
+
+    def encode(self) -> str:
+        if self.media == "audio":
+            return f"audio:{self.audio_mode or 'orig'}"
+        return f"video:{self.max_height or 'best'}"
+
+    @classmethod
+    def decode(cls, value: str) -> "QualityPolicy":
+        media, _, arg = value.partition(":")
+        if media == "audio":
+            if arg not in ("mp3", "orig"):
+                raise ValueError(f"Unknown audio mode: {arg!r}")
+            return cls(media="audio", audio_mode=arg)
+        if media == "video":
+            if arg in ("", "best"):
+                return cls(media="video")
+            return cls(media="video", max_height=int(arg))
+        raise ValueError(f"Unknown policy: {value!r}")
+
+    @property
+    def label(self) -> str:
+        if self.media == "audio":
+            return "🎧 Аудио (mp3)" if self.audio_mode == "mp3" else "🎧 Аудио (ориг.)"
+        if self.max_height:
+            return f"🎬 Видео ≤{self.max_height}p"
+        return "🎬 Видео (лучшее)"
+
+
+def pick_format(info: dict[str, Any], policy: QualityPolicy) -> dict[str, Any] | None:
+    """
+    Resolves a policy to a single menu item for the given extracted info.
+    """
+    if policy.media == "audio":
+        menu = build_audio_menu(info, limit=1)
+        return menu[0] if menu else None
+
+    menu = build_video_menu(info, limit=100)
+    if not menu:
+        return None
+    if policy.max_height:
+        fitting = [m for m in menu if m["height"] <= policy.max_height]
+        # nothing small enough: the lowest available is the closest match
+        return fitting[0] if fitting else menu[-1]
+    return menu[0]
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+
+from project.services.jsonstore import JsonStore
+from project.services.policy import QualityPolicy
+from project.utils.config import settings
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class UserPrefs:
+    policy: QualityPolicy
+    repeat: bool = False  # one-tap mode (/repeat): links skip the menus
+
+
+class PrefsStore(JsonStore):
+    """Per-user quality preferences persisted to a small JSON file."""
+
+    kind = "prefs"
+
+    def get(self, user_id: int) -> UserPrefs | None:
+        with self._lock:
+            raw = self._load().get(str(user_id))
+        if not raw:
+            return None
+        try:
+            policy = QualityPolicy.decode(raw["policy"])
+        except (KeyError, ValueError):
+            return None
+        return UserPrefs(policy=policy, repeat=bool(raw.get("repeat", False)))
+
+    def remember(self, user_id: int, policy: QualityPolicy) -> None:
+        with self._lock:
+            data = self._load()
+            raw = data.setdefault(str(user_id), {})
+            if raw.get("policy") == policy.encode():
+                return
+            # one-tap mode stays as the user set it: off until /repeat
+            raw["policy"] = policy.encode()
+            self._save()
+
+    def set_repeat(self, user_id: int, repeat: bool) -> bool:
+        """Returns False if the user has no remembered policy yet."""
+        with self._lock:
+            raw = self._load().get(str(user_id))
+            if not raw or "policy" not in raw:
+                return False
+            raw["repeat"] = repeat
+            self._save()
+        return True
+
+
+prefs_store = PrefsStore(settings.PREFS_FILE)
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import logging
+import math
+import time
+from typing import Callable
+
+from project.services.jsonstore import JsonStore
+from project.utils.config import settings
+
+log = logging.getLogger(__name__)
+
+_DAY = 24 * 3600
+
+
+class QuotaExceededError(RuntimeError):
+    def __init__(self, kind: str, retry_after: float):
+        super().__init__(f"{kind} quota exceeded, retry in {int(retry_after)}s")
+        self.kind = kind  # "jobs" | "bytes"
+        self.retry_after = retry_after
+
+    @property
+    def retry_minutes(self) -> int:
+        return max(1, math.ceil(self.retry_after / 60))
+
+
+class QuotaStore(JsonStore):
+    """
+    Per-user token buckets, persisted to a small JSON file.
+
+    Jobs: USER_JOB_BURST tokens refilled at jobs_per_hour, one per started
+    download. Bytes: a daily allowance refilled continuously; finished
+    downloads are charged afterwards, so a big file can put the user in
+    debt until the bucket refills. A limit of 0 disables that bucket.
+    """
+
+    kind = "quotas"
+
+    def __init__(
+        self,
+        path: str,
+        jobs_per_hour: int = 0,
+        job_burst: int = 1,
+        daily_bytes: int = 0,
+        clock: Callable[[], float] = time.time,
+    ):
+        super().__init__(path)
+        self.jobs_per_hour = jobs_per_hour
+        self.job_burst = max(1, job_burst)
+        self.daily_bytes = daily_bytes
+        self._clock = clock
+
+    @property
+    def enabled(self) -> bool:
+        return self.jobs_per_hour > 0 or self.daily_bytes > 0
+
+    def _save(self) -> None:
+        now = self._clock()
+        # full buckets carry no information
+        self._data = {k: v for k, v in self._load().items() if not self._is_full(v, now)}
+        super()._save()
+
+    def _bucket(self, user_id: int) -> dict[str, float]:
+        """Current bucket of a user, refilled up to now."""
+        now = self._clock()
+        b = self._load().setdefault(
+            str(user_id), {"jobs": float(self.job_burst), "bytes": float(self.daily_bytes), "t": now}
+        )
+        elapsed = max(0.0, now - b["t"])
+        b["jobs"] = min(float(self.job_burst), b["jobs"] + elapsed * self.jobs_per_hour / 3600)
+        b["bytes"] = min(float(self.daily_bytes), b["bytes"] + elapsed * self.daily_bytes / _DAY)
+        b["t"] = now
+        return b
+
+    def _is_full(self, b: dict[str, float], now: float) -> bool:
+        elapsed = max(0.0, now - b["t"])
+        jobs = b["jobs"] + elapsed * self.jobs_per_hour / 3600
+        nbytes = b["bytes"] + elapsed * self.daily_bytes / _DAY
+        return jobs >= self.job_burst and nbytes >= self.daily_bytes
+
+    def _check(self, b: dict[str, float]) -> None:
+        if self.jobs_per_hour > 0 and b["jobs"] < 1:
+            raise QuotaExceededError("jobs", (1 - b["jobs"]) * 3600 / self.jobs_per_hour)
+        if self.daily_bytes > 0 and b["bytes"] <= 0:
+            raise QuotaExceededError("bytes", max(1.0, -b["bytes"] * _DAY / self.daily_bytes))
+
+    def check(self, user_id: int) -> None:
+        """Raises QuotaExceededError if the user can't start a job now."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._check(self._bucket(user_id))
+
+    def take_job(self, user_id: int) -> None:
+        """Like check(), but also spends one job token."""
+        if not self.enabled:
+            return
+        with self._lock:
+            b = self._bucket(user_id)
+            self._check(b)
+            if self.jobs_per_hour > 0:
+                b["jobs"] -= 1
+                self._save()
+
+    def charge_bytes(self, user_id: int, nbytes: int) -> None:
+        if self.daily_bytes <= 0 or nbytes <= 0:
+            return
+        with self._lock:
+            self._bucket(user_id)["bytes"] -= nbytes
+            self._save()
+
+
+quota_store = QuotaStore(
+    settings.QUOTA_FILE,
+    jobs_per_hour=settings.USER_JOBS_PER_HOUR,
+    job_burst=settings.USER_JOB_BURST,
+    daily_bytes=settings.USER_DAILY_BYTES,
+)
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable
+
+from project.utils.config import settings
+from project.utils.metrics import Metrics, metrics as default_metrics
+
+log = logging.getLogger(__name__)
+
+LANES = ("small", "large")
+
+# cost assumed for jobs without any size estimate
+_UNKNOWN_COST = 512 * 1024 ** 2
+
+
+@dataclass
+class _Waiter:
+    cost: int
+    lane: str
+    enqueued: float
+    future: asyncio.Future = field(repr=False)
+
+
+class JobScheduler:
+    """
+    Admits downloads into a fixed number of slots, shortest job first.
+
+    Jobs are split into lanes by estimated size: `small_slots` slots are
+    kept for the small lane, large jobs share the rest. Among the waiting
+    jobs the cheapest goes first, but a job's cost shrinks the longer it
+    waits (halved after `aging` seconds), so big jobs can't starve.
+    slots=0 disables queueing.
+    """
+
+    def __init__(
+        self,
+        slots: int,
+        small_slots: int = 1,
+        small_bytes: int = 50 * 1024 ** 2,
+        aging: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+        metrics: Metrics | None = None,
+        history: int = 200,
+    ):
+        self.slots = slots
+        self.small_slots = min(small_slots, max(0, slots - 1))
+        self.small_bytes = small_bytes
+        self.aging = max(1.0, aging)
+        self._clock = clock
+        self.metrics = metrics or default_metrics
+        self._waiters: list[_Waiter] = []
+        self._running = {lane: 0 for lane in LANES}
+        self._waits = {lane: deque(maxlen=history) for lane in LANES}
+
+    def lane_of(self, cost: int) -> str:
+        return "small" if 0 < cost <= self.small_bytes else "large"
+
+    def _eligible(self, lane: str) -> bool:
+        if self.slots <= 0:
+            return True
+        if sum(self._running.values()) >= self.slots:
+            return False
+        return lane == "small" or self._running["large"] < self.slots - self.small_slots
+
+    def _key(self, w: _Waiter, now: float) -> tuple[float, float]:
+        cost = w.cost or _UNKNOWN_COST
+        return cost / (1 + (now - w.enqueued) / self.aging), w.enqueued
+
+    def would_queue(self, cost: int) -> bool:
+        return bool(self._waiters) or not self._eligible(self.lane_of(cost))
+
+    def _dispatch(self) -> None:
+        while self._waiters:
+            now = self._clock()
+            ready = [w for w in self._waiters if self._eligible(w.lane)]
+            if not ready:
+                return
+            w = min(ready, key=lambda x: self._key(x, now))
+            self._waiters.remove(w)
+            self._running[w.lane] += 1
+            self._record_wait(w.lane, now - w.enqueued)
+            w.future.set_result(None)
+
+    def _record_wait(self, lane: str, wait: float) -> None:
+        self._waits[lane].append(wait)
+        self.metrics.inc(f"jobs_started_total_{lane}")
+        self.metrics.set(f"job_wait_seconds_{lane}", wait)
+        self.metrics.max(f"job_wait_max_seconds_{lane}", wait)
+
+    def _release(self, lane: str) -> None:
+        self._running[lane] -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, cost: int) -> AsyncIterator[str]:
+        """Waits for a slot for a job of `cost` bytes; yields its lane."""
+        lane = self.lane_of(cost)
+        w = _Waiter(cost, lane, self._clock(), asyncio.get_running_loop().create_future())
+        self._waiters.append(w)
+        self._dispatch()
+        try:
+            await w.future
+        except asyncio.CancelledError:
+            if w in self._waiters:
+                self._waiters.remove(w)
+            elif w.future.done() and not w.future.cancelled():
+                self._release(lane)
+            raise
+        try:
+            yield lane
+        finally:
+            self._release(lane)
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Per-lane queue length, running jobs and wait percentiles (s)."""
+        out: dict[str, dict[str, float]] = {}
+        for lane in LANES:
+            waits = sorted(self._waits[lane])
+            out[lane] = {
+                "waiting": sum(1 for w in self._waiters if w.lane == lane),
+                "running": self._running[lane],
+                "p50": _percentile(waits, 0.5),
+                "p95": _percentile(waits, 0.95),
+                "max": waits[-1] if waits else 0.0,
+            }
+        return out
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+job_scheduler = JobScheduler(
+    slots=settings.MAX_ACTIVE_JOBS,
+    small_slots=settings.SMALL_JOB_SLOTS,
+    small_bytes=settings.SMALL_JOB_BYTES,
+    aging=settings.JOB_AGING_SECONDS,
+)
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+from dataclasses import dataclass, field
+
+from project.services.download import make_job_dir
+from project.utils.config import settings
+
+
+class RamBudget:
+    """
+    Global byte budget for small jobs kept in RAM (tmpfs file + upload buffer).
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, n: int) -> bool:
+        with self._lock:
+            if n <= 0 or self.used + n > self.limit:
+                return False
+            self.used += n
+            return True
+
+    def release(self, n: int) -> None:
+        with self._lock:
+            self.used = max(0, self.used - n)
+
+
+ram_budget = RamBudget(settings.SMALL_FILE_RAM_BUDGET)
+
+# size estimates are often low (wrong bitrate, merged audio); let the file
+# grow this much past the estimate before spilling it to disk
+_HEADROOM = 1.5
+
+
+@dataclass
+class JobPlacement:
+    job_dir: str
+    in_memory: bool = False
+    reserved: int = 0
+    # where an in-memory job goes if it outgrows its reservation
+    spill_dir: str = ""
+    _budget: RamBudget | None = field(default=None, repr=False)
+
+    @property
+    def max_filesize(self) -> int | None:
+        """Bytes the download may take in tmpfs: half the reservation (the other half is the upload buffer)."""
+        return self.reserved // 2 if self.in_memory else None
+
+    def release(self) -> None:
+        if self._budget is not None and self.reserved:
+            self._budget.release(self.reserved)
+            self.reserved = 0
+
+    def spill(self) -> None:
+        """Moves a job that outgrew its RAM reservation to disk, dropping what it fetched."""
+        shutil.rmtree(self.job_dir, ignore_errors=True)
+        self.release()
+        self.job_dir = self.spill_dir
+        self.in_memory = False
+
+
+def place_job(
+    chat_id: int | None,
+    estimated_size: int,
+    budget: RamBudget | None = None,
+    job_id: str | None = None,
+) -> JobPlacement:
+    """
+    Chooses where a job runs. Jobs with a known size below
+    SMALL_FILE_THRESHOLD go to the tmpfs scratch dir if the RAM budget
+    allows; everything else (and unknown sizes) goes to DOWNLOADS_DIR.
+    """
+    budget = budget or ram_budget
+    small = (
+        settings.SCRATCH_DIR is not None
+        and 0 < estimated_size <= settings.SMALL_FILE_THRESHOLD
+    )
+    # the file sits in tmpfs and, while uploading, in a memory buffer;
+    # both may grow up to the estimate plus headroom
+    need = int(estimated_size * _HEADROOM) * 2
+    if small and budget.reserve(need):
+        return JobPlacement(
+            job_dir=make_job_dir(settings.SCRATCH_DIR, chat_id=chat_id, job_id=job_id),
+            in_memory=True,
+            reserved=need,
+            spill_dir=make_job_dir(settings.DOWNLOADS_DIR, chat_id=chat_id, job_id=job_id),
+            _budget=budget,
+        )
+    return JobPlacement(job_dir=make_job_dir(settings.DOWNLOADS_DIR, chat_id=chat_id, job_id=job_id))
+
+
+def read_if_small(path: str, size: int | None = None) -> bytes | None:
+    """
+    Reads a finished small job into memory for a buffered upload.
+    Returns None if the result turned out bigger than the threshold
+    (checked without opening the file when its size is known).
+    """
+    if size is not None and size > settings.SMALL_FILE_THRESHOLD:
+        return None
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size > settings.SMALL_FILE_THRESHOLD:
+            return None
+        return f.read()
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+from pathlib import Path
+
+from project.services.ffmpeg import FFmpegError, run_ffmpeg
+
+log = logging.getLogger(__name__)
+
+# stream copy cuts on keyframes, so parts come out uneven: aim below the cap
+_MARGIN = 0.9
+_ATTEMPTS = 3
+
+
+def segment_seconds(size: int, duration: float, limit: int, margin: float = _MARGIN) -> float:
+    """Segment length that should give parts of about margin * limit bytes."""
+    return max(1.0, duration * limit * margin / size)
+
+
+def _parts_of(path: Path) -> list[str]:
+    # titles may contain glob characters ("[id]"), so match names by hand
+    name_re = re.compile(re.escape(path.stem) + r"\.part\d{3}" + re.escape(path.suffix))
+    return sorted(str(p) for p in path.parent.iterdir() if name_re.fullmatch(p.name))
+
+
+def _remove(paths: list[str]) -> None:
+    for p in paths:
+        try:
+            os.remove(p)
+        except OSError:
+            pass
+
+
+def split_media(
+    src: str,
+    limit: int,
+    duration: float | None,
+    size: int | None = None,
+    timeout: float | None = None,
+) -> list[str]:
+    """
+    Cuts a media file into parts of at most `limit` bytes with ffmpeg's
+    segment muxer (stream copy, no re-encode) and returns them in order.
+
+    Segments that still come out too big (long GOPs, bitrate spikes) make
+    it retry with shorter segments.
+    """
+    path = Path(src)
+    if size is None:
+        size = path.stat().st_size
+    if size <= limit:
+        return [str(path)]
+    if not duration or duration <= 0:
+        raise FFmpegError(f"Can't split {path.name}: unknown duration")
+
+    seconds = segment_seconds(size, duration, limit)
+    # "%" is special in the segment muxer's output pattern
+    pattern = path.with_name(f"{path.stem.replace('%', '%%')}.part%03d{path.suffix}")
+    for attempt in range(_ATTEMPTS):
+        log.info("Splitting %s (%s bytes) into %.0fs segments", path.name, size, seconds)
+        run_ffmpeg(
+            [
+                "-i", str(path),
+                "-map", "0",
+                "-c", "copy",
+                "-f", "segment",
+                "-segment_time", f"{seconds:.3f}",
+                "-reset_timestamps", "1",
+                str(pattern),
+            ],
+            timeout=timeout,
+        )
+        parts = _parts_of(path)
+        biggest = max((os.path.getsize(p) for p in parts), default=0)
+        if parts and biggest <= limit:
+            return parts
+        _remove(parts)
+        if not biggest:
+            break
+        seconds = max(1.0, seconds * limit * _MARGIN / biggest)
+
+    raise FFmpegError(f"Can't split {path.name} into parts under {limit} bytes")
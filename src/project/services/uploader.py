@@ -1,19 +1,31 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import os
 import time
+from collections import deque
+from functools import partial
 from pathlib import Path
 from typing import Optional, Callable
 
 from aiogram import Bot
-from aiogram.types.input_file import FSInputFile
+from aiogram.types.input_file import BufferedInputFile, FSInputFile
 
+from project.downloader.result import DownloadResult
 from project.utils.config import settings
 
 log = logging.getLogger(__name__)
 
+# upload caps of the public Bot API and of a local Bot API server
+_BOT_API_LIMIT = 50 * 1024 ** 2
+_LOCAL_API_LIMIT = 2000 * 1024 ** 2
+
 _telethon_client = None
 
+# recent uploads as (monotonic time, sent through Telethon), for /ops
+_recent_uploads: deque[tuple[float, bool]] = deque(maxlen=500)
+
 
 async def _get_telethon_client():
     global _telethon_client
@@ -52,6 +64,25 @@ async def close_telethon_client() -> None:
     _telethon_client = None
 
 
+def telethon_status() -> str:
+    """"off" (not configured), "idle" (not started yet), "connected" or "disconnected"."""
+    if not settings.TELETHON_API_ID or not settings.TELETHON_API_HASH:
+        return "off"
+    if _telethon_client is None:
+        return "idle"
+    try:
+        return "connected" if _telethon_client.is_connected() else "disconnected"
+    except Exception:
+        return "disconnected"
+
+
+def fallback_rate(window: float = 3600.0) -> tuple[int, int]:
+    """(uploads that went through Telethon, all uploads) in the last `window` seconds."""
+    since = time.monotonic() - window
+    recent = [via for t, via in list(_recent_uploads) if t >= since]
+    return sum(recent), len(recent)
+
+
 def _looks_like_too_big_error(e: Exception) -> bool:
     s = str(e).lower()
     return (
@@ -63,64 +94,170 @@ def _looks_like_too_big_error(e: Exception) -> bool:
     )
 
 
+def upload_limit() -> int:
+    return _LOCAL_API_LIMIT if settings.BOT_API_LOCAL else _BOT_API_LIMIT
+
+
+def max_file_size() -> int:
+    """Biggest file any configured transport can take (Telethon: 2000 MB)."""
+    if settings.TELETHON_API_ID and settings.TELETHON_API_HASH:
+        return max(upload_limit(), _LOCAL_API_LIMIT)
+    return upload_limit()
+
+
+def _local_file_uri(path: Path) -> Optional[str]:
+    """
+    file:// URI of a file in DOWNLOADS_DIR as seen by the local Bot API
+    server (BOT_API_FILES_DIR if it mounts the dir elsewhere).
+    """
+    if not settings.BOT_API_LOCAL:
+        return None
+    base = Path(settings.DOWNLOADS_DIR).resolve()
+    try:
+        rel = path.resolve().relative_to(base)
+    except ValueError:
+        return None
+    server_base = Path(settings.BOT_API_FILES_DIR) if settings.BOT_API_FILES_DIR else base
+    return (server_base / rel).as_uri()
+
+
+def _pick_document(path: Path, data: Optional[bytes], size: Optional[int] = None) -> tuple[object, int]:
+    if data is not None:
+        return BufferedInputFile(data, filename=path.name), len(data)
+    if size is None:
+        size = os.path.getsize(path)
+    uri = _local_file_uri(path)
+    if uri is not None:
+        # the server reads the file itself, nothing is streamed through us
+        return uri, size
+    return FSInputFile(str(path)), size
+
+
+def _file_id_of(msg: object) -> Optional[str]:
+    for attr in ("document", "video", "audio"):
+        media = getattr(msg, attr, None)
+        if media is not None:
+            return media.file_id
+    return None
+
+
 async def send_file_smart(
     bot: Bot,
     chat_id: int,
     file_path: str | Path,
     caption: Optional[str] = None,
     on_progress: Optional[Callable[[int], None]] = None,  # percent
-) -> None:
+    data: Optional[bytes] = None,  # file contents already in memory
+    size: Optional[int] = None,  # known file size, saves a stat()
+    result: Optional[DownloadResult] = None,  # metadata of a downloaded file
+) -> Optional[str]:
+    """
+    Sends a file via the Bot API, falling back to Telethon for big files.
+    Files over the Bot API cap (2000 MB with a local server, which also
+    gets DOWNLOADS_DIR files by path) go straight to Telethon.
+    A streamable result goes out as a video with its dimensions and
+    duration, so clients play it inline instead of offering a download.
+    Returns the Bot API file_id (None when sent through Telethon).
+    """
     path = Path(file_path)
+    document, size = await asyncio.to_thread(_pick_document, path, data, size)
 
     # 1) Try Bot API
-    try:
-        await bot.send_document(
-            chat_id=chat_id,
-            document=FSInputFile(str(path)),
-            caption=caption,
-        )
-        if on_progress:
-            on_progress(100)
-        return
-    except Exception as e:
-        log.warning("Bot API send failed: %s", e)
-
-        client = await _get_telethon_client()
-        if client is None:
-            raise
-
-        # 2) Telethon fallback (with upload progress)
-        last_emit = 0.0
-        last_pct = -1
-
-        def progress_callback(sent: int, total: int) -> None:
-            nonlocal last_emit, last_pct
-            if total <= 0:
-                return
-            pct = int(sent * 100 / total)
-            now = time.monotonic()
-            # throttle updates
-            if pct == last_pct:
-                return
-            if now - last_emit < 1.0 and pct < 100:
-                return
-            last_emit = now
-            last_pct = pct
-            if on_progress:
-                on_progress(pct)
-
+    if size <= upload_limit():
+        if result is not None and result.streamable:
+            send = partial(
+                bot.send_video,
+                video=document,
+                width=result.width,
+                height=result.height,
+                duration=round(result.duration) if result.duration else None,
+                supports_streaming=True,
+            )
+        else:
+            send = partial(bot.send_document, document=document)
         try:
-            await client.send_file(
-                entity=chat_id,
-                file=str(path),
-                caption=caption or "",
-                progress_callback=progress_callback,
+            msg = await send(
+                chat_id=chat_id,
+                caption=caption,
+                # a 50 MB multipart body takes longer than an ordinary call
+                request_timeout=settings.UPLOAD_TIMEOUT or None,
             )
             if on_progress:
                 on_progress(100)
+            _recent_uploads.append((time.monotonic(), False))
+            return _file_id_of(msg)
+        except Exception as exc:
+            log.warning("Bot API send failed: %s", exc)
+            e = exc
+    else:
+        log.info("File is over the Bot API limit (%s bytes), using Telethon", size)
+        e = RuntimeError("File too large for the Bot API")
+
+    client = await _get_telethon_client()
+    if client is None:
+        if _looks_like_too_big_error(e):
+            # callers split FILE_TOO_BIG results into parts
+            raise RuntimeError("FILE_TOO_BIG") from e
+        raise e
+
+    # 2) Telethon fallback (with upload progress)
+    last_emit = 0.0
+    last_pct = -1
+
+    def progress_callback(sent: int, total: int) -> None:
+        nonlocal last_emit, last_pct
+        if total <= 0:
+            return
+        pct = int(sent * 100 / total)
+        now = time.monotonic()
+        # throttle updates
+        if pct == last_pct:
             return
-        except Exception as e2:
-            log.exception("Telethon send failed: %s", e2)
-            if _looks_like_too_big_error(e) or _looks_like_too_big_error(e2):
-                raise RuntimeError("FILE_TOO_BIG")
-            raise
+        if now - last_emit < 1.0 and pct < 100:
+            return
+        last_emit = now
+        last_pct = pct
+        if on_progress:
+            on_progress(pct)
+
+    try:
+        await client.send_file(
+            entity=chat_id,
+            file=str(path),
+            caption=caption or "",
+            progress_callback=progress_callback,
+        )
+        if on_progress:
+            on_progress(100)
+        _recent_uploads.append((time.monotonic(), True))
+        return None
+    except Exception as e2:
+        log.exception("Telethon send failed: %s", e2)
+        if _looks_like_too_big_error(e) or _looks_like_too_big_error(e2):
+            raise RuntimeError("FILE_TOO_BIG")
+        raise
+
+
+async def send_parts(
+    bot: Bot,
+    chat_id: int,
+    parts: list[str],
+    caption: Optional[str] = None,
+    concurrency: Optional[int] = None,
+) -> None:
+    """
+    Uploads the parts of a split file a few at a time. Telegram orders
+    messages by upload completion, so each caption carries "part i/n".
+    """
+    n = len(parts)
+    sem = asyncio.Semaphore(max(1, concurrency or settings.SPLIT_UPLOAD_CONCURRENCY))
+
+    async def one(i: int, part: str) -> None:
+        label = f"Часть {i}/{n}"
+        async with sem:
+            await send_file_smart(bot, chat_id, part, caption=f"{caption}\n{label}" if caption else label)
+
+    results = await asyncio.gather(*(one(i, p) for i, p in enumerate(parts, 1)), return_exceptions=True)
+    for r in results:
+        if isinstance(r, BaseException):
+            raise r
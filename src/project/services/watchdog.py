@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import signal
+import time
+from typing import Any, Callable
+
+from project.services.jobs import ActiveJob, JobRegistry, job_registry
+from project.utils.config import settings
+from project.utils.metrics import Metrics, metrics as default_metrics
+
+log = logging.getLogger(__name__)
+
+
+def _child_pids() -> list[int]:
+    me = os.getpid()
+    pids = []
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return pids  # no procfs: nothing we can find
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as f:
+                # "pid (comm) state ppid ...", comm may contain spaces
+                ppid = int(f.read().rsplit(b")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        if ppid == me:
+            pids.append(int(entry))
+    return pids
+
+
+def _path_forms(job_dir: str) -> list[bytes]:
+    # children get the path the way it was built: absolute, or relative
+    # to our cwd if a relative DOWNLOADS_DIR slipped through
+    forms = {os.path.abspath(job_dir)}
+    rel = os.path.relpath(job_dir)
+    if not rel.startswith(os.pardir):
+        forms.add(rel)
+    return [os.fsencode(p) for p in forms]
+
+
+def _mentions(args: list[bytes], forms: list[bytes]) -> bool:
+    sep = os.fsencode(os.sep)
+    for arg in args:
+        for form in forms:
+            # "job1" must not match "job10"
+            if arg.endswith(form) or form + sep in arg:
+                return True
+    return False
+
+
+def kill_job_processes(job_dir: str) -> int:
+    """
+    Kills our child processes (ffmpeg merges and conversions, external
+    downloaders) working on files in job_dir. Returns how many were hit.
+    """
+    if not job_dir:
+        return 0
+    forms = _path_forms(job_dir)
+    killed = 0
+    for pid in _child_pids():
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                cmdline = f.read()
+        except OSError:
+            continue
+        if not _mentions(cmdline.split(b"\0"), forms):
+            continue
+        try:
+            os.kill(pid, signal.SIGKILL)
+            killed += 1
+        except OSError:
+            pass
+    return killed
+
+
+class JobWatchdog:
+    """
+    Periodically checks running jobs against their phase deadlines.
+
+    A download that made no progress for `stall` seconds, or a phase
+    (downloading/processing) running past its deadline, is cancelled:
+    its progress hook raises on the next call and its subprocesses are
+    killed, so the worker thread returns and the chat lock is released.
+    Subprocesses of jobs cancelled from /ops are killed the same way.
+    `on_tick` runs after each pass (e.g. evicting idle chat locks).
+    A limit of 0 disables that check.
+    """
+
+    def __init__(
+        self,
+        registry: JobRegistry,
+        interval: float = 30.0,
+        stall: float = 300.0,
+        download_deadline: float = 0.0,
+        processing_deadline: float = 0.0,
+        on_tick: Callable[[], Any] | None = None,
+        kill: Callable[[str], int] = kill_job_processes,
+        clock: Callable[[], float] = time.monotonic,
+        metrics: Metrics | None = None,
+    ):
+        self.registry = registry
+        self.interval = interval
+        self.stall = stall
+        self.deadlines = {"downloading": download_deadline, "processing": processing_deadline}
+        self.on_tick = on_tick
+        self._kill = kill
+        self._clock = clock
+        self.metrics = metrics or default_metrics
+        self._task: asyncio.Task | None = None
+
+    def _stuck_reason(self, job: ActiveJob, now: float) -> str | None:
+        if job.phase == "downloading" and self.stall and now - job.last_progress > self.stall:
+            return "stalled"
+        deadline = self.deadlines.get(job.phase)
+        if deadline and now - job.phase_started > deadline:
+            return "deadline"
+        return None
+
+    def check(self) -> list[str]:
+        """One pass; returns ids of the jobs it cancelled."""
+        now = self._clock()
+        cancelled = []
+        for job in self.registry.jobs():
+            if not job.cancelled:
+                reason = self._stuck_reason(job, now)
+                if reason is None:
+                    continue
+                log.warning(
+                    "Job %s %s in phase %s after %.0fs, cancelling: %s",
+                    job.job_id, reason, job.phase, now - job.phase_started, job.url,
+                )
+                self.registry.cancel(job.job_id, reason)
+                self.metrics.inc(f"jobs_{reason}_total")
+                cancelled.append(job.job_id)
+            # until the job is gone: hung ffmpeg never calls the progress hook
+            if job.job_dir and job.phase != "sending":
+                killed = self._kill(job.job_dir)
+                if killed:
+                    log.warning("Killed %d process(es) of job %s", killed, job.job_id)
+        return cancelled
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.check)
+                if self.on_tick is not None:
+                    self.on_tick()
+            except Exception:
+                log.exception("Job watchdog pass failed")
+
+
+def _limit(seconds: int) -> float:
+    return float(max(0, seconds))
+
+
+job_watchdog = JobWatchdog(
+    job_registry,
+    interval=settings.WATCHDOG_INTERVAL,
+    stall=_limit(settings.STALL_TIMEOUT),
+    download_deadline=_limit(settings.DOWNLOAD_TIMEOUT),
+    processing_deadline=_limit(settings.POSTPROCESS_TIMEOUT),
+)
@@ -4,5 +4,7 @@ from aiogram.fsm.state import StatesGroup, State
 class DownloadStates(StatesGroup):
     waiting_link = State()
     waiting_type = State()
+    waiting_clip = State()
     waiting_format = State()
+    waiting_batch = State()
     downloading = State()
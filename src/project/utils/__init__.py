@@ -1,8 +1,19 @@
 from .config import settings, Settings
 from .logging import setup_logging
+from .metrics import Metrics, metrics
+from .loopwatch import LoopWatchdog, start_loop_watchdog, stop_loop_watchdog
+from .runtime import json_codec, make_session, run
 
 __all__ = [
     "settings",
     "Settings",
     "setup_logging",
+    "Metrics",
+    "metrics",
+    "LoopWatchdog",
+    "start_loop_watchdog",
+    "stop_loop_watchdog",
+    "json_codec",
+    "make_session",
+    "run",
 ]
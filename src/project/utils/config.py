@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import os
 
 
@@ -12,14 +12,124 @@ class Settings:
     # safety/limits
     MAX_DURATION_SECONDS: int = 60 * 60  # 1 hour by default
 
-    # Optional: cookies.txt path for sites that require auth/age/geo
+    # Telegram user ids allowed to use /ops
+    ADMIN_IDS: tuple[int, ...] = ()
+
+    # Optional: cookies.txt path for sites that require auth/age/geo.
+    # Also accepts a comma-separated list or a directory of *.txt files,
+    # one per account; jobs rotate between them.
     COOKIES_FILE: str | None = None
+    COOKIE_COOLDOWN: int = 600  # seconds a failing account is benched
+
+    # Self-hosted Bot API server (e.g. http://localhost:8081). In local mode
+    # files from DOWNLOADS_DIR are sent by path, up to 2000 MB;
+    # BOT_API_FILES_DIR is where the server sees DOWNLOADS_DIR, if elsewhere.
+    BOT_API_URL: str | None = None
+    BOT_API_LOCAL: bool = False
+    BOT_API_FILES_DIR: str | None = None
 
     # Telethon (optional, for sending big files)
     TELETHON_API_ID: int | None = None
     TELETHON_API_HASH: str | None = None
     TELETHON_SESSION: str = "data/telethon_bot"
 
+    # files no transport accepts are cut into parts (stream copy) and
+    # uploaded this many at a time
+    SPLIT_UPLOAD_CONCURRENCY: int = 3
+
+    # ffmpeg postprocessing
+    FFMPEG_BIN: str = "ffmpeg"
+    FFMPEG_MAX_PROCS: int = 2
+    FFMPEG_NICE: int = 10
+    MP3_MAX_BITRATE: int = 192  # kbps
+
+    # batch mode (several links per message / playlists)
+    NOPLAYLIST: bool = True
+    BATCH_CONCURRENCY: int = 3
+    BATCH_MAX_ITEMS: int = 20
+
+    # HLS/DASH fragments fetched in parallel; per-extractor overrides,
+    # e.g. FRAGMENT_CONCURRENCY_BY_SITE="youtube=8,vimeo=4"
+    FRAGMENT_CONCURRENCY: int = 4
+    FRAGMENT_CONCURRENCY_BY_SITE: dict[str, int] = field(default_factory=dict)
+    # Optional external downloader (e.g. aria2c) instead of the native one
+    EXTERNAL_DOWNLOADER: str | None = None
+    EXTERNAL_DOWNLOADER_ARGS: str | None = None
+
+    # per-site circuit breaker (seconds)
+    HEALTH_WINDOW: int = 20
+    BREAKER_THRESHOLD: int = 3
+    BREAKER_BASE_BACKOFF: int = 60
+    BREAKER_MAX_BACKOFF: int = 30 * 60
+
+    # per-user quality preferences (one-tap repeat mode)
+    PREFS_FILE: str = "data/prefs.json"
+
+    # metadata extraction profile for the menus: "menu" (trimmed) or "full";
+    # MENU_PLAYER_CLIENTS limits the YouTube clients queried (empty = yt-dlp's)
+    EXTRACT_PROFILE: str = "menu"
+    MENU_PLAYER_CLIENTS: tuple[str, ...] = ()
+
+    # caches keyed by canonical media key: extracted metadata (seconds,
+    # 0 = off) and file_ids of already sent files
+    INFO_CACHE_TTL: int = 600
+    UPLOADS_FILE: str = "data/uploads.json"
+
+    # running jobs, resumed after a restart
+    JOURNAL_FILE: str = "data/jobs.json"
+
+    # download bandwidth budget, bytes/s (0 = unlimited); env accepts K/M/G
+    GLOBAL_DOWNLOAD_RATE: int = 0
+    CHAT_DOWNLOAD_RATE: int = 0
+
+    # small-file mode: jobs below the threshold run in a tmpfs scratch dir
+    # and are uploaded from memory, within a global RAM budget (bytes)
+    SMALL_FILE_THRESHOLD: int = 20 * 1024 ** 2
+    SMALL_FILE_RAM_BUDGET: int = 256 * 1024 ** 2
+    SCRATCH_DIR: str | None = None
+
+    # egress pool: local source IPs and/or proxies, spread per job;
+    # EGRESS_STRATEGY is "least_loaded" or "sticky" (per site)
+    SOURCE_ADDRESSES: tuple[str, ...] = ()
+    PROXIES: tuple[str, ...] = ()
+    EGRESS_STRATEGY: str = "least_loaded"
+    EGRESS_QUARANTINE: int = 600
+
+    # job scheduler: concurrent downloads (0 = unlimited), slots kept for
+    # small jobs (estimated size <= SMALL_JOB_BYTES), aging in seconds
+    MAX_ACTIVE_JOBS: int = 4
+    SMALL_JOB_SLOTS: int = 1
+    SMALL_JOB_BYTES: int = 50 * 1024 ** 2
+    JOB_AGING_SECONDS: int = 60
+
+    # per-user quotas (token buckets, 0 = unlimited): jobs refill at
+    # USER_JOBS_PER_HOUR up to USER_JOB_BURST, traffic at USER_DAILY_BYTES/day
+    QUOTA_FILE: str = "data/quota.json"
+    USER_JOBS_PER_HOUR: int = 20
+    USER_JOB_BURST: int = 5
+    USER_DAILY_BYTES: int = 0
+
+    # runtime profile: uvloop and orjson (if installed) plus a tuned Bot
+    # API session: connection pool size, keep-alive and request timeout (s,
+    # uploads use UPLOAD_TIMEOUT instead)
+    FAST_RUNTIME: bool = False
+    BOT_HTTP_POOL: int = 32
+    BOT_HTTP_KEEPALIVE: int = 60
+    BOT_HTTP_TIMEOUT: int = 60
+
+    # per-phase deadlines in seconds (0 = none); the job watchdog cancels
+    # downloads without progress for STALL_TIMEOUT and kills their ffmpeg
+    EXTRACT_TIMEOUT: int = 120
+    DOWNLOAD_TIMEOUT: int = 2 * 3600
+    POSTPROCESS_TIMEOUT: int = 15 * 60
+    UPLOAD_TIMEOUT: int = 3600
+    STALL_TIMEOUT: int = 300
+    WATCHDOG_INTERVAL: int = 30
+
+    # event-loop lag watchdog (logs stacks of blocking calls)
+    LOOP_WATCHDOG: bool = False
+    LOOP_LAG_THRESHOLD_MS: int = 100
+
 
 def _require_env(name: str) -> str:
     value = os.getenv(name)
@@ -33,6 +143,64 @@ def _opt_env(name: str) -> str | None:
     return v if v else None
 
 
+def _bool_env(name: str, default: bool) -> bool:
+    v = _opt_env(name)
+    if v is None:
+        return default
+    return v.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _list_env(name: str) -> tuple[str, ...]:
+    v = _opt_env(name)
+    if not v:
+        return ()
+    return tuple(x.strip() for x in v.split(",") if x.strip())
+
+
+def _int_list_env(name: str) -> tuple[int, ...]:
+    try:
+        return tuple(int(x) for x in _list_env(name))
+    except ValueError:
+        raise RuntimeError(f"Environment variable {name} must be a comma-separated list of ints")
+
+
+def _int_map(name: str) -> dict[str, int]:
+    v = _opt_env(name)
+    if not v:
+        return {}
+    out: dict[str, int] = {}
+    for part in v.split(","):
+        if not part.strip():
+            continue
+        key, sep, num = part.partition("=")
+        try:
+            if not sep:
+                raise ValueError
+            out[key.strip().lower()] = int(num)
+        except ValueError:
+            raise RuntimeError(f"Environment variable {name} must look like 'site=int,site=int'")
+    return out
+
+
+def _size_env(name: str, default: int = 0) -> int:
+    v = _opt_env(name)
+    if not v:
+        return default
+    v = v.strip().upper().rstrip("B")
+    mult = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}.get(v[-1:], 1)
+    if mult != 1:
+        v = v[:-1]
+    try:
+        return int(float(v) * mult)
+    except ValueError:
+        raise RuntimeError(f"Environment variable {name} must be a size like 500K or 10M")
+
+
+def _default_scratch_dir() -> str | None:
+    # tmpfs is RAM-backed: no disk IOPS for small jobs
+    return "/dev/shm/ytbot" if os.path.isdir("/dev/shm") else None
+
+
 def _opt_int(name: str) -> int | None:
     v = _opt_env(name)
     if not v:
@@ -47,8 +215,64 @@ settings = Settings(
     BOT_TOKEN=_require_env("BOT_TOKEN"),
     DOWNLOADS_DIR=os.getenv("DOWNLOADS_DIR", "data/downloads"),
     MAX_DURATION_SECONDS=int(os.getenv("MAX_DURATION_SECONDS", str(60 * 60))),
+    ADMIN_IDS=_int_list_env("ADMIN_IDS"),
     COOKIES_FILE=_opt_env("COOKIES_FILE"),
+    COOKIE_COOLDOWN=int(os.getenv("COOKIE_COOLDOWN", "600")),
+    BOT_API_URL=_opt_env("BOT_API_URL"),
+    BOT_API_LOCAL=_bool_env("BOT_API_LOCAL", False),
+    BOT_API_FILES_DIR=_opt_env("BOT_API_FILES_DIR"),
     TELETHON_API_ID=_opt_int("TELETHON_API_ID"),
     TELETHON_API_HASH=_opt_env("TELETHON_API_HASH"),
     TELETHON_SESSION=os.getenv("TELETHON_SESSION", "data/telethon_bot"),
+    SPLIT_UPLOAD_CONCURRENCY=int(os.getenv("SPLIT_UPLOAD_CONCURRENCY", "3")),
+    FFMPEG_BIN=os.getenv("FFMPEG_BIN", "ffmpeg"),
+    FFMPEG_MAX_PROCS=int(os.getenv("FFMPEG_MAX_PROCS", "2")),
+    FFMPEG_NICE=int(os.getenv("FFMPEG_NICE", "10")),
+    MP3_MAX_BITRATE=int(os.getenv("MP3_MAX_BITRATE", "192")),
+    NOPLAYLIST=_bool_env("NOPLAYLIST", True),
+    BATCH_CONCURRENCY=int(os.getenv("BATCH_CONCURRENCY", "3")),
+    BATCH_MAX_ITEMS=int(os.getenv("BATCH_MAX_ITEMS", "20")),
+    FRAGMENT_CONCURRENCY=int(os.getenv("FRAGMENT_CONCURRENCY", "4")),
+    FRAGMENT_CONCURRENCY_BY_SITE=_int_map("FRAGMENT_CONCURRENCY_BY_SITE"),
+    EXTERNAL_DOWNLOADER=_opt_env("EXTERNAL_DOWNLOADER"),
+    EXTERNAL_DOWNLOADER_ARGS=_opt_env("EXTERNAL_DOWNLOADER_ARGS"),
+    HEALTH_WINDOW=int(os.getenv("HEALTH_WINDOW", "20")),
+    BREAKER_THRESHOLD=int(os.getenv("BREAKER_THRESHOLD", "3")),
+    BREAKER_BASE_BACKOFF=int(os.getenv("BREAKER_BASE_BACKOFF", "60")),
+    BREAKER_MAX_BACKOFF=int(os.getenv("BREAKER_MAX_BACKOFF", str(30 * 60))),
+    PREFS_FILE=os.getenv("PREFS_FILE", "data/prefs.json"),
+    EXTRACT_PROFILE=os.getenv("EXTRACT_PROFILE", "menu"),
+    MENU_PLAYER_CLIENTS=_list_env("MENU_PLAYER_CLIENTS"),
+    INFO_CACHE_TTL=int(os.getenv("INFO_CACHE_TTL", "600")),
+    UPLOADS_FILE=os.getenv("UPLOADS_FILE", "data/uploads.json"),
+    JOURNAL_FILE=os.getenv("JOURNAL_FILE", "data/jobs.json"),
+    GLOBAL_DOWNLOAD_RATE=_size_env("GLOBAL_DOWNLOAD_RATE"),
+    CHAT_DOWNLOAD_RATE=_size_env("CHAT_DOWNLOAD_RATE"),
+    SMALL_FILE_THRESHOLD=_size_env("SMALL_FILE_THRESHOLD", 20 * 1024 ** 2),
+    SMALL_FILE_RAM_BUDGET=_size_env("SMALL_FILE_RAM_BUDGET", 256 * 1024 ** 2),
+    SCRATCH_DIR=_opt_env("SCRATCH_DIR") or _default_scratch_dir(),
+    SOURCE_ADDRESSES=_list_env("SOURCE_ADDRESSES"),
+    PROXIES=_list_env("PROXIES"),
+    EGRESS_STRATEGY=os.getenv("EGRESS_STRATEGY", "least_loaded"),
+    EGRESS_QUARANTINE=int(os.getenv("EGRESS_QUARANTINE", "600")),
+    MAX_ACTIVE_JOBS=int(os.getenv("MAX_ACTIVE_JOBS", "4")),
+    SMALL_JOB_SLOTS=int(os.getenv("SMALL_JOB_SLOTS", "1")),
+    SMALL_JOB_BYTES=_size_env("SMALL_JOB_BYTES", 50 * 1024 ** 2),
+    JOB_AGING_SECONDS=int(os.getenv("JOB_AGING_SECONDS", "60")),
+    QUOTA_FILE=os.getenv("QUOTA_FILE", "data/quota.json"),
+    USER_JOBS_PER_HOUR=int(os.getenv("USER_JOBS_PER_HOUR", "20")),
+    USER_JOB_BURST=int(os.getenv("USER_JOB_BURST", "5")),
+    USER_DAILY_BYTES=_size_env("USER_DAILY_BYTES", 0),
+    FAST_RUNTIME=_bool_env("FAST_RUNTIME", False),
+    BOT_HTTP_POOL=int(os.getenv("BOT_HTTP_POOL", "32")),
+    BOT_HTTP_KEEPALIVE=int(os.getenv("BOT_HTTP_KEEPALIVE", "60")),
+    BOT_HTTP_TIMEOUT=int(os.getenv("BOT_HTTP_TIMEOUT", "60")),
+    EXTRACT_TIMEOUT=int(os.getenv("EXTRACT_TIMEOUT", "120")),
+    DOWNLOAD_TIMEOUT=int(os.getenv("DOWNLOAD_TIMEOUT", str(2 * 3600))),
+    POSTPROCESS_TIMEOUT=int(os.getenv("POSTPROCESS_TIMEOUT", str(15 * 60))),
+    UPLOAD_TIMEOUT=int(os.getenv("UPLOAD_TIMEOUT", "3600")),
+    STALL_TIMEOUT=int(os.getenv("STALL_TIMEOUT", "300")),
+    WATCHDOG_INTERVAL=int(os.getenv("WATCHDOG_INTERVAL", "30")),
+    LOOP_WATCHDOG=_bool_env("LOOP_WATCHDOG", False),
+    LOOP_LAG_THRESHOLD_MS=int(os.getenv("LOOP_LAG_THRESHOLD_MS", "100")),
 )
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from project.utils.metrics import Metrics, metrics as default_metrics
+
+log = logging.getLogger(__name__)
+
+
+class LoopWatchdog:
+    """
+    Measures event-loop lag and catches whatever blocks the loop.
+
+    A heartbeat task on the loop ticks every `interval`. The lag is how
+    late each tick wakes up; it's exported as `event_loop_lag_seconds`
+    (last) and `event_loop_lag_max_seconds`. A sampler thread watches the
+    heartbeat and, when the loop has been stuck longer than `threshold`,
+    logs the loop thread's current stack, i.e. the blocking call itself.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.1,
+        interval: float = 0.25,
+        metrics: Metrics | None = None,
+    ):
+        self.threshold = threshold
+        self.interval = interval
+        self.metrics = metrics or default_metrics
+        self._last_tick = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._stop = threading.Event()
+        self._sampler: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._sampler = threading.Thread(target=self._sample, name="loop-watchdog", daemon=True)
+        self._sampler.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._sampler is not None:
+            await asyncio.to_thread(self._sampler.join, 1.0)
+            self._sampler = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            start = time.monotonic()
+            self._last_tick = start
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - start - self.interval)
+            self.metrics.set("event_loop_lag_seconds", lag)
+            self.metrics.max("event_loop_lag_max_seconds", lag)
+            if lag > self.threshold:
+                self.metrics.inc("event_loop_stalls_total")
+
+    def _sample(self) -> None:
+        reported_tick = None
+        step = max(0.01, self.threshold / 2)
+        while not self._stop.wait(step):
+            tick = self._last_tick
+            stuck = time.monotonic() - tick - self.interval
+            if stuck <= self.threshold or tick == reported_tick:
+                continue
+            reported_tick = tick  # one report per stall
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame))
+            log.warning("Event loop blocked for %.0f ms, loop thread stack:\n%s", stuck * 1000, stack)
+
+
+loop_watchdog: LoopWatchdog | None = None
+
+
+def start_loop_watchdog(threshold_ms: int) -> LoopWatchdog:
+    global loop_watchdog
+    if loop_watchdog is None:
+        loop_watchdog = LoopWatchdog(threshold=threshold_ms / 1000)
+    loop_watchdog.start()
+    return loop_watchdog
+
+
+async def stop_loop_watchdog() -> None:
+    if loop_watchdog is not None:
+        await loop_watchdog.stop()
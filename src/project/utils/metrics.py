@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import threading
+
+
+class Metrics:
+    """
+    Minimal in-process metrics registry (gauges and counters).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._values: dict[str, float] = {}
+
+    def set(self, name: str, value: float) -> None:
+        with self._lock:
+            self._values[name] = value
+
+    def inc(self, name: str, value: float = 1.0) -> None:
+        with self._lock:
+            self._values[name] = self._values.get(name, 0.0) + value
+
+    def max(self, name: str, value: float) -> None:
+        with self._lock:
+            if value > self._values.get(name, float("-inf")):
+                self._values[name] = value
+
+    def get(self, name: str, default: float = 0.0) -> float:
+        with self._lock:
+            return self._values.get(name, default)
+
+    def snapshot(self) -> dict[str, float]:
+        with self._lock:
+            return dict(self._values)
+
+
+metrics = Metrics()
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import ssl
+from typing import Any, Callable, Coroutine, TypeVar
+
+import certifi
+from aiohttp import ClientSession, TCPConnector
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
+
+from project.utils.config import settings
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def json_codec() -> tuple[Callable[[str | bytes], Any], Callable[[Any], str], str]:
+    """(loads, dumps, name): orjson when installed, the stdlib otherwise."""
+    try:
+        import orjson
+    except ImportError:
+        return json.loads, json.dumps, "json"
+
+    def dumps(obj: Any) -> str:
+        # aiogram posts form fields, so it needs str, not bytes
+        return orjson.dumps(obj).decode()
+
+    return orjson.loads, dumps, "orjson"
+
+
+def run(main: Coroutine[Any, Any, T]) -> T:
+    """asyncio.run, on uvloop when the fast runtime is on and uvloop is installed."""
+    if settings.FAST_RUNTIME:
+        try:
+            import uvloop
+        except ImportError:
+            log.info("uvloop is not installed, using the default event loop")
+        else:
+            return uvloop.run(main)
+    return asyncio.run(main)
+
+
+class TunedAiohttpSession(AiohttpSession):
+    """
+    AiohttpSession on a connector of our own: a sized pool and a longer
+    keep-alive, so idle Bot API connections are reused between updates.
+    """
+
+    def __init__(self, pool: int, keepalive: float, **kwargs: Any):
+        super().__init__(limit=pool, **kwargs)
+        self.pool = pool
+        self.keepalive = keepalive
+        self._client: ClientSession | None = None
+
+    async def create_session(self) -> ClientSession:
+        if self._client is None or self._client.closed:
+            connector = TCPConnector(
+                ssl=ssl.create_default_context(cafile=certifi.where()),
+                limit=self.pool,
+                keepalive_timeout=self.keepalive,
+                ttl_dns_cache=3600,
+            )
+            self._client = ClientSession(connector=connector)
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None and not self._client.closed:
+            await self._client.close()
+            await asyncio.sleep(0.25)  # let SSL connections shut down, as aiogram does
+        await super().close()
+
+
+def make_session(api: TelegramAPIServer | None = None) -> AiohttpSession | None:
+    """
+    Bot API session. With FAST_RUNTIME it gets a sized connection pool,
+    longer keep-alive and the fast JSON codec; without it (and without a
+    custom server) aiogram's defaults are kept. The request timeout stays
+    at aiogram's default; uploads set their own (UPLOAD_TIMEOUT).
+    """
+    if not settings.FAST_RUNTIME:
+        return AiohttpSession(api=api) if api is not None else None
+
+    loads, dumps, codec = json_codec()
+    session = TunedAiohttpSession(
+        pool=settings.BOT_HTTP_POOL,
+        keepalive=settings.BOT_HTTP_KEEPALIVE,
+        api=api or PRODUCTION,
+        json_loads=loads,
+        json_dumps=dumps,
+        timeout=settings.BOT_HTTP_TIMEOUT,
+    )
+    log.info(
+        "Fast runtime: pool=%s keepalive=%ss timeout=%ss json=%s",
+        settings.BOT_HTTP_POOL, settings.BOT_HTTP_KEEPALIVE, settings.BOT_HTTP_TIMEOUT, codec,
+    )
+    return session
@@ -11,6 +11,29 @@ def _ensure_env_for_tests(monkeypatch: pytest.MonkeyPatch):
         monkeypatch.setenv("BOT_TOKEN", "TEST_BOT_TOKEN")
 
 
+class FakeClock:
+    """
+    Manual time for code that takes a `clock` (and `sleep`) callable:
+    move it with `clock.t += seconds`; sleep() advances it instantly.
+    """
+
+    def __init__(self, t: float = 1000.0):
+        self.t = t
+        self.slept = 0.0
+
+    def __call__(self) -> float:
+        return self.t
+
+    def sleep(self, seconds: float) -> None:
+        self.slept += seconds
+        self.t += seconds
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
 @pytest.fixture
 def fake_info():
     return {
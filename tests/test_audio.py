@@ -0,0 +1,119 @@
+import dataclasses
+import threading
+import time
+
+import pytest
+
+from project.services import audio, ffmpeg
+from project.services.audio import plan_mp3, target_bitrate, convert_to_mp3
+
+
+def test_target_bitrate_follows_source_abr():
+    assert target_bitrate(48, max_bitrate=192) == 64
+    assert target_bitrate(129.5, max_bitrate=192) == 160
+    assert target_bitrate(160, max_bitrate=192) == 160
+    assert target_bitrate(256, max_bitrate=192) == 192
+    assert target_bitrate(None, max_bitrate=192) == 192
+
+
+def test_plan_mp3_skips_or_copies_mp3_sources():
+    assert plan_mp3("mp3", "mp3", 128).action == "keep"
+    assert plan_mp3("mka", "mp3", 128).action == "copy"
+
+    plan = plan_mp3("webm", "opus", 130, max_bitrate=192)
+    assert plan.action == "encode"
+    assert plan.bitrate == 160
+
+
+def test_convert_to_mp3_keeps_mp3_without_ffmpeg(tmp_path, monkeypatch):
+    f = tmp_path / "a.mp3"
+    f.write_bytes(b"x")
+
+    def boom(*a, **kw):
+        raise AssertionError("ffmpeg must not run")
+
+    monkeypatch.setattr(audio, "run_ffmpeg", boom)
+
+    assert convert_to_mp3(str(f), acodec="mp3", abr=128) == str(f)
+
+
+def test_convert_to_mp3_encodes_with_derived_bitrate(tmp_path, monkeypatch):
+    f = tmp_path / "a.webm"
+    f.write_bytes(b"x")
+    calls = []
+
+    def fake_run(args, timeout=None):
+        calls.append(list(args))
+        (tmp_path / "a.mp3").write_bytes(b"y")
+
+    monkeypatch.setattr(audio, "run_ffmpeg", fake_run)
+
+    out = convert_to_mp3(str(f), acodec="opus", abr=70)
+
+    assert out == str(tmp_path / "a.mp3")
+    assert not f.exists()
+    assert ["-c:a", "libmp3lame", "-b:a", "80k"] == calls[0][-5:-1]
+
+
+def test_run_ffmpeg_pool_is_bounded(monkeypatch):
+    monkeypatch.setattr(ffmpeg, "_pool", threading.BoundedSemaphore(2))
+
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    class Proc:
+        returncode = 0
+        stderr = b""
+
+    def fake_subprocess_run(cmd, **kw):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+        return Proc()
+
+    monkeypatch.setattr(ffmpeg.subprocess, "run", fake_subprocess_run)
+
+    threads = [threading.Thread(target=ffmpeg.run_ffmpeg, args=(["-version"],)) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert peak == 2
+
+
+def test_run_ffmpeg_is_niced_without_preexec_fn(monkeypatch):
+    monkeypatch.setattr(ffmpeg, "_NICE", "/usr/bin/nice")
+    monkeypatch.setattr(ffmpeg, "settings", dataclasses.replace(ffmpeg.settings, FFMPEG_NICE=10))
+    seen = {}
+
+    class Proc:
+        returncode = 0
+        stderr = b""
+
+    def fake_subprocess_run(cmd, **kw):
+        seen.update(kw, cmd=cmd)
+        return Proc()
+
+    monkeypatch.setattr(ffmpeg.subprocess, "run", fake_subprocess_run)
+
+    ffmpeg.run_ffmpeg(["-version"])
+
+    assert seen["cmd"][:4] == ["/usr/bin/nice", "-n", "10", ffmpeg.settings.FFMPEG_BIN]
+    assert "preexec_fn" not in seen
+
+
+def test_run_ffmpeg_raises_on_failure(monkeypatch):
+    class Proc:
+        returncode = 1
+        stderr = b"boom"
+
+    monkeypatch.setattr(ffmpeg.subprocess, "run", lambda cmd, **kw: Proc())
+
+    with pytest.raises(ffmpeg.FFmpegError):
+        ffmpeg.run_ffmpeg(["-version"])
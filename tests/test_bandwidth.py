@@ -0,0 +1,82 @@
+import pytest
+
+from project.services.bandwidth import BandwidthLease, BandwidthManager
+
+
+def test_global_rate_is_split_evenly_and_rebalanced():
+    m = BandwidthManager(global_rate=900)
+
+    a = m.acquire(1)
+    assert a.rate == 900
+
+    b = m.acquire(2)
+    c = m.acquire(3)
+    assert [a.rate, b.rate, c.rate] == [300, 300, 300]
+
+    c.release()
+    assert [a.rate, b.rate] == [450, 450]
+    assert m.active == 2
+
+
+def test_chat_cap_leaves_more_for_others():
+    m = BandwidthManager(global_rate=1000, chat_rate=100)
+
+    a1 = m.acquire(1)
+    a2 = m.acquire(1)
+    b = m.acquire(2)
+
+    # chat 1 splits its cap between two jobs; the caps are below the
+    # global fair share, so they apply as is
+    assert a1.rate == pytest.approx(50)
+    assert a2.rate == pytest.approx(50)
+    assert b.rate == pytest.approx(100)
+
+    m2 = BandwidthManager(global_rate=300, chat_rate=1000)
+    x = m2.acquire(1)
+    y = m2.acquire(2)
+    assert x.rate == pytest.approx(150)
+    assert y.rate == pytest.approx(150)
+
+
+def test_unlimited_by_default():
+    m = BandwidthManager()
+    with m.acquire(1) as lease:
+        assert lease.rate is None
+        assert lease.consume(10_000_000) == 0.0
+    assert m.active == 0
+
+
+def test_consume_paces_to_rate(clock):
+    lease = BandwidthLease(BandwidthManager(), None, clock=clock, sleep=clock.sleep)
+    lease.rate = 1000
+
+    for _ in range(10):
+        lease.consume(500)
+
+    # 5000 bytes at 1000 B/s, minus the allowed burst
+    assert clock.slept == pytest.approx(4.5)
+
+
+def test_throttle_uses_deltas_per_file():
+    consumed = []
+    lease = BandwidthLease(BandwidthManager(), None)
+    lease.consume = lambda n: consumed.append(n) or 0.0
+
+    lease.throttle({"status": "downloading", "tmpfilename": "v.part", "downloaded_bytes": 100})
+    lease.throttle({"status": "downloading", "tmpfilename": "v.part", "downloaded_bytes": 250})
+    lease.throttle({"status": "finished", "tmpfilename": "v.part", "downloaded_bytes": 300})
+    lease.throttle({"status": "downloading", "tmpfilename": "a.part", "downloaded_bytes": 40})
+    lease.throttle({"status": "downloading", "tmpfilename": "a.part", "downloaded_bytes": 90})
+
+    assert consumed == [0, 150, 0, 50]
+
+
+def test_resumed_download_is_not_charged_for_bytes_on_disk(clock):
+    lease = BandwidthLease(BandwidthManager(), None, clock=clock, sleep=clock.sleep)
+    lease.rate = 1000
+
+    # a restart picks up a .part file that already holds 1 GB
+    lease.throttle({"status": "downloading", "tmpfilename": "v.part", "downloaded_bytes": 10 ** 9})
+    lease.throttle({"status": "downloading", "tmpfilename": "v.part", "downloaded_bytes": 10 ** 9 + 1000})
+
+    assert clock.slept == pytest.approx(0.5)
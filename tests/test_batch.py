@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from project.services.batch import run_batch
+
+
+@pytest.mark.asyncio
+async def test_run_batch_bounds_concurrency_and_collects_errors():
+    active = 0
+    peak = 0
+    updates = []
+
+    async def worker(url):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        if url == "bad":
+            raise RuntimeError("boom")
+
+    async def on_update(p):
+        updates.append((p.done, p.failed))
+
+    urls = ["a", "b", "bad", "c", "d", "e"]
+    result = await run_batch(urls, worker, concurrency=2, on_update=on_update)
+
+    assert peak == 2
+    assert result.done == 5
+    assert result.failed == 1
+    assert result.errors == {"bad": "boom"}
+    assert result.finished
+    assert len(updates) == len(urls)
+    assert updates[-1] == (5, 1)
+
+
+@pytest.mark.asyncio
+async def test_run_batch_survives_failing_progress_callback():
+    async def worker(url):
+        return None
+
+    async def on_update(p):
+        raise RuntimeError("telegram is down")
+
+    result = await run_batch(["a", "b"], worker, concurrency=5, on_update=on_update)
+
+    assert result.done == 2
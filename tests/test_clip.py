@@ -0,0 +1,61 @@
+import dataclasses
+
+import pytest
+
+from project.handlers import download as handlers
+from project.services.clip import find_clip, fit_clip, fmt_clip, parse_clip, parse_time
+
+
+def test_parse_time_formats():
+    assert parse_time("1:02:03") == 3723
+    assert parse_time("62:03") == 3723
+    assert parse_time("90") == 90
+    with pytest.raises(ValueError):
+        parse_time("1:75")
+
+
+def test_parse_clip_from_free_text():
+    assert parse_clip("  1:02:00-1:04:30 ") == (3720, 3870)
+    assert parse_clip("от 1:00 – 2:00") == (60, 120)
+    assert parse_clip("just a link") is None
+    with pytest.raises(ValueError):
+        parse_clip("2:00-1:00")
+
+
+def test_find_clip_needs_a_marker():
+    assert find_clip("  clip 1:02:00-1:04:30") == (3720, 3870)
+    assert find_clip("✂️ 90-150") == (90, 150)
+    assert find_clip("Фрагмент: 1:00 – 2:00") == (60, 120)
+    # captions that merely contain ranges or scores
+    assert find_clip("Топ 10-20 моментов  ") is None
+    assert find_clip("Матч 3-1!  ") is None
+    assert find_clip("   2023-2024 season") is None
+    assert find_clip("clip 2:00-1:00") is None
+
+
+def test_fit_clip_clamps_to_duration():
+    assert fit_clip((60, 900), 600) == (60, 600)
+    assert fit_clip((700, 900), 600) is None
+    assert fit_clip((60, 900), None) == (60, 900)
+    assert fmt_clip((3720, 3870)) == "1:02:00–1:04:30"
+
+
+def test_duration_guard_uses_clip_length(monkeypatch):
+    monkeypatch.setattr(handlers, "settings", dataclasses.replace(handlers.settings, MAX_DURATION_SECONDS=600))
+    info = {"duration": 4 * 3600}
+
+    assert handlers._too_long_text(info) is not None
+    assert handlers._too_long_text(info, (3600, 3900)) is None
+    assert "фрагмент" in handlers._too_long_text(info, (0, 3600))
+    assert "после конца" in handlers._too_long_text(info, (5 * 3600, 5 * 3600 + 60))
+
+
+def test_clip_request_scales_estimate_and_cache_key():
+    req = handlers._make_request(
+        "https://x/v", "18", {"filesize": 1000}, "video", None, clip=(60, 120), duration=600,
+    )
+    req.media_key = "Youtube:v"
+
+    assert req.clip == (60, 120)
+    assert req.filesize == 100
+    assert handlers._upload_key(req) == "Youtube:v|18|orig|60-120"
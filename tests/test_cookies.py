@@ -0,0 +1,131 @@
+from http.cookiejar import CookieJar
+
+import pytest
+
+from project.downloader import ytdlp_client
+from project.services.cookies import CookiePool, is_cookie_failure, resolve_cookie_files
+
+
+def _cookie_file(path, value):
+    path.write_text(
+        "# Netscape HTTP Cookie File\n"
+        f".example.com\tTRUE\t/\tTRUE\t2147483647\tSID\t{value}\n"
+    )
+    return str(path)
+
+
+def test_resolve_cookie_files(tmp_path):
+    d = tmp_path / "accounts"
+    d.mkdir()
+    _cookie_file(d / "b.txt", "2")
+    _cookie_file(d / "a.txt", "1")
+    (d / "notes.md").write_text("x")
+
+    assert resolve_cookie_files(None) == []
+    assert resolve_cookie_files("x.txt, y.txt") == ["x.txt", "y.txt"]
+    assert resolve_cookie_files(str(d)) == [str(d / "a.txt"), str(d / "b.txt")]
+
+
+def test_pool_loads_once_and_rotates(tmp_path, clock):
+    a = _cookie_file(tmp_path / "a.txt", "A")
+    b = _cookie_file(tmp_path / "b.txt", "B")
+    pool = CookiePool([a, b, str(tmp_path / "missing.txt")], clock=clock)
+
+    picked = []
+    for _ in range(4):
+        clock.t += 1
+        picked.append(pool.acquire().name)
+
+    assert picked == ["a.txt", "b.txt", "a.txt", "b.txt"]
+    assert len(pool.accounts) == 2
+    assert [c.value for c in pool.accounts[0].jar] == ["A"]
+
+
+def test_failing_account_is_benched(tmp_path, clock):
+    a = _cookie_file(tmp_path / "a.txt", "A")
+    b = _cookie_file(tmp_path / "b.txt", "B")
+    pool = CookiePool([a, b], cooldown=60, clock=clock)
+
+    with pytest.raises(RuntimeError):
+        with pool.use():
+            raise RuntimeError("HTTP Error 429: Too Many Requests")
+
+    for _ in range(3):
+        clock.t += 1
+        assert pool.acquire().name == "b.txt"
+
+    # after the cooldown the throttled account is back, but only after
+    # accounts that were never throttled
+    clock.t += 60
+    assert pool.acquire().name == "b.txt"
+
+
+def test_unrelated_errors_keep_account_healthy(tmp_path, clock):
+    a = _cookie_file(tmp_path / "a.txt", "A")
+    pool = CookiePool([a], clock=clock)
+
+    with pytest.raises(ValueError):
+        with pool.use():
+            raise ValueError("Unsupported URL")
+
+    assert pool.accounts[0].unhealthy_until == 0.0
+
+
+def test_no_cookies_configured_yields_none():
+    pool = CookiePool([])
+    with pool.use() as jar:
+        assert jar is None
+
+
+def test_is_cookie_failure():
+    assert is_cookie_failure(RuntimeError("Sign in to confirm your age"))
+    assert is_cookie_failure(RuntimeError("HTTP Error 403: Forbidden"))
+    assert not is_cookie_failure(RuntimeError("Unsupported URL"))
+
+
+def test_ytdlp_uses_and_keeps_in_memory_cookies(tmp_path):
+    a = _cookie_file(tmp_path / "a.txt", "A")
+    account = CookiePool([a]).acquire()
+
+    class FakeYDL:
+        cookiejar = CookieJar()
+
+    ydl = FakeYDL()
+    ytdlp_client._use_cookies(ydl, account.jar)
+    assert [c.value for c in ydl.cookiejar] == ["A"]
+
+    # site rotated the session cookie
+    cookie = next(iter(ydl.cookiejar))
+    cookie.value = "A2"
+    ytdlp_client._keep_cookies(ydl, account.jar)
+    assert [c.value for c in account.jar] == ["A2"]
+
+
+def test_jobs_get_a_copy_and_refreshed_cookies_are_saved(tmp_path):
+    a = _cookie_file(tmp_path / "a.txt", "A")
+    pool = CookiePool([a])
+
+    with pool.use() as jar:
+        assert jar is not pool.accounts[0].jar
+        # another job's yt-dlp adding cookies doesn't touch this jar
+        next(iter(pool.checkout(pool.accounts[0]))).value = "other"
+        assert [c.value for c in jar] == ["A"]
+        next(iter(jar)).value = "A2"
+        assert [c.value for c in pool.accounts[0].jar] == ["A"]
+
+    assert [c.value for c in pool.accounts[0].jar] == ["A2"]
+    # a restart picks up the refreshed session
+    assert [c.value for c in CookiePool([a]).accounts[0].jar] == ["A2"]
+
+
+def test_failed_job_cookies_are_not_kept(tmp_path):
+    a = _cookie_file(tmp_path / "a.txt", "A")
+    pool = CookiePool([a])
+
+    with pytest.raises(RuntimeError):
+        with pool.use() as jar:
+            next(iter(jar)).value = "bad"
+            raise RuntimeError("Sign in to confirm you're not a bot")
+
+    assert [c.value for c in pool.accounts[0].jar] == ["A"]
+    assert "\tA\n" in (tmp_path / "a.txt").read_text()
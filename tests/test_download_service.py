@@ -1,3 +1,4 @@
+from project.downloader.result import DownloadResult
 from project.services.download import make_job_dir, DownloadRequest, download_and_prepare_sync, cleanup_dir
 
 
@@ -7,6 +8,14 @@ def test_make_job_dir_with_chat_id(tmp_path):
     assert "/123/" in p.replace("\\", "/")
 
 
+def test_make_job_dir_is_absolute(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    p = make_job_dir("data/downloads", chat_id=1, job_id="j")
+
+    assert p == str(tmp_path / "data" / "downloads" / "1" / "j")
+
+
 def test_cleanup_dir_removes(tmp_path):
     d = tmp_path / "job"
     d.mkdir()
@@ -20,17 +29,74 @@ def test_cleanup_dir_removes(tmp_path):
 def test_download_and_prepare_sync_calls_ytdlp(monkeypatch, tmp_path):
     called = {}
 
-    def fake_ytdlp_download(url, format_id, out_dir, progress_hook=None, to_mp3=False, cookies_file=None):
+    def fake_ytdlp_download(url, format_id, out_dir, progress_hook=None, **kw):
         called["url"] = url
         called["format_id"] = format_id
-        called["to_mp3"] = to_mp3
-        return str(tmp_path / "file.mp4")
+        called["kw"] = kw
+        return DownloadResult(path=str(tmp_path / "file.webm"), size=10, ext="webm", acodec="opus")
+
+    def fake_convert_to_mp3(src, acodec=None, abr=None, timeout=None):
+        called["convert"] = (src, acodec, abr)
+        dst = src.replace(".webm", ".mp3")
+        with open(dst, "wb") as f:
+            f.write(b"mp3")
+        return dst
 
     monkeypatch.setattr("project.services.download.ytdlp_download", fake_ytdlp_download)
+    monkeypatch.setattr("project.services.download.convert_to_mp3", fake_convert_to_mp3)
 
-    req = DownloadRequest(url="http://x", format_id="best", to_mp3=True)
+    req = DownloadRequest(url="http://x", format_id="best", to_mp3=True, acodec="opus", abr=130)
     out = download_and_prepare_sync(req, str(tmp_path))
 
-    assert out.endswith("file.mp4")
+    assert out.path.endswith("file.mp3")
+    assert (out.size, out.ext, out.acodec) == (3, "mp3", "mp3")
     assert called["format_id"] == "best"
-    assert called["to_mp3"] is True
+    # mp3 conversion is done by the audio service, not by yt-dlp
+    assert "to_mp3" not in called["kw"]
+    assert called["convert"][1:] == ("opus", 130)
+
+
+def test_extract_info_sync_falls_back_to_full_profile(monkeypatch):
+    from project.services import download
+    from project.services.mediacache import InfoCache
+
+    calls = []
+
+    def fake_extract(url, cookies_file, retries, cookies=None, options=None, max_duration=None, **net):
+        calls.append((options, max_duration))
+        return {"formats": [{"format_id": "18"}]} if options is None else {"formats": []}
+
+    monkeypatch.setattr(download, "ytdlp_extract_info", fake_extract)
+    monkeypatch.setattr(download, "info_cache", InfoCache(ttl=60))
+
+    info = download.extract_info_sync("https://example.com/v", max_duration=100, profile="menu")
+    download.extract_info_sync("https://example.com/v", max_duration=100, profile="menu")
+
+    assert info["formats"]
+    assert len(calls) == 2  # menu, then full; the second lookup is cached
+    assert calls[0][0]["extractor_args"]["youtube"]["skip"]
+    assert calls[1] == (None, 100)
+
+
+def test_playlist_probe_respects_the_circuit_breaker(monkeypatch):
+    import pytest
+
+    from project.services import download, health
+    from project.services.health import SiteHealth, SiteThrottledError
+
+    h = SiteHealth(threshold=1)
+    monkeypatch.setattr(health, "site_health", h)
+    calls = []
+
+    def fake_playlist(url, cookies_file, limit, cookies=None, **net):
+        calls.append(url)
+        raise RuntimeError("HTTP Error 429: Too Many Requests")
+
+    monkeypatch.setattr(download, "ytdlp_playlist_urls", fake_playlist)
+
+    with pytest.raises(RuntimeError):
+        download.playlist_urls_sync("https://example.com/list", 10)
+    with pytest.raises(SiteThrottledError):
+        download.playlist_urls_sync("https://example.com/list", 10)
+
+    assert len(calls) == 1
@@ -0,0 +1,107 @@
+import http.server
+import socketserver
+import threading
+
+import pytest
+
+from project.downloader import ytdlp_client
+from project.services.egress import EgressPool, Endpoint
+
+BODY = b"\x00\x00\x00\x18ftypmp42" + b"\x00" * 4096
+
+
+def _pool(clock, strategy="least_loaded"):
+    eps = [Endpoint(source_address="10.0.0.1"), Endpoint(source_address="10.0.0.2"), Endpoint(proxy="http://p:3128")]
+    return EgressPool(eps, strategy=strategy, quarantine=60, clock=clock)
+
+
+def test_least_loaded_spreads_jobs(clock):
+    pool = _pool(clock)
+
+    held = [pool.acquire("youtube.com") for _ in range(3)]
+
+    assert sorted(ep.name for ep in held) == ["10.0.0.1", "10.0.0.2", "http://p:3128"]
+    pool.release(held[1])
+    assert pool.acquire("vimeo.com") is held[1]
+
+
+def test_sticky_keeps_site_on_one_endpoint(clock):
+    pool = _pool(clock, "sticky")
+
+    first = pool.acquire("youtube.com")
+    pool.release(first)
+    again = pool.acquire("youtube.com")
+
+    assert again is first
+
+
+def test_throttled_endpoint_is_quarantined(clock):
+    pool = _pool(clock, "sticky")
+
+    with pytest.raises(RuntimeError):
+        with pool.use("youtube.com") as opts:
+            raise RuntimeError("HTTP Error 429: Too Many Requests")
+    bad = next(ep for ep in pool.endpoints if ep.quarantined_until)
+
+    assert bad.ydl_opts().items() <= opts.items()
+    assert pool.acquire("youtube.com") is not bad
+
+    clock.t += 61
+    assert pool.acquire("youtube.com") is bad
+
+
+def test_empty_pool_yields_no_options():
+    pool = EgressPool([])
+
+    with pool.use("youtube.com") as opts:
+        assert opts == {}
+
+
+class _ProxyHandler(http.server.BaseHTTPRequestHandler):
+    seen: list = []
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, with_body):
+        type(self).seen.append(self.path)
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        if with_body:
+            self.wfile.write(BODY)
+
+    def do_GET(self):
+        self._reply(True)
+
+    def do_HEAD(self):
+        self._reply(False)
+
+
+class _Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture
+def proxy_server():
+    handler = type("Handler", (_ProxyHandler,), {"seen": []})
+    srv = _Server(("127.0.0.1", 0), handler)
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    try:
+        yield f"http://127.0.0.1:{srv.server_port}", handler
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+
+def test_download_goes_through_proxy(proxy_server, tmp_path):
+    proxy, handler = proxy_server
+
+    out = ytdlp_client.download("http://media.invalid/clip.mp4", "best", str(tmp_path), proxy=proxy)
+
+    with open(out.path, "rb") as f:
+        assert f.read() == BODY
+    assert (out.size, out.ext) == (len(BODY), "mp4")
+    assert "http://media.invalid/clip.mp4" in handler.seen
@@ -28,3 +28,62 @@ def test_build_video_menu_merges_best_audio_when_video_has_no_audio(fake_info):
     assert menu[0]["height"] == 720
     assert menu[0]["id"] == "v720+a1"
     assert "+audio" in menu[0]["label"]
+
+
+def test_build_video_menu_pairs_stream_copy_compatible_audio(fake_info):
+    fake_info["formats"] = [
+        {"format_id": "opus", "vcodec": "none", "acodec": "opus", "ext": "webm", "abr": 160},
+        {"format_id": "m4a", "vcodec": "none", "acodec": "mp4a.40.2", "ext": "m4a", "abr": 128},
+        {"format_id": "avc", "vcodec": "avc1.64001F", "acodec": "none", "ext": "mp4", "height": 720},
+        {"format_id": "vp9", "vcodec": "vp9", "acodec": "none", "ext": "webm", "height": 480},
+    ]
+
+    menu = build_video_menu(fake_info, limit=10)
+    by_height = {m["height"]: m for m in menu}
+
+    # highest-abr opus is not mp4-compatible, so avc1 gets the aac track
+    assert by_height[720]["id"] == "avc+m4a"
+    assert by_height[720]["container"] == "mp4"
+    assert by_height[480]["id"] == "vp9+opus"
+    assert by_height[480]["container"] == "webm"
+
+
+def test_build_video_menu_prefers_mp4_pair_at_same_height(fake_info):
+    fake_info["formats"] = [
+        {"format_id": "m4a", "vcodec": "none", "acodec": "mp4a.40.2", "ext": "m4a", "abr": 128},
+        {"format_id": "vp9", "vcodec": "vp09.00.31.08", "acodec": "none", "ext": "webm", "height": 720,
+         "filesize": 30_000_000},
+        {"format_id": "avc", "vcodec": "avc1.4d401f", "acodec": "none", "ext": "mp4", "height": 720,
+         "filesize": 20_000_000},
+    ]
+
+    menu = build_video_menu(fake_info, limit=10)
+
+    assert menu[0]["id"] == "avc+m4a"
+    assert menu[0]["container"] == "mp4"
+
+
+def test_build_video_menu_falls_back_to_mkv(fake_info):
+    fake_info["formats"] = [
+        {"format_id": "opus", "vcodec": "none", "acodec": "opus", "ext": "webm", "abr": 160},
+        {"format_id": "avc", "vcodec": "avc1.64001F", "acodec": "none", "ext": "mp4", "height": 720},
+    ]
+
+    menu = build_video_menu(fake_info, limit=10)
+
+    assert menu[0]["id"] == "avc+opus"
+    assert menu[0]["container"] == "mkv"
+
+
+def test_sizes_are_estimated_from_bitrate(fake_info):
+    fake_info["duration"] = 100
+    fake_info["formats"] = [
+        {"format_id": "a", "vcodec": "none", "acodec": "opus", "ext": "webm", "abr": 128},
+        {"format_id": "v", "vcodec": "vp9", "acodec": "none", "ext": "webm", "height": 720, "tbr": 1000},
+    ]
+
+    audio = build_audio_menu(fake_info)
+    video = build_video_menu(fake_info)
+
+    assert audio[0]["filesize"] == 128 * 100 * 125
+    assert video[0]["filesize"] == (1000 + 128) * 100 * 125
@@ -0,0 +1,97 @@
+import dataclasses
+import http.server
+import socketserver
+import threading
+import time
+
+import pytest
+
+from project.downloader import ytdlp_client
+from project.services import download as download_service
+
+SEGMENTS = 8
+SEGMENT_BODY = (b"\x47" + b"\x00" * 187) * 10  # MPEG-TS sized packets
+
+
+class _HLSHandler(http.server.BaseHTTPRequestHandler):
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.endswith(".m3u8"):
+            lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-TARGETDURATION:2", "#EXT-X-MEDIA-SEQUENCE:0"]
+            for i in range(SEGMENTS):
+                lines += ["#EXTINF:2.0,", f"seg{i}.ts"]
+            lines.append("#EXT-X-ENDLIST")
+            body = ("\n".join(lines) + "\n").encode()
+            ctype = "application/vnd.apple.mpegurl"
+        else:
+            cls = type(self)
+            with cls.lock:
+                cls.active += 1
+                cls.peak = max(cls.peak, cls.active)
+            time.sleep(0.1)  # high-latency CDN
+            with cls.lock:
+                cls.active -= 1
+            body = SEGMENT_BODY
+            ctype = "video/mp2t"
+
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture
+def hls_server():
+    handler = type("Handler", (_HLSHandler,), {"active": 0, "peak": 0, "lock": threading.Lock()})
+    srv = _Server(("127.0.0.1", 0), handler)
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    try:
+        yield f"http://127.0.0.1:{srv.server_port}/stream/index.m3u8", handler
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_hls_fragments_are_fetched_in_parallel(hls_server, tmp_path, concurrency):
+    url, handler = hls_server
+
+    out = ytdlp_client.download(url, "best", str(tmp_path), concurrent_fragments=concurrency)
+
+    with open(out.path, "rb") as f:
+        assert f.read() == SEGMENT_BODY * SEGMENTS
+    assert handler.peak == concurrency
+
+
+def test_fragment_options_per_extractor(monkeypatch):
+    monkeypatch.setattr(
+        download_service,
+        "settings",
+        dataclasses.replace(
+            download_service.settings,
+            FRAGMENT_CONCURRENCY=4,
+            FRAGMENT_CONCURRENCY_BY_SITE={"youtube": 8},
+            EXTERNAL_DOWNLOADER="aria2c",
+            EXTERNAL_DOWNLOADER_ARGS="-x 8 -k 1M",
+        ),
+    )
+
+    yt = download_service.fragment_options("Youtube")
+    other = download_service.fragment_options("Vimeo")
+
+    assert yt["concurrent_fragments"] == 8
+    assert other["concurrent_fragments"] == 4
+    assert yt["external_downloader"] == "aria2c"
+    assert yt["external_downloader_args"] == ["-x", "8", "-k", "1M"]
@@ -1,4 +1,4 @@
-from project.handlers.download import kb_type, kb_formats
+from project.handlers.download import kb_type, kb_formats, kb_batch, kb_change, extract_urls
 
 
 def test_kb_type_buttons():
@@ -8,6 +8,7 @@ def test_kb_type_buttons():
 
     assert "🎬 Видео" in texts
     assert "dl:type:video" in cbs
+    assert "dl:clip" in cbs
     assert "dl:cancel" in cbs
 
 
@@ -18,3 +19,25 @@ def test_kb_formats_buttons():
     assert "dl:fmt:1" in cbs
     assert "dl:back:type" in cbs
     assert "dl:cancel" in cbs
+
+
+def test_kb_batch_buttons():
+    kb = kb_batch()
+    cbs = [b.callback_data for row in kb.inline_keyboard for b in row]
+
+    assert "dl:batch:video:best" in cbs
+    assert "dl:batch:audio:mp3" in cbs
+    assert "dl:cancel" in cbs
+
+
+def test_extract_urls_keeps_order_and_dedupes():
+    text = "look https://a.example/1 and https://b.example/2\nhttps://a.example/1"
+
+    assert extract_urls(text) == ["https://a.example/1", "https://b.example/2"]
+
+
+def test_kb_change_button():
+    kb = kb_change()
+    cbs = [b.callback_data for row in kb.inline_keyboard for b in row]
+
+    assert cbs == ["dl:change"]
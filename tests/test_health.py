@@ -0,0 +1,136 @@
+import pytest
+
+from project.services import health
+from project.services.health import SiteHealth, SiteThrottledError, is_throttle_error, is_transient_error, site_key
+
+
+def test_site_key_normalizes_hosts():
+    assert site_key("https://www.youtube.com/watch?v=x") == "youtube.com"
+    assert site_key("https://m.youtube.com/watch?v=x") == "youtube.com"
+    assert site_key("https://youtu.be/x") == "youtube.com"
+    assert site_key("https://vimeo.com/1") == "vimeo.com"
+
+
+def test_is_throttle_error():
+    assert is_throttle_error(RuntimeError("ERROR: unable to download: HTTP Error 429: Too Many Requests"))
+    assert is_throttle_error(RuntimeError("HTTP Error 403: Forbidden"))
+    assert not is_throttle_error(RuntimeError("Unsupported URL"))
+
+
+def test_is_transient_error():
+    assert is_transient_error(RuntimeError("HTTP Error 429: Too Many Requests"))
+    assert is_transient_error(RuntimeError("ERROR: unable to download webpage: HTTP Error 503: Service Unavailable"))
+    assert is_transient_error(RuntimeError("<urlopen error [Errno 110] Connection timed out>"))
+    assert is_transient_error(ConnectionResetError())
+    assert not is_transient_error(RuntimeError("ERROR: [youtube] x: Private video"))
+    assert not is_transient_error(RuntimeError("ERROR: Unsupported URL: https://example.com"))
+    assert not is_transient_error(RuntimeError("The uploader has not made this video available in your country"))
+
+
+def test_breaker_opens_after_threshold_and_backs_off(clock):
+    h = SiteHealth(threshold=2, base_backoff=60, max_backoff=200, clock=clock)
+
+    h.record_failure("s", throttled=True)
+    h.check("s")  # still closed
+
+    h.record_failure("s", throttled=True)
+    with pytest.raises(SiteThrottledError) as exc:
+        h.check("s")
+    assert exc.value.retry_after == pytest.approx(60)
+    assert exc.value.retry_minutes == 1
+
+    # trial after backoff fails again -> doubled backoff
+    clock.t += 61
+    h.check("s")
+    h.record_failure("s", throttled=True)
+    with pytest.raises(SiteThrottledError) as exc:
+        h.check("s")
+    assert exc.value.retry_after == pytest.approx(120)
+
+    # capped
+    clock.t += 121
+    h.record_failure("s", throttled=True)
+    with pytest.raises(SiteThrottledError) as exc:
+        h.check("s")
+    assert exc.value.retry_after == pytest.approx(200)
+
+    clock.t += 201
+    h.record_success("s")
+    h.check("s")
+
+
+def test_non_throttle_failures_do_not_open_breaker(clock):
+    h = SiteHealth(threshold=1, clock=clock)
+
+    for _ in range(5):
+        h.record_failure("s", throttled=False)
+
+    h.check("s")
+
+
+def test_retries_follow_success_rate(clock):
+    h = SiteHealth(window=4, clock=clock)
+    assert h.retry_options("new") == {"retries": 10, "fragment_retries": 10, "extractor_retries": 5}
+
+    h.record_success("s")
+    h.record_failure("s", throttled=False)
+    h.record_failure("s", throttled=False)
+    h.record_failure("s", throttled=False)
+
+    opts = h.retry_options("s")
+    assert opts["retries"] < 10
+    # never below the floor
+    assert opts == {"retries": 3, "fragment_retries": 3, "extractor_retries": 3}
+
+
+def test_guarded_call_fails_fast_when_open(monkeypatch, clock):
+    h = SiteHealth(threshold=1, clock=clock)
+    monkeypatch.setattr(health, "site_health", h)
+    calls = []
+
+    def throttled():
+        calls.append(1)
+        raise RuntimeError("HTTP Error 429: Too Many Requests")
+
+    with pytest.raises(RuntimeError):
+        health.guarded_call("s", throttled)
+    with pytest.raises(SiteThrottledError):
+        health.guarded_call("s", throttled)
+
+    assert len(calls) == 1
+
+
+def test_guarded_call_ignores_cancelled_jobs(monkeypatch, clock):
+    from project.services.jobs import JobCancelled
+
+    h = SiteHealth(threshold=1, clock=clock)
+    monkeypatch.setattr(health, "site_health", h)
+
+    def cancelled():
+        raise JobCancelled()
+
+    with pytest.raises(JobCancelled):
+        health.guarded_call("s", cancelled)
+
+    assert h.success_rate("s") == 1.0
+    assert "s" not in h.snapshot()
+
+
+def test_guarded_call_ignores_errors_about_the_video(monkeypatch, clock):
+    h = SiteHealth(clock=clock)
+    monkeypatch.setattr(health, "site_health", h)
+
+    def private():
+        raise RuntimeError("ERROR: [youtube] x: Private video. Sign in if you've been granted access")
+
+    def flaky():
+        raise RuntimeError("ERROR: unable to download webpage: HTTP Error 502: Bad Gateway")
+
+    for fn in (private, private, private):
+        with pytest.raises(RuntimeError):
+            health.guarded_call("s", fn)
+    assert h.success_rate("s") == 1.0
+
+    with pytest.raises(RuntimeError):
+        health.guarded_call("s", flaky)
+    assert h.success_rate("s") == 0.0
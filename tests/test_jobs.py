@@ -0,0 +1,184 @@
+import asyncio
+import dataclasses
+
+import pytest
+
+from project.handlers import download as handlers
+from project.handlers import ops
+from project.services.jobs import JobCancelled, JobRegistry
+from project.services.journal import JobJournal
+from project.services.scheduler import JobScheduler
+from project.utils.metrics import Metrics
+
+
+def test_progress_updates_phase_and_speed(clock):
+    reg = JobRegistry(clock=clock)
+    reg.add("1-10", 1, "https://x/v")
+
+    reg.progress("1-10", {"status": "downloading", "downloaded_bytes": 50, "total_bytes": 200, "speed": 1024.0})
+    (job,) = reg.jobs()
+    assert (job.phase, job.downloaded, job.total, job.speed) == ("downloading", 50, 200, 1024.0)
+
+    reg.progress("1-10", {"status": "finished"})
+    assert reg.jobs()[0].phase == "processing"
+
+
+def test_cancel_raises_from_progress_hook_and_check(clock):
+    reg = JobRegistry(clock=clock)
+    reg.add("1-10", 1, "https://x/v")
+
+    assert reg.cancel("1-10")
+    with pytest.raises(JobCancelled):
+        reg.progress("1-10", {"status": "downloading"})
+    with pytest.raises(JobCancelled):
+        reg.check("1-10")
+
+    reg.remove("1-10")
+    assert not reg.cancel("1-10")
+    reg.check("1-10")  # gone: nothing to raise
+
+
+async def test_cancel_interrupts_only_queued_or_sending_tasks(clock):
+    reg = JobRegistry(clock=clock)
+    waiting = asyncio.create_task(asyncio.sleep(10))
+    busy = asyncio.create_task(asyncio.sleep(10))
+    reg.add("q", 1, "https://x/1", task=waiting)
+    reg.add("d", 2, "https://x/2", task=busy)
+    reg.set_phase("d", "downloading")
+
+    reg.cancel("q")
+    reg.cancel("d")
+    await asyncio.wait([waiting], timeout=1)
+
+    assert waiting.cancelled() and reg.interrupted("q")
+    # a download stops through its progress hook instead
+    assert not busy.done() and not reg.interrupted("d")
+    busy.cancel()
+
+
+class _ProgressMsg:
+    message_id = 10
+
+    def __init__(self):
+        self.texts = []
+
+    async def edit_text(self, text, **kw):
+        self.texts.append(text)
+
+
+@pytest.fixture
+def queued_job(tmp_path, monkeypatch):
+    reg = JobRegistry()
+    journal = JobJournal(str(tmp_path / "journal.json"))
+    scheduler = JobScheduler(slots=1, small_slots=0, metrics=Metrics())
+    monkeypatch.setattr(handlers, "job_registry", reg)
+    monkeypatch.setattr(handlers, "job_journal", journal)
+    monkeypatch.setattr(handlers, "job_scheduler", scheduler)
+    monkeypatch.setattr(handlers, "media_key", lambda url: url)
+
+    async def not_cached(*a, **kw):
+        return False
+
+    monkeypatch.setattr(handlers, "_send_cached", not_cached)
+    return reg, journal, scheduler
+
+
+async def _start_queued(scheduler, msg):
+    busy = scheduler.slot(0)
+    await busy.__aenter__()
+    req = handlers.DownloadRequest(url="https://x/v", format_id="18")
+    task = asyncio.create_task(handlers._run_download(None, 1, msg, req))
+    while not scheduler.stats()["large"]["waiting"]:
+        await asyncio.sleep(0.01)
+    return task
+
+
+async def test_ops_cancel_stops_a_job_waiting_for_a_slot(queued_job):
+    reg, journal, scheduler = queued_job
+    msg = _ProgressMsg()
+    task = await _start_queued(scheduler, msg)
+    assert [j.phase for j in reg.jobs()] == ["queued"]
+
+    reg.cancel("1-10")
+
+    assert await asyncio.wait_for(task, 1) is False
+    assert msg.texts[-1] == handlers._CANCELLED_TEXT
+    assert reg.jobs() == [] and journal.pending() == []
+    assert scheduler.stats()["large"]["waiting"] == 0
+
+
+async def test_shutdown_still_keeps_the_journal(queued_job):
+    reg, journal, scheduler = queued_job
+    task = await _start_queued(scheduler, _ProgressMsg())
+
+    task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert [r.job_id for r in journal.pending()] == ["1-10"]
+
+
+def test_jobs_snapshot_is_oldest_first_and_detached(clock):
+    reg = JobRegistry(clock=clock)
+    reg.add("b", 2, "https://x/2")
+    clock.t += 5
+    reg.add("a", 1, "https://x/1")
+
+    jobs = reg.jobs()
+    jobs[0].phase = "sending"
+
+    assert [j.job_id for j in jobs] == ["b", "a"]
+    assert reg.jobs()[0].phase == "queued"
+    assert reg.elapsed(reg.jobs()[0]) == 5
+
+
+def test_ops_view_lists_jobs_and_controls(monkeypatch, clock):
+    reg = JobRegistry(clock=clock)
+    monkeypatch.setattr(ops, "job_registry", reg)
+    reg.add("1-10", 1, "https://x/<v>")
+    reg.add("2-20", 2, "https://x/2")
+    reg.progress("1-10", {"status": "downloading", "downloaded_bytes": 1, "total_bytes": 4, "speed": 2 * 1024 ** 2})
+    reg.cancel("2-20")
+    clock.t += 65
+
+    jobs = reg.jobs()
+    text = ops.ops_text(jobs, "💾 data: 0 Б")
+    cbs = [b.callback_data for row in ops.kb_ops(jobs).inline_keyboard for b in row]
+
+    assert "2.0 МБ/с · 25%" in text
+    assert "1:05" in text
+    assert "&lt;v&gt;" in text
+    assert "отменяется" in text
+    assert cbs == ["ops:cancel:1-10", "ops:pause", "ops:refresh"]
+
+    reg.paused = True
+    assert "ops:resume" in [b.callback_data for row in ops.kb_ops([]).inline_keyboard for b in row]
+
+
+def test_ops_view_shows_slot_waits_and_loop_lag(monkeypatch, clock):
+    scheduler = JobScheduler(slots=2, small_slots=1, clock=clock, metrics=Metrics())
+    monkeypatch.setattr(ops, "job_scheduler", scheduler)
+    monkeypatch.setattr(ops, "metrics", Metrics())
+    for wait in (0.2, 0.4, 3.0):
+        scheduler._record_wait("small", wait)
+
+    text = ops.ops_text([], "💾")
+    assert "малые p50 400 мс / p95 3.0 с" in text
+    assert "большие p50 0 мс" in text
+    assert "цикла событий" not in text
+
+    ops.metrics.set("event_loop_lag_seconds", 0.012)
+    ops.metrics.max("event_loop_lag_max_seconds", 1.5)
+    assert "🌀 Задержка цикла событий: 12 мс (макс. 1.5 с)" in ops.ops_text([], "💾")
+
+
+def test_ops_is_admin_only(monkeypatch):
+    monkeypatch.setattr(ops, "settings", dataclasses.replace(ops.settings, ADMIN_IDS=(7,)))
+
+    class U:
+        def __init__(self, id):
+            self.id = id
+
+    assert ops._is_admin(U(7))
+    assert not ops._is_admin(U(8))
+    assert not ops._is_admin(None)
@@ -0,0 +1,112 @@
+import http.server
+import json
+import re
+import socketserver
+import threading
+
+import pytest
+
+from project.downloader import ytdlp_client
+from project.services.download import DownloadRequest, make_job_dir
+from project.services.journal import JobJournal, JobRecord
+
+BODY = bytes(range(256)) * 400
+
+
+def _record(job_id="1-10", created=100.0):
+    req = DownloadRequest(url="https://example.com/v", format_id="18", chat_id=1, user_id=5, filesize=123)
+    return JobRecord(job_id=job_id, chat_id=1, message_id=10, job_dir="/tmp/x", request=req, created=created)
+
+
+def test_journal_survives_restart(tmp_path):
+    path = str(tmp_path / "jobs.json")
+    journal = JobJournal(path)
+    journal.add(_record())
+    journal.update("1-10", phase="sending")
+
+    pending = JobJournal(path).pending()
+
+    assert len(pending) == 1
+    assert pending[0].phase == "sending"
+    assert pending[0].request == _record().request
+
+
+def test_journal_remove_and_order(tmp_path):
+    journal = JobJournal(str(tmp_path / "jobs.json"))
+    journal.add(_record("b", created=200.0))
+    journal.add(_record("a", created=100.0))
+    journal.remove("b")
+    journal.remove("missing")
+
+    assert [r.job_id for r in journal.pending()] == ["a"]
+
+
+def test_journal_drops_broken_entries(tmp_path):
+    path = tmp_path / "jobs.json"
+    path.write_text('{"x": {"job_id": "x"}, "1-10": ' + json.dumps(_record().to_json()) + "}")
+
+    assert [r.job_id for r in JobJournal(str(path)).pending()] == ["1-10"]
+
+
+def test_job_dir_is_stable_for_a_job_id(tmp_path):
+    assert make_job_dir(str(tmp_path), chat_id=1, job_id="1-10") == make_job_dir(str(tmp_path), 1, "1-10")
+
+
+class _RangeHandler(http.server.BaseHTTPRequestHandler):
+    ranges: list = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        start = 0
+        m = re.match(r"bytes=(\d+)-", self.headers.get("Range") or "")
+        if m:
+            start = int(m.group(1))
+        type(self).ranges.append(start)
+        body = BODY[start:]
+        self.send_response(206 if start else 200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(len(body)))
+        if start:
+            self.send_header("Content-Range", f"bytes {start}-{len(BODY) - 1}/{len(BODY)}")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+
+
+class _Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture
+def range_server():
+    handler = type("Handler", (_RangeHandler,), {"ranges": []})
+    srv = _Server(("127.0.0.1", 0), handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{srv.server_port}/clip.mp4", handler
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+
+def test_resumed_download_continues_part_file(range_server, tmp_path):
+    url, handler = range_server
+    job_dir = make_job_dir(str(tmp_path), chat_id=1, job_id="1-10")
+    # what the interrupted run left behind
+    (tmp_path / "1" / "1-10").mkdir(parents=True)
+    half = len(BODY) // 2
+    (tmp_path / "1" / "1-10" / "clip [clip].mp4.part").write_bytes(BODY[:half])
+
+    out = ytdlp_client.download(url, "best", job_dir)
+
+    with open(out.path, "rb") as f:
+        assert f.read() == BODY
+    assert handler.ranges[-1] == half
@@ -0,0 +1,18 @@
+from project.services.jsonstore import JsonStore
+
+
+def test_store_roundtrip_is_atomic(tmp_path):
+    path = tmp_path / "sub" / "s.json"
+    store = JsonStore(str(path))
+    store._load()["k"] = "значение"
+    store._save()
+
+    assert JsonStore(str(path))._load() == {"k": "значение"}
+    assert [p.name for p in path.parent.iterdir()] == ["s.json"]
+
+
+def test_broken_file_starts_empty(tmp_path):
+    path = tmp_path / "s.json"
+    path.write_text("{not json")
+
+    assert JsonStore(str(path))._load() == {}
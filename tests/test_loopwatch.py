@@ -0,0 +1,45 @@
+import asyncio
+import logging
+import time
+
+import pytest
+
+from project.utils.loopwatch import LoopWatchdog
+from project.utils.metrics import Metrics
+
+
+def _blocking_call():
+    time.sleep(0.3)
+
+
+@pytest.mark.asyncio
+async def test_watchdog_measures_lag_and_logs_blocking_stack(caplog):
+    m = Metrics()
+    wd = LoopWatchdog(threshold=0.05, interval=0.02, metrics=m)
+
+    with caplog.at_level(logging.WARNING, logger="project.utils.loopwatch"):
+        wd.start()
+        await asyncio.sleep(0.05)
+        _blocking_call()
+        await asyncio.sleep(0.1)
+        await wd.stop()
+
+    assert m.get("event_loop_lag_max_seconds") >= 0.2
+    assert m.get("event_loop_stalls_total") >= 1
+    blocked = [r.getMessage() for r in caplog.records if "Event loop blocked" in r.getMessage()]
+    assert len(blocked) == 1
+    assert "_blocking_call" in blocked[0]
+
+
+@pytest.mark.asyncio
+async def test_watchdog_quiet_on_idle_loop(caplog):
+    m = Metrics()
+    wd = LoopWatchdog(threshold=0.2, interval=0.01, metrics=m)
+
+    with caplog.at_level(logging.WARNING, logger="project.utils.loopwatch"):
+        wd.start()
+        await asyncio.sleep(0.1)
+        await wd.stop()
+
+    assert m.get("event_loop_stalls_total") == 0
+    assert not [r for r in caplog.records if "Event loop blocked" in r.getMessage()]
@@ -0,0 +1,130 @@
+import threading
+import time
+
+import pytest
+
+from project.services.mediacache import InfoCache, UploadCache
+from project.services.mediakey import MediaKey, canonical_url, dedupe_urls, resolve_media_key
+
+VIDEO = MediaKey("Youtube", "dQw4w9WgXcQ")
+
+
+@pytest.mark.parametrize("url", [
+    "https://youtu.be/dQw4w9WgXcQ?si=AbC123",
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ&feature=share",
+    "https://youtube.com/shorts/dQw4w9WgXcQ",
+    "https://m.youtube.com/watch?v=dQw4w9WgXcQ&pp=ygU",
+    "https://music.youtube.com/watch?v=dQw4w9WgXcQ&si=x",
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL123&index=4",
+    "HTTPS://WWW.YOUTUBE.COM/watch?v=dQw4w9WgXcQ#t=30",
+])
+def test_youtube_links_share_one_key(url):
+    assert resolve_media_key(url) == VIDEO
+
+
+def test_other_sites_resolve_offline():
+    assert resolve_media_key("https://vimeo.com/76979871?utm_source=tg") == MediaKey("Vimeo", "76979871")
+    assert resolve_media_key("https://vk.com/video-77521_162222515").media_id == "-77521_162222515"
+
+
+def test_unknown_sites_fall_back_to_canonical_url():
+    a = resolve_media_key("https://example.com/clip.mp4?utm_campaign=x&b=2&a=1#top")
+    b = resolve_media_key("https://EXAMPLE.com/clip.mp4?a=1&b=2")
+
+    assert a == b == MediaKey("generic", "https://example.com/clip.mp4?a=1&b=2")
+
+
+def test_canonical_url_keeps_meaningful_params():
+    assert canonical_url("https://x.org/p?id=5&fbclid=zz") == "https://x.org/p?id=5"
+    assert canonical_url("https://x.org/playlist?list=PL1") == "https://x.org/playlist?list=PL1"
+
+
+def test_dedupe_urls_keeps_first_per_media():
+    urls = [
+        "https://youtu.be/dQw4w9WgXcQ",
+        "https://vimeo.com/76979871",
+        "https://www.youtube.com/watch?v=dQw4w9WgXcQ&si=1",
+    ]
+
+    assert dedupe_urls(urls) == urls[:2]
+
+
+def test_info_cache_expires(clock):
+    cache = InfoCache(ttl=60, clock=clock)
+    cache.put("k", {"id": 1})
+
+    assert cache.get("k") == {"id": 1}
+    clock.t += 61
+    assert cache.get("k") is None
+
+
+def test_info_cache_loads_once_for_concurrent_callers():
+    cache = InfoCache(ttl=60)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"id": "x"}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("k", loader))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [{"id": "x"}] * 5
+
+
+def test_info_cache_caller_arriving_as_load_finishes_reuses_it():
+    calls = []
+    late = []
+
+    class Cache(InfoCache):
+        def put(self, key, info):
+            # a second caller shows up just as the first one stores its result
+            if not late:
+                t = threading.Thread(target=lambda: late.append(self.get_or_load(key, loader)))
+                late.append(t)
+                t.start()
+                t.join(0.2)
+            super().put(key, info)
+
+    cache = Cache(ttl=60)
+
+    def loader():
+        calls.append(1)
+        return {"id": "x"}
+
+    assert cache.get_or_load("k", loader) == {"id": "x"}
+    late[0].join()
+
+    assert len(calls) == 1
+    assert late[1:] == [{"id": "x"}]
+
+
+def test_upload_cache_persists_and_is_bounded(tmp_path):
+    path = str(tmp_path / "uploads.json")
+    cache = UploadCache(path, limit=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.put("c", "3")
+    cache.forget("b")
+
+    again = UploadCache(path)
+    assert again.get("a") is None
+    assert again.get("b") is None
+    assert again.get("c") == ("3", "document")
+
+
+def test_upload_cache_keeps_the_kind_sent_as(tmp_path):
+    path = tmp_path / "uploads.json"
+    path.write_text('{"old": "1"}')
+    cache = UploadCache(str(path))
+    cache.put("v", "2", "video")
+
+    again = UploadCache(str(path))
+    assert again.get("old") == ("1", "document")
+    assert again.get("v") == ("2", "video")
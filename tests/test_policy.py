@@ -0,0 +1,42 @@
+import pytest
+
+from project.services.policy import QualityPolicy, pick_format
+
+
+def _formats():
+    return [
+        {"format_id": "a1", "vcodec": "none", "acodec": "mp4a.40.2", "ext": "m4a", "abr": 128},
+        {"format_id": "a2", "vcodec": "none", "acodec": "mp4a.40.5", "ext": "m4a", "abr": 48},
+        {"format_id": "v1080", "vcodec": "avc1", "acodec": "none", "ext": "mp4", "height": 1080},
+        {"format_id": "v720", "vcodec": "avc1", "acodec": "none", "ext": "mp4", "height": 720},
+        {"format_id": "v360", "vcodec": "avc1", "acodec": "none", "ext": "mp4", "height": 360},
+    ]
+
+
+@pytest.mark.parametrize("value", ["video:best", "video:720", "audio:mp3", "audio:orig"])
+def test_policy_roundtrip(value):
+    assert QualityPolicy.decode(value).encode() == value
+
+
+def test_policy_decode_rejects_garbage():
+    with pytest.raises(ValueError):
+        QualityPolicy.decode("audio:flac")
+    with pytest.raises(ValueError):
+        QualityPolicy.decode("nope")
+
+
+def test_pick_format_respects_max_height(fake_info):
+    fake_info["formats"] = _formats()
+
+    assert pick_format(fake_info, QualityPolicy("video"))["id"] == "v1080+a1"
+    assert pick_format(fake_info, QualityPolicy("video", max_height=720))["id"] == "v720+a1"
+    assert pick_format(fake_info, QualityPolicy("video", max_height=480))["id"] == "v360+a1"
+    assert pick_format(fake_info, QualityPolicy("video", max_height=240))["id"] == "v360+a1"
+
+
+def test_pick_format_audio_takes_best(fake_info):
+    fake_info["formats"] = _formats()
+
+    item = pick_format(fake_info, QualityPolicy("audio", audio_mode="mp3"))
+
+    assert item["id"] == "a1"
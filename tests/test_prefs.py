@@ -0,0 +1,51 @@
+import json
+
+from project.services.policy import QualityPolicy
+from project.services.prefs import PrefsStore
+
+
+def test_prefs_roundtrip_through_file(tmp_path):
+    path = tmp_path / "prefs.json"
+    store = PrefsStore(str(path))
+
+    assert store.get(1) is None
+
+    store.remember(1, QualityPolicy("video", max_height=720))
+
+    again = PrefsStore(str(path))
+    prefs = again.get(1)
+    assert prefs.policy == QualityPolicy("video", max_height=720)
+    # remembering a choice doesn't turn one-tap mode on by itself
+    assert prefs.repeat is False
+
+
+def test_set_repeat_requires_policy(tmp_path):
+    store = PrefsStore(str(tmp_path / "prefs.json"))
+
+    assert store.set_repeat(1, True) is False
+
+    store.remember(1, QualityPolicy("audio", audio_mode="mp3"))
+    assert store.set_repeat(1, True) is True
+    assert store.get(1).repeat is True
+
+    # a new choice keeps the user's repeat setting
+    store.remember(1, QualityPolicy("audio", audio_mode="orig"))
+    assert store.get(1).repeat is True
+    assert store.get(1).policy.audio_mode == "orig"
+
+
+def test_prefs_ignore_broken_entries(tmp_path):
+    path = tmp_path / "prefs.json"
+    path.write_text(json.dumps({"1": {"policy": "nope"}}))
+
+    assert PrefsStore(str(path)).get(1) is None
+
+
+def test_prefs_survive_corrupted_file(tmp_path):
+    path = tmp_path / "prefs.json"
+    path.write_text("{not json")
+    store = PrefsStore(str(path))
+
+    store.remember(2, QualityPolicy("video"))
+
+    assert json.loads(path.read_text())["2"]["policy"] == "video:best"
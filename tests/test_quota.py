@@ -0,0 +1,188 @@
+import pytest
+from aiogram.types import CallbackQuery, User
+
+from project.downloader.result import DownloadResult
+from project.handlers import download as handlers
+from project.middlewares.ratelimit import RateLimitMiddleware, quota_text
+from project.services.quota import QuotaExceededError, QuotaStore
+
+
+def test_job_bucket_allows_burst_then_refills(tmp_path, clock):
+    store = QuotaStore(str(tmp_path / "q.json"), jobs_per_hour=6, job_burst=2, clock=clock)
+
+    store.take_job(1)
+    store.take_job(1)
+    with pytest.raises(QuotaExceededError) as e:
+        store.take_job(1)
+    assert e.value.kind == "jobs"
+    assert e.value.retry_after == pytest.approx(600)
+
+    store.check(2)  # other users are not affected
+    clock.t += 600
+    store.take_job(1)
+
+
+def test_daily_bytes_allow_debt_and_refill(tmp_path, clock):
+    store = QuotaStore(str(tmp_path / "q.json"), daily_bytes=1000, clock=clock)
+
+    store.take_job(1)
+    store.charge_bytes(1, 1500)  # one big file goes over the allowance
+    with pytest.raises(QuotaExceededError) as e:
+        store.check(1)
+    assert e.value.kind == "bytes"
+    assert e.value.retry_after == pytest.approx(500 * 86400 / 1000)
+
+    clock.t += e.value.retry_after + 1
+    store.check(1)
+
+
+def test_quota_survives_restart(tmp_path, clock):
+    path = str(tmp_path / "q.json")
+    store = QuotaStore(path, jobs_per_hour=1, job_burst=1, clock=clock)
+    store.take_job(1)
+
+    again = QuotaStore(path, jobs_per_hour=1, job_burst=1, clock=clock)
+    with pytest.raises(QuotaExceededError):
+        again.check(1)
+
+
+def test_disabled_store_never_limits(tmp_path):
+    store = QuotaStore(str(tmp_path / "q.json"))
+
+    for _ in range(100):
+        store.take_job(1)
+        store.charge_bytes(1, 10 ** 12)
+
+    assert not (tmp_path / "q.json").exists()
+
+
+def test_quota_text_mentions_wait():
+    assert "5 мин." in quota_text(QuotaExceededError("jobs", 300))
+    assert "трафика" in quota_text(QuotaExceededError("bytes", 7200))
+    assert "2 ч 0 мин." in quota_text(QuotaExceededError("bytes", 7200))
+
+
+@pytest.mark.asyncio
+async def test_middleware_stops_limited_user(tmp_path, monkeypatch, clock):
+    store = QuotaStore(str(tmp_path / "q.json"), jobs_per_hour=1, job_burst=1, clock=clock)
+    store.take_job(7)
+    middleware = RateLimitMiddleware(store)
+    answers = []
+
+    async def fake_answer(self, text=None, show_alert=None, **kw):
+        answers.append(text)
+
+    monkeypatch.setattr(CallbackQuery, "answer", fake_answer)
+    user = User(id=7, is_bot=False, first_name="u")
+    calls = []
+
+    async def handler(event, data):
+        calls.append(event.data)
+
+    def call(data):
+        return CallbackQuery(id="1", from_user=user, chat_instance="c", data=data)
+
+    await middleware(handler, call("dl:fmt:18"), {"event_from_user": user})
+    await middleware(handler, call("dl:cancel"), {"event_from_user": user})
+
+    assert calls == ["dl:cancel"]
+    assert answers and "Попробуй через" in answers[0]
+
+
+class _Msg:
+    def __init__(self):
+        self.chat = type("Chat", (), {"id": 1})()
+        self.texts = []
+
+    async def edit_text(self, text, **kw):
+        self.texts.append(text)
+        return self
+
+
+class _State:
+    def __init__(self, data):
+        self.data = data
+
+    async def get_data(self):
+        return self.data
+
+    async def set_state(self, state):
+        pass
+
+    async def clear(self):
+        self.data = {}
+
+
+class _Call:
+    def __init__(self):
+        self.data = "dl:batch:" + handlers.QualityPolicy("video", max_height=720).encode()
+        self.message = _Msg()
+        self.from_user = type("User", (), {"id": 7})()
+        self.bot = None
+
+    async def answer(self, *a, **kw):
+        pass
+
+
+def _batch_handler(monkeypatch, tmp_path, store):
+    monkeypatch.setattr(handlers, "quota_store", store)
+    monkeypatch.setattr(handlers, "_chat_lock_users", handlers.Counter())
+    monkeypatch.setattr(handlers, "_extract", _async({"title": "t", "duration": 10}))
+    monkeypatch.setattr(handlers, "pick_format", lambda info, policy: {"id": "18"})
+    monkeypatch.setattr(handlers, "media_key", lambda url: url)
+    monkeypatch.setattr(handlers, "_send_cached", _async(False))
+    monkeypatch.setattr(handlers, "_download", _async(DownloadResult(path=str(tmp_path / "a.mp4"), size=1)))
+    monkeypatch.setattr(handlers, "_send_result", _async(None))
+    monkeypatch.setattr(handlers.prefs_store, "remember", lambda *a: None)
+
+
+def _async(value):
+    async def fake(*a, **kw):
+        return value
+
+    return fake
+
+
+async def test_batch_costs_one_job_token(tmp_path, monkeypatch, clock):
+    store = QuotaStore(str(tmp_path / "q.json"), jobs_per_hour=5, job_burst=5, clock=clock)
+    _batch_handler(monkeypatch, tmp_path, store)
+    urls = [f"https://x/{i}" for i in range(8)]
+    call = _Call()
+
+    await handlers.on_batch_policy_selected(call, _State({"urls": urls}))
+
+    assert call.message.texts[-1] == "✅ Пакет готов: 8/8"
+    for _ in range(4):
+        store.take_job(7)
+    with pytest.raises(QuotaExceededError):
+        store.take_job(7)
+
+
+async def test_batch_refused_when_out_of_jobs(tmp_path, monkeypatch, clock):
+    store = QuotaStore(str(tmp_path / "q.json"), jobs_per_hour=1, job_burst=1, clock=clock)
+    store.take_job(7)
+    _batch_handler(monkeypatch, tmp_path, store)
+    call = _Call()
+
+    await handlers.on_batch_policy_selected(call, _State({"urls": ["https://x/1", "https://x/2"]}))
+
+    assert call.message.texts == [quota_text(QuotaExceededError("jobs", 3600))]
+
+
+async def test_batch_items_go_through_the_shared_pipeline(tmp_path, monkeypatch, clock):
+    store = QuotaStore(str(tmp_path / "q.json"), jobs_per_hour=5, job_burst=5, clock=clock)
+    _batch_handler(monkeypatch, tmp_path, store)
+    captions = []
+
+    async def send_result(bot, chat_id, result, data=None, caption=None):
+        captions.append(caption)
+        if len(captions) == 2:
+            raise RuntimeError("Request Entity Too Large")
+
+    monkeypatch.setattr(handlers, "_send_result", send_result)
+    call = _Call()
+
+    await handlers.on_batch_policy_selected(call, _State({"urls": ["https://x/1", "https://x/2"]}))
+
+    assert captions == ["t", "t"]
+    assert call.message.texts[-1].startswith("✅ Пакет готов: 1/2\n❌ Не удалось (1)")
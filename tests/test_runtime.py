@@ -0,0 +1,53 @@
+import dataclasses
+
+from aiogram.client.telegram import TelegramAPIServer
+
+from project.utils import runtime
+
+
+def _settings(monkeypatch, **changes):
+    monkeypatch.setattr(runtime, "settings", dataclasses.replace(runtime.settings, **changes))
+
+
+def test_default_profile_keeps_aiogram_session(monkeypatch):
+    _settings(monkeypatch, FAST_RUNTIME=False)
+
+    assert runtime.make_session() is None
+
+    api = TelegramAPIServer.from_base("http://localhost:8081")
+    assert runtime.make_session(api).api is api
+
+
+async def test_fast_profile_tunes_session(monkeypatch):
+    _settings(monkeypatch, FAST_RUNTIME=True, BOT_HTTP_POOL=8, BOT_HTTP_KEEPALIVE=90, BOT_HTTP_TIMEOUT=15)
+
+    session = runtime.make_session()
+    client = await session.create_session()
+    try:
+        assert client.connector.limit == 8
+        assert client.connector._keepalive_timeout == 90
+        assert session.timeout == 15
+        assert session.json_loads is runtime.json_codec()[0]
+        assert await session.create_session() is client
+    finally:
+        await session.close()
+
+    assert client.closed
+
+
+def test_json_codec_dumps_to_str():
+    loads, dumps, _ = runtime.json_codec()
+
+    out = dumps({"text": "привет", "n": 1})
+
+    assert isinstance(out, str)
+    assert loads(out) == {"text": "привет", "n": 1}
+
+
+def test_run_without_fast_runtime_uses_asyncio(monkeypatch):
+    _settings(monkeypatch, FAST_RUNTIME=False)
+
+    async def main():
+        return 42
+
+    assert runtime.run(main()) == 42
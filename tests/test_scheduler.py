@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from project.services.scheduler import JobScheduler
+from project.utils.metrics import Metrics
+
+MB = 1024 ** 2
+
+
+async def _hold(scheduler, cost, started, gate):
+    async with scheduler.slot(cost) as lane:
+        started.append((cost, lane))
+        await gate.wait()
+
+
+@pytest.mark.asyncio
+async def test_small_jobs_jump_the_queue(clock):
+    s = JobScheduler(slots=1, small_slots=0, small_bytes=10 * MB, clock=clock, metrics=Metrics())
+    started, gate = [], asyncio.Event()
+
+    first = asyncio.create_task(_hold(s, 900 * MB, started, gate))
+    await asyncio.sleep(0)
+    waiting = [asyncio.create_task(_hold(s, c, started, gate)) for c in (800 * MB, 4 * MB, 0)]
+    await asyncio.sleep(0)
+    assert s.stats()["large"]["waiting"] == 2
+
+    gate.set()
+    await asyncio.gather(first, *waiting)
+
+    # unknown size counts as 512 MB
+    assert [c for c, _ in started] == [900 * MB, 4 * MB, 0, 800 * MB]
+    assert started[1][1] == "small"
+
+
+@pytest.mark.asyncio
+async def test_reserved_slot_is_kept_for_small_jobs():
+    s = JobScheduler(slots=2, small_slots=1, small_bytes=10 * MB, metrics=Metrics())
+    started, gate = [], asyncio.Event()
+
+    tasks = [asyncio.create_task(_hold(s, c, started, gate)) for c in (500 * MB, 600 * MB, 5 * MB)]
+    await asyncio.sleep(0)
+
+    assert [c for c, _ in started] == [500 * MB, 5 * MB]
+    assert s.would_queue(700 * MB)
+    gate.set()
+    await asyncio.gather(*tasks)
+
+
+@pytest.mark.asyncio
+async def test_aging_lets_large_jobs_through(clock):
+    s = JobScheduler(slots=1, small_slots=0, small_bytes=10 * MB, aging=60, clock=clock, metrics=Metrics())
+    started, gate = [], asyncio.Event()
+
+    first = asyncio.create_task(_hold(s, 5 * MB, started, gate))
+    await asyncio.sleep(0)
+    big = asyncio.create_task(_hold(s, 100 * MB, started, gate))
+    await asyncio.sleep(0)
+    clock.t += 3600  # the big job has waited an hour
+    small = asyncio.create_task(_hold(s, 5 * MB, started, gate))
+    await asyncio.sleep(0)
+
+    gate.set()
+    await asyncio.gather(first, big, small)
+
+    assert [c for c, _ in started] == [5 * MB, 100 * MB, 5 * MB]
+    assert s.stats()["large"]["max"] == 3600
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_frees_its_place():
+    s = JobScheduler(slots=1, small_slots=0, metrics=Metrics())
+    started, gate = [], asyncio.Event()
+
+    first = asyncio.create_task(_hold(s, 1, started, gate))
+    await asyncio.sleep(0)
+    doomed = asyncio.create_task(_hold(s, 1, started, gate))
+    await asyncio.sleep(0)
+    doomed.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await doomed
+
+    gate.set()
+    await first
+    async with s.slot(1):
+        pass
+    assert s.stats()["small"]["running"] == 0
@@ -0,0 +1,103 @@
+import dataclasses
+import os
+
+import pytest
+
+from project.downloader.ytdlp_client import FileTooLargeError
+from project.handlers import download as handlers
+from project.services import scratch
+from project.services.scratch import RamBudget, place_job, read_if_small
+
+
+@pytest.fixture
+def small_mode(monkeypatch, tmp_path):
+    cfg = dataclasses.replace(
+        scratch.settings,
+        SCRATCH_DIR=str(tmp_path / "shm"),
+        DOWNLOADS_DIR=str(tmp_path / "disk"),
+        SMALL_FILE_THRESHOLD=1000,
+    )
+    monkeypatch.setattr(scratch, "settings", cfg)
+    return cfg
+
+
+def test_ram_budget_reserve_and_release():
+    b = RamBudget(100)
+
+    assert b.reserve(60)
+    assert not b.reserve(50)
+    b.release(60)
+    assert b.reserve(100)
+    assert not b.reserve(0)
+
+
+def test_small_job_goes_to_scratch_within_budget(small_mode):
+    budget = RamBudget(2000)
+
+    p = place_job(1, 400, budget)
+    assert p.in_memory
+    assert p.job_dir.startswith(small_mode.SCRATCH_DIR)
+    assert budget.used == 1200
+
+    # budget exhausted -> disk
+    p2 = place_job(1, 400, budget)
+    assert not p2.in_memory
+    assert p2.job_dir.startswith(small_mode.DOWNLOADS_DIR)
+
+    p.release()
+    p.release()
+    assert budget.used == 0
+
+
+def test_oversized_scratch_job_spills_to_disk(small_mode):
+    budget = RamBudget(2000)
+    p = place_job(1, 400, budget, job_id="j")
+    # the cap leaves headroom over the estimate
+    assert p.max_filesize == 600
+    scratch_dir = p.job_dir
+    os.makedirs(scratch_dir)
+
+    p.spill()
+
+    assert not os.path.exists(scratch_dir)
+    assert p.job_dir.startswith(small_mode.DOWNLOADS_DIR)
+    assert not p.in_memory and p.max_filesize is None
+    assert budget.used == 0
+
+
+async def test_handler_retries_oversized_scratch_job_on_disk(small_mode, monkeypatch):
+    calls = []
+
+    def fake_download(req, job_dir, hook, max_filesize):
+        calls.append((job_dir, max_filesize))
+        if max_filesize:
+            raise FileTooLargeError(max_filesize)
+        return "result"
+
+    monkeypatch.setattr(handlers, "download_and_prepare_sync", fake_download)
+    p = place_job(1, 400, RamBudget(2000), job_id="j")
+
+    result = await handlers._download_placed(handlers.DownloadRequest(url="u", format_id="b"), p, None, "j")
+
+    assert result == "result"
+    assert calls == [(calls[0][0], 600), (p.job_dir, None)]
+    assert calls[0][0].startswith(small_mode.SCRATCH_DIR)
+    assert p.job_dir.startswith(small_mode.DOWNLOADS_DIR)
+
+
+def test_big_or_unknown_jobs_go_to_disk(small_mode):
+    budget = RamBudget(10_000)
+
+    assert not place_job(1, 5000, budget).in_memory
+    assert not place_job(1, 0, budget).in_memory
+    assert budget.used == 0
+
+
+def test_read_if_small(small_mode, tmp_path):
+    small = tmp_path / "a.m4a"
+    small.write_bytes(b"x" * 10)
+    big = tmp_path / "b.m4a"
+    big.write_bytes(b"x" * 2000)
+
+    assert read_if_small(str(small)) == b"x" * 10
+    assert read_if_small(str(big)) is None
@@ -0,0 +1,61 @@
+import re
+
+import pytest
+
+from project.services import splitter
+from project.services.ffmpeg import FFmpegError
+
+
+def _fake_ffmpeg(monkeypatch, runs):
+    """Writes the parts described by `runs` (one list of sizes per call)."""
+    calls = []
+
+    def run(args, timeout=None):
+        calls.append(args)
+        pattern = args[-1]
+        for i, size in enumerate(runs[len(calls) - 1]):
+            with open(pattern.replace("%03d", f"{i:03d}").replace("%%", "%"), "wb") as f:
+                f.write(b"x" * size)
+
+    monkeypatch.setattr(splitter, "run_ffmpeg", run)
+    return calls
+
+
+def test_split_stream_copies_into_ordered_parts(tmp_path, monkeypatch):
+    src = tmp_path / "Big [id1].mp4"
+    src.write_bytes(b"x" * 250)
+    calls = _fake_ffmpeg(monkeypatch, [[90, 90, 70]])
+
+    parts = splitter.split_media(str(src), 100, duration=250)
+
+    assert [p.rsplit("/", 1)[1] for p in parts] == [
+        "Big [id1].part000.mp4", "Big [id1].part001.mp4", "Big [id1].part002.mp4",
+    ]
+    args = calls[0]
+    assert args[args.index("-c") + 1] == "copy"
+    assert float(args[args.index("-segment_time") + 1]) == pytest.approx(90)
+
+
+def test_split_retries_with_shorter_segments(tmp_path, monkeypatch):
+    src = tmp_path / "a 100%.mkv"
+    src.write_bytes(b"x" * 250)
+    calls = _fake_ffmpeg(monkeypatch, [[150, 100], [80, 80, 80, 10]])
+
+    parts = splitter.split_media(str(src), 100, duration=250)
+
+    assert len(parts) == 4
+    assert len(calls) == 2
+    assert "a 100%%.part%03d.mkv" in calls[0][-1]
+    first, second = (float(c[c.index("-segment_time") + 1]) for c in calls)
+    assert second < first
+    assert not any(re.search(r"part00[4-9]", p) for p in parts)
+
+
+def test_split_keeps_small_files_and_needs_duration(tmp_path, monkeypatch):
+    src = tmp_path / "a.mp4"
+    src.write_bytes(b"x" * 50)
+    _fake_ffmpeg(monkeypatch, [])
+
+    assert splitter.split_media(str(src), 100, duration=None) == [str(src)]
+    with pytest.raises(FFmpegError):
+        splitter.split_media(str(src), 10, duration=None)
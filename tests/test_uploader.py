@@ -1,4 +1,7 @@
+import dataclasses
+
 import pytest
+from project.downloader.result import DownloadResult
 from project.services import uploader
 
 
@@ -7,7 +10,7 @@ class FakeBot:
         self.fail = fail
         self.sent = []
 
-    async def send_document(self, chat_id, document, caption=None):
+    async def send_document(self, chat_id, document, caption=None, **kw):
         if self.fail:
             raise RuntimeError("Entity too large")
         self.sent.append((chat_id, str(document), caption))
@@ -43,6 +46,50 @@ async def test_send_file_smart_bot_api_success(tmp_path, monkeypatch):
     assert pct == [100]
 
 
+@pytest.mark.asyncio
+async def test_send_file_smart_uploads_from_memory(tmp_path, monkeypatch):
+    bot = FakeBot()
+    sent = {}
+
+    async def send_document(chat_id, document, caption=None, **kw):
+        sent["document"] = document
+
+    bot.send_document = send_document
+
+    await uploader.send_file_smart(bot, 1, tmp_path / "song.mp3", data=b"abc")
+
+    assert isinstance(sent["document"], uploader.BufferedInputFile)
+    assert sent["document"].data == b"abc"
+    assert sent["document"].filename == "song.mp3"
+
+
+@pytest.mark.asyncio
+async def test_streamable_mp4_is_sent_as_video(tmp_path):
+    bot = FakeBot()
+    sent = {}
+
+    async def send_video(chat_id, video, caption=None, **kw):
+        sent.update(kw)
+
+    bot.send_video = send_video
+    f = tmp_path / "clip.mp4"
+    f.write_bytes(b"abc")
+    h264 = DownloadResult(
+        path=str(f), size=3, ext="mp4", vcodec="avc1.64001F", acodec="mp4a.40.2",
+        duration=61.6, width=1280, height=720,
+    )
+    vp9 = DownloadResult(path=str(f), size=3, ext="mp4", vcodec="vp09.00.40.08", acodec="mp4a.40.2")
+
+    await uploader.send_file_smart(bot, 1, f, result=h264)
+    await uploader.send_file_smart(bot, 1, f, result=vp9)
+
+    assert sent == {
+        "width": 1280, "height": 720, "duration": 62, "supports_streaming": True,
+        "request_timeout": uploader.settings.UPLOAD_TIMEOUT or None,
+    }
+    assert len(bot.sent) == 1  # the VP9 file went out as a document
+
+
 @pytest.mark.asyncio
 async def test_send_file_smart_fallback_to_telethon(tmp_path, monkeypatch):
     bot = FakeBot(fail=True)
@@ -75,10 +122,28 @@ async def test_send_file_smart_raises_if_no_telethon(tmp_path, monkeypatch):
     f = tmp_path / "x.bin"
     f.write_bytes(b"x")
 
-    with pytest.raises(RuntimeError):
+    # too-big errors come back in the form the splitter looks for
+    with pytest.raises(RuntimeError, match="^FILE_TOO_BIG$"):
         await uploader.send_file_smart(bot, 1, f)
 
 
+@pytest.mark.asyncio
+async def test_send_file_smart_keeps_other_errors_without_telethon(tmp_path, monkeypatch):
+    class BrokenBot(FakeBot):
+        async def send_document(self, chat_id, document, caption=None, **kw):
+            raise RuntimeError("Bad Request: chat not found")
+
+    async def fake_get_client():
+        return None
+
+    monkeypatch.setattr(uploader, "_get_telethon_client", fake_get_client)
+    f = tmp_path / "x.bin"
+    f.write_bytes(b"x")
+
+    with pytest.raises(RuntimeError, match="chat not found"):
+        await uploader.send_file_smart(BrokenBot(), 1, f)
+
+
 @pytest.mark.asyncio
 async def test_close_telethon_client_disconnects(monkeypatch):
     fake_client = FakeTelethonClient()
@@ -88,3 +153,163 @@ async def test_close_telethon_client_disconnects(monkeypatch):
 
     assert fake_client.disconnected is True
     assert uploader._telethon_client is None
+
+
+@pytest.mark.asyncio
+async def test_send_file_smart_returns_file_id(tmp_path):
+    class Sent:
+        document = type("Doc", (), {"file_id": "FILE123"})()
+
+    bot = FakeBot()
+
+    async def send_document(chat_id, document, caption=None, **kw):
+        return Sent()
+
+    bot.send_document = send_document
+    f = tmp_path / "a.txt"
+    f.write_text("hi")
+
+    assert await uploader.send_file_smart(bot, 1, f) == "FILE123"
+
+
+@pytest.fixture
+async def bot_api_stub():
+    """Stands in for a local Bot API server, recording sendDocument calls."""
+    from aiohttp import web
+
+    calls = []
+
+    async def send_document(request):
+        form = await request.post()
+        doc = form["document"]
+        if doc.startswith("attach://"):
+            doc = ("upload", form[doc[len("attach://"):]].file.read())
+        calls.append(doc)
+        return web.json_response({
+            "ok": True,
+            "result": {
+                "message_id": 1,
+                "date": 0,
+                "chat": {"id": 1, "type": "private"},
+                "document": {"file_id": "LOCAL1", "file_unique_id": "u1"},
+            },
+        })
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/sendDocument", send_document)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}", calls
+    finally:
+        await runner.cleanup()
+
+
+def _local_bot(base):
+    from aiogram import Bot
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+
+    api = TelegramAPIServer.from_base(base, is_local=True)
+    return Bot(token="42:TEST", session=AiohttpSession(api=api))
+
+
+@pytest.mark.asyncio
+async def test_local_bot_api_sends_downloads_by_path(bot_api_stub, tmp_path, monkeypatch):
+    base, calls = bot_api_stub
+    downloads = tmp_path / "downloads"
+    f = downloads / "1" / "job" / "video.mp4"
+    f.parent.mkdir(parents=True)
+    f.write_bytes(b"v" * 1000)
+    monkeypatch.setattr(uploader, "settings", dataclasses.replace(
+        uploader.settings, DOWNLOADS_DIR=str(downloads), BOT_API_LOCAL=True, BOT_API_FILES_DIR="/srv/downloads",
+    ))
+    bot = _local_bot(base)
+    try:
+        file_id = await uploader.send_file_smart(bot, 1, f)
+    finally:
+        await bot.session.close()
+
+    assert file_id == "LOCAL1"
+    assert calls == ["file:///srv/downloads/1/job/video.mp4"]
+
+
+@pytest.mark.asyncio
+async def test_local_bot_api_uploads_files_outside_downloads(bot_api_stub, tmp_path, monkeypatch):
+    base, calls = bot_api_stub
+    f = tmp_path / "scratch" / "song.mp3"
+    f.parent.mkdir()
+    f.write_bytes(b"abc")
+    monkeypatch.setattr(uploader, "settings", dataclasses.replace(
+        uploader.settings, DOWNLOADS_DIR=str(tmp_path / "downloads"), BOT_API_LOCAL=True,
+    ))
+    bot = _local_bot(base)
+    try:
+        await uploader.send_file_smart(bot, 1, f)
+    finally:
+        await bot.session.close()
+
+    assert calls == [("upload", b"abc")]
+
+
+@pytest.mark.asyncio
+async def test_files_over_the_limit_go_straight_to_telethon(tmp_path, monkeypatch):
+    bot = FakeBot()
+    fake_client = FakeTelethonClient()
+
+    async def fake_get_client():
+        return fake_client
+
+    monkeypatch.setattr(uploader, "_get_telethon_client", fake_get_client)
+    monkeypatch.setattr(uploader, "_BOT_API_LIMIT", 10)
+    f = tmp_path / "big.bin"
+    f.write_bytes(b"x" * 11)
+
+    assert await uploader.send_file_smart(bot, 1, f) is None
+    assert not bot.sent
+    assert fake_client.sent_files
+
+
+@pytest.mark.asyncio
+async def test_send_parts_numbers_captions(tmp_path, monkeypatch):
+    bot = FakeBot()
+    parts = []
+    for i in range(3):
+        p = tmp_path / f"v.part00{i}.mp4"
+        p.write_bytes(b"x")
+        parts.append(str(p))
+
+    await uploader.send_parts(bot, 1, parts, caption="Title", concurrency=2)
+
+    assert sorted(c for _, _, c in bot.sent) == ["Title\nЧасть 1/3", "Title\nЧасть 2/3", "Title\nЧасть 3/3"]
+
+
+def test_max_file_size_counts_telethon(monkeypatch):
+    s = dataclasses.replace(uploader.settings, BOT_API_LOCAL=False, TELETHON_API_ID=None, TELETHON_API_HASH=None)
+    monkeypatch.setattr(uploader, "settings", s)
+    assert uploader.max_file_size() == uploader._BOT_API_LIMIT
+
+    monkeypatch.setattr(uploader, "settings", dataclasses.replace(s, TELETHON_API_ID=1, TELETHON_API_HASH="h"))
+    assert uploader.max_file_size() == uploader._LOCAL_API_LIMIT
+
+
+@pytest.mark.asyncio
+async def test_fallback_rate_counts_telethon_sends(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploader, "_recent_uploads", uploader.deque(maxlen=10))
+    monkeypatch.setattr(uploader, "_telethon_client", None)
+    f = tmp_path / "a.txt"
+    f.write_text("hi")
+
+    await uploader.send_file_smart(FakeBot(), 1, f)
+    client = FakeTelethonClient()
+
+    async def get_client():
+        return client
+
+    monkeypatch.setattr(uploader, "_get_telethon_client", get_client)
+    await uploader.send_file_smart(FakeBot(fail=True), 1, f)
+
+    assert uploader.fallback_rate() == (1, 2)
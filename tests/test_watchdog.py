@@ -0,0 +1,157 @@
+import asyncio
+import dataclasses
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from project.handlers import download as handlers
+from project.services.jobs import JobCancelled, JobRegistry
+from project.services.watchdog import JobWatchdog, kill_job_processes
+from project.utils.metrics import Metrics
+
+
+def _watchdog(reg, clock, killed):
+    return JobWatchdog(
+        reg,
+        stall=60,
+        download_deadline=600,
+        processing_deadline=120,
+        kill=lambda d: killed.append(d) or 1,
+        clock=clock,
+        metrics=Metrics(),
+    )
+
+
+def test_stalled_download_is_cancelled_and_killed(clock):
+    reg = JobRegistry(clock=clock)
+    killed = []
+    wd = _watchdog(reg, clock, killed)
+    reg.add("stuck", 1, "https://x/1")
+    reg.set_phase("stuck", "downloading", job_dir="/jobs/stuck")
+    reg.add("busy", 2, "https://x/2")
+    reg.set_phase("busy", "downloading", job_dir="/jobs/busy")
+
+    clock.t += 50
+    reg.progress("busy", {"status": "downloading", "downloaded_bytes": 10})
+    clock.t += 20
+
+    assert wd.check() == ["stuck"]
+    assert killed == ["/jobs/stuck"]
+    assert wd.metrics.get("jobs_stalled_total") == 1
+    with pytest.raises(JobCancelled) as exc:
+        reg.progress("stuck", {"status": "downloading", "downloaded_bytes": 1})
+    assert exc.value.reason == "stalled"
+
+
+def test_processing_deadline_and_admin_cancel_kill_subprocesses(clock):
+    reg = JobRegistry(clock=clock)
+    killed = []
+    wd = _watchdog(reg, clock, killed)
+    reg.add("merge", 1, "https://x/1")
+    reg.set_phase("merge", "downloading", job_dir="/jobs/merge")
+    reg.progress("merge", {"status": "finished"})
+    reg.add("ops", 2, "https://x/2")
+    reg.set_phase("ops", "processing", job_dir="/jobs/ops")
+    reg.cancel("ops")
+
+    clock.t += 100
+    assert wd.check() == []
+    assert killed == ["/jobs/ops"]
+
+    clock.t += 30
+    assert wd.check() == ["merge"]
+    assert reg.cancel_reason("merge") == "deadline"
+    assert "/jobs/merge" in killed
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="needs procfs")
+def test_kill_job_processes_only_hits_that_job(tmp_path):
+    job = tmp_path / "job1"
+    other = tmp_path / "job2"
+    code = "import time; time.sleep(30)"
+    mine = subprocess.Popen([sys.executable, "-c", code, str(job / "a.mp4")])
+    theirs = subprocess.Popen([sys.executable, "-c", code, str(other / "a.mp4")])
+    try:
+        time.sleep(0.2)
+        assert kill_job_processes(str(job)) == 1
+        assert mine.wait(5) == -9
+        assert theirs.poll() is None
+    finally:
+        theirs.kill()
+        mine.kill()
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="needs procfs")
+def test_kill_job_processes_with_relative_job_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    code = "import time; time.sleep(30)"
+    # started with a relative path, as with the default DOWNLOADS_DIR
+    rel = subprocess.Popen([sys.executable, "-c", code, "data/downloads/1/job1/a.mp4"])
+    sibling = subprocess.Popen([sys.executable, "-c", code, "data/downloads/1/job10/a.mp4"])
+    try:
+        time.sleep(0.2)
+        assert kill_job_processes(str(tmp_path / "data/downloads/1/job1")) == 1
+        assert rel.wait(5) == -9
+        assert sibling.poll() is None
+        assert kill_job_processes("data/downloads/1/job10") == 1
+        assert sibling.wait(5) == -9
+    finally:
+        sibling.kill()
+        rel.kill()
+
+
+@pytest.mark.asyncio
+async def test_idle_chat_locks_are_evicted(monkeypatch):
+    locks = handlers.defaultdict(asyncio.Lock)
+    monkeypatch.setattr(handlers, "_chat_locks", locks)
+    monkeypatch.setattr(handlers, "_chat_lock_users", handlers.Counter())
+    async with handlers._chat_lock(1):
+        locks[2]
+        locks[3]
+
+        assert handlers.evict_idle_chat_locks() == 2
+        assert list(locks) == [1]
+
+    assert handlers.evict_idle_chat_locks() == 1
+    assert not handlers._chat_lock_users
+
+
+@pytest.mark.asyncio
+async def test_waiting_chat_lock_survives_eviction(monkeypatch):
+    monkeypatch.setattr(handlers, "_chat_locks", handlers.defaultdict(asyncio.Lock))
+    monkeypatch.setattr(handlers, "_chat_lock_users", handlers.Counter())
+    order = []
+
+    async def job(name):
+        async with handlers._chat_lock(1):
+            order.append(name)
+            await asyncio.sleep(0.01)
+            order.append(name)
+
+    first = asyncio.create_task(job("a"))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(job("b"))
+    await asyncio.sleep(0)
+    handlers.evict_idle_chat_locks()
+    # a third caller must queue on the same lock, not get a fresh one
+    await asyncio.gather(first, second, job("c"))
+
+    assert order == ["a", "a", "b", "b", "c", "c"]
+
+
+@pytest.mark.asyncio
+async def test_download_gives_up_on_a_hung_thread(monkeypatch):
+    s = dataclasses.replace(handlers.settings, DOWNLOAD_TIMEOUT=1, POSTPROCESS_TIMEOUT=1, WATCHDOG_INTERVAL=0)
+    monkeypatch.setattr(handlers, "settings", s)
+    reg = JobRegistry()
+    monkeypatch.setattr(handlers, "job_registry", reg)
+    reg.add("j", 1, "https://x/1")
+    monkeypatch.setattr(handlers, "download_and_prepare_sync", lambda *a: time.sleep(3))
+
+    with pytest.raises(JobCancelled):
+        await handlers._download(handlers.DownloadRequest(url="u", format_id="b"), "/tmp/j", None, "j")
+
+    assert reg.cancel_reason("j") == "deadline"
@@ -1,28 +1,98 @@
-from pathlib import Path
-from project.downloader.ytdlp_client import _pick_best_existing_file
+import pytest
 
+from project.downloader.result import DownloadResult
 
-def test_pick_best_existing_file(tmp_path):
-    video_id = "abc"
 
-    p1 = tmp_path / f"t1 [{video_id}].mp4"
-    p2 = tmp_path / f"t2 [{video_id}].mp4"
-    p1.write_bytes(b"x" * 10)
-    p2.write_bytes(b"x" * 100)
+def test_result_from_info():
+    info = {
+        "ext": "mp4",
+        "vcodec": "avc1.64001F",
+        "acodec": "mp4a.40.2",
+        "duration": 12.5,
+        "width": 1280,
+        "height": 720,
+        "title": "clip",
+    }
 
-    best = _pick_best_existing_file(str(tmp_path), video_id)
+    r = DownloadResult.from_info(info, "/d/clip.mp4", 1000)
 
-    assert Path(best).name == p2.name
+    assert r.path == "/d/clip.mp4"
+    assert r.size == 1000
+    assert (r.width, r.height, r.duration) == (1280, 720, 12.5)
+    assert r.has_video
 
 
-def test_pick_best_ignores_part_files(tmp_path):
-    video_id = "abc"
+def test_result_treats_none_codec_as_missing():
+    r = DownloadResult.from_info({"ext": "m4a", "vcodec": "none", "acodec": "mp4a.40.2"}, "/d/a.m4a", 5)
 
-    part = tmp_path / f"t1 [{video_id}].mp4.part"
-    good = tmp_path / f"t2 [{video_id}].mp4"
-    part.write_bytes(b"x" * 999)
-    good.write_bytes(b"x" * 5)
+    assert r.vcodec is None
+    assert not r.has_video
 
-    best = _pick_best_existing_file(str(tmp_path), video_id)
 
-    assert Path(best).name == good.name
+def test_result_with_file_replaces_path_and_size():
+    r = DownloadResult(path="/d/a.webm", size=10, ext="webm", acodec="opus")
+
+    mp3 = r.with_file("/d/a.mp3", 8, ext="mp3", acodec="mp3")
+
+    assert (mp3.path, mp3.size, mp3.ext, mp3.acodec) == ("/d/a.mp3", 8, "mp3", "mp3")
+
+
+class FakeExtractYDL:
+    def __init__(self, opts, raw):
+        self.opts = opts
+        self.raw = raw
+        self.processed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *a):
+        return False
+
+    def extract_info(self, url, download=True, process=True):
+        assert process is False
+        return dict(self.raw)
+
+    def process_ie_result(self, info, download=True):
+        self.processed = True
+        return {**info, "processed": True}
+
+
+def _patch_extract(monkeypatch, raw):
+    from project.downloader import ytdlp_client
+
+    made = []
+
+    def make(opts):
+        made.append(FakeExtractYDL(opts, raw))
+        return made[-1]
+
+    monkeypatch.setattr(ytdlp_client.yt_dlp, "YoutubeDL", make)
+    return made
+
+
+def test_extract_info_rejects_long_media_before_processing(monkeypatch):
+    from project.downloader import ytdlp_client
+
+    made = _patch_extract(monkeypatch, {"id": "x", "duration": 7200})
+
+    with pytest.raises(ytdlp_client.MediaTooLongError) as exc:
+        ytdlp_client.extract_info("u", max_duration=3600)
+
+    assert exc.value.duration == 7200
+    assert not made[0].processed
+
+
+def test_extract_info_processes_within_limit_with_menu_options(monkeypatch):
+    from project.downloader import ytdlp_client
+
+    made = _patch_extract(monkeypatch, {"id": "x", "duration": 60})
+
+    info = ytdlp_client.extract_info("u", options=ytdlp_client.menu_options(["tv"]), max_duration=3600)
+
+    assert info["processed"]
+    youtube = made[0].opts["extractor_args"]["youtube"]
+    assert "hls" in youtube["skip"]
+    assert youtube["player_client"] == ["tv"]
+    assert made[0].opts["writesubtitles"] is False
+    assert "player_client" not in ytdlp_client.menu_options()["extractor_args"]["youtube"]
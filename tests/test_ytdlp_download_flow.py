@@ -3,9 +3,11 @@ from project.downloader import ytdlp_client
 
 
 class FakeYDL:
-    def __init__(self, opts, info):
+    """Runs the postprocessor hooks the way yt-dlp does after a download."""
+
+    def __init__(self, opts, pp_infos):
         self.opts = opts
-        self._info = info
+        self._pp_infos = pp_infos
 
     def __enter__(self):
         return self
@@ -14,59 +16,118 @@ class FakeYDL:
         return False
 
     def extract_info(self, url, download):
-        return self._info
-
-    def prepare_filename(self, info):
-        return info.get("_prepared")
+        for info in self._pp_infos:
+            for hook in self.opts.get("postprocessor_hooks", []):
+                hook({"status": "started", "postprocessor": "X", "info_dict": {}})
+                hook({"status": "finished", "postprocessor": "X", "info_dict": info})
+        return {"id": "id1"}
 
 
-def _patch_yt_dlp(monkeypatch, info):
+def _patch_yt_dlp(monkeypatch, *pp_infos):
     monkeypatch.setattr(
         ytdlp_client.yt_dlp,
         "YoutubeDL",
-        lambda opts: FakeYDL(opts, info),
+        lambda opts: FakeYDL(opts, pp_infos),
     )
 
 
-def test_download_uses_info_filepath(monkeypatch, tmp_path):
-    f = tmp_path / "x.mp4"
-    f.write_bytes(b"123")
+def test_download_returns_manifest_from_last_postprocessor(monkeypatch, tmp_path):
+    merged = tmp_path / "x [id1].mp4"
+    merged.write_bytes(b"12345")
+    _patch_yt_dlp(
+        monkeypatch,
+        {"filepath": str(tmp_path / "x [id1].f137.mp4"), "ext": "mp4"},
+        {"filepath": str(merged), "ext": "mp4", "vcodec": "avc1", "acodec": "mp4a.40.2", "height": 720},
+    )
 
-    info = {"id": "id1", "filepath": str(f)}
-    _patch_yt_dlp(monkeypatch, info)
+    result = ytdlp_client.download("u", "137+140", str(tmp_path))
 
-    out = ytdlp_client.download("u", "best", str(tmp_path))
+    assert result.path == str(merged)
+    assert result.size == 5
+    assert result.height == 720
+    assert result.acodec == "mp4a.40.2"
 
-    assert out == str(f)
 
+def test_download_ignores_other_files_in_dir(monkeypatch, tmp_path):
+    (tmp_path / "bigger [id1].mkv").write_bytes(b"x" * 100)
+    f = tmp_path / "x [id1].mp4"
+    f.write_bytes(b"123")
+    _patch_yt_dlp(monkeypatch, {"filepath": str(f), "ext": "mp4"})
 
-def test_download_uses_requested_downloads_filepath(monkeypatch, tmp_path):
-    f = tmp_path / "x.mp4"
+    assert ytdlp_client.download("u", "best", str(tmp_path)).path == str(f)
+
+
+def test_download_section_fetches_only_the_range(monkeypatch, tmp_path):
+    f = tmp_path / "x [id1].mp4"
     f.write_bytes(b"123")
+    seen = {}
 
-    info = {"id": "id1", "requested_downloads": [{"filepath": str(f)}]}
-    _patch_yt_dlp(monkeypatch, info)
+    def make(opts):
+        seen.update(opts)
+        return FakeYDL(opts, [{"filepath": str(f)}])
 
-    out = ytdlp_client.download("u", "best", str(tmp_path))
+    monkeypatch.setattr(ytdlp_client.yt_dlp, "YoutubeDL", make)
 
-    assert out == str(f)
+    ytdlp_client.download("u", "best", str(tmp_path), section=(60.0, 90.0))
 
+    ranges = list(seen["download_ranges"]({}, None))
+    assert ranges == [{"start_time": 60.0, "end_time": 90.0}]
+    assert seen["force_keyframes_at_cuts"] is False
 
-def test_download_uses_prepare_filename(monkeypatch, tmp_path):
-    f = tmp_path / "p.mp4"
-    f.write_bytes(b"123")
 
-    info = {"id": "id1", "_prepared": str(f)}
-    _patch_yt_dlp(monkeypatch, info)
+def test_download_stops_past_max_filesize(monkeypatch, tmp_path):
+    seen = {}
+
+    class GrowingYDL(FakeYDL):
+        def extract_info(self, url, download):
+            for n in (400, 800, 1200):
+                for hook in self.opts["progress_hooks"]:
+                    hook({"status": "downloading", "filename": "a.f1.mp4", "downloaded_bytes": n})
+
+    def make(opts):
+        seen.update(opts)
+        return GrowingYDL(opts, [])
+
+    monkeypatch.setattr(ytdlp_client.yt_dlp, "YoutubeDL", make)
+    progress = []
 
-    out = ytdlp_client.download("u", "best", str(tmp_path))
+    with pytest.raises(ytdlp_client.FileTooLargeError):
+        ytdlp_client.download("u", "best", str(tmp_path), progress_hook=progress.append, max_filesize=1000)
 
-    assert out == str(f)
+    assert "max_filesize" not in seen
+    assert [d["downloaded_bytes"] for d in progress] == [400, 800]
+
+
+def test_download_too_big_content_length_is_too_large(monkeypatch, tmp_path):
+    class BigYDL(FakeYDL):
+        def extract_info(self, url, download):
+            for hook in self.opts["progress_hooks"]:
+                hook({"status": "downloading", "filename": "a.mp4", "downloaded_bytes": 10, "total_bytes": 5000})
+
+    monkeypatch.setattr(ytdlp_client.yt_dlp, "YoutubeDL", lambda opts: BigYDL(opts, []))
+
+    with pytest.raises(ytdlp_client.FileTooLargeError):
+        ytdlp_client.download("u", "best", str(tmp_path), max_filesize=1000)
+
+
+def test_empty_download_under_max_filesize_is_not_too_large(monkeypatch, tmp_path):
+    _patch_yt_dlp(monkeypatch)
+
+    with pytest.raises(ytdlp_client.EmptyDownloadError):
+        ytdlp_client.download("u", "best", str(tmp_path), max_filesize=1000)
 
 
 def test_download_raises_when_missing(monkeypatch, tmp_path):
-    info = {"id": "id1"}
-    _patch_yt_dlp(monkeypatch, info)
+    _patch_yt_dlp(monkeypatch)
+
+    with pytest.raises(ytdlp_client.EmptyDownloadError):
+        ytdlp_client.download("u", "best", str(tmp_path))
+
+
+def test_download_raises_when_empty(monkeypatch, tmp_path):
+    f = tmp_path / "x.mp4"
+    f.write_bytes(b"")
+    _patch_yt_dlp(monkeypatch, {"filepath": str(f)})
 
-    with pytest.raises(RuntimeError):
+    with pytest.raises(ytdlp_client.EmptyDownloadError):
         ytdlp_client.download("u", "best", str(tmp_path))